@@ -0,0 +1,155 @@
+"""
+Recall@k, query latency and resident memory of each memory index type.
+
+Builds flat, IVF, HNSW and PQ indexes (vector_index.build_index, as
+memory_engine does) over a synthetic clustered corpus of unit vectors, and
+searches each one from a fresh process, loaded into RAM and memory-mapped.
+Queries are perturbed corpus vectors; exact flat search is the ground truth.
+RSS is split into anonymous (private to the process) and file-backed (page
+cache, shared by every worker that maps the same index) memory:
+
+    python benchmarks/bench_ann_index.py --size 200000 --dim 256 --k 8 --rerank
+
+No OpenAI calls or embeddings are involved.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import faiss
+import numpy as np
+
+from vector_index import INDEX_TYPES, build_index, read_index, tune
+
+
+def rss_mb():
+    """(anonymous, file-backed) resident memory in MB (Linux)."""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                key, amount, _ = line.split()
+                values[key] = int(amount) / 1024
+    return values.get("RssAnon:", 0.0), values.get("RssFile:", 0.0)
+
+
+def synthetic_corpus(size, dim, queries, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, size // 500), dim)).astype("float32")
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal((size, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picks = vectors[rng.integers(0, size, queries)]
+    probes = picks + 0.1 * rng.standard_normal(picks.shape).astype("float32")
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    return vectors, probes.astype("float32")
+
+
+def run_child(args):
+    """Child mode: load one index, run the queries one by one, print a JSON result line."""
+    base_anon, base_file = rss_mb()
+    started = time.perf_counter()
+    index = tune(read_index(args.child, mmap=args.mmap), args.nprobe, args.ef_search)
+    exact = read_index(args.exact, mmap=True) if args.exact else None
+    load_time = time.perf_counter() - started
+
+    queries = np.load(args.query_file)
+    truth = np.load(args.truth)
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        query = query.reshape(1, -1)
+        start = time.perf_counter()
+        _, found = index.search(query, max(args.k, args.fetch_k) if exact is not None else args.k)
+        found = [int(i) for i in found[0] if i != -1]
+        if exact is not None and found:
+            candidates = np.vstack([exact.reconstruct(i) for i in found])
+            found = [found[i] for i in np.argsort(((candidates - query) ** 2).sum(axis=1))[:args.k]]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(found[:args.k]) & set(expected.tolist()))
+    anon, file_backed = rss_mb()
+    latencies.sort()
+    print(json.dumps({
+        "recall": hits / (len(queries) * args.k),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "load_s": load_time,
+        "anon_mb": anon - base_anon,
+        "file_mb": file_backed - base_file,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="corpus vectors")
+    parser.add_argument("--dim", type=int, default=256, help="vector size (OpenAI ada-002 is 1536)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--rerank", action="store_true",
+                        help="also re-rank --fetch-k ANN candidates against the memory-mapped flat index")
+    parser.add_argument("--fetch-k", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--exact", help=argparse.SUPPRESS)
+    parser.add_argument("--mmap", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--truth", help=argparse.SUPPRESS)
+    parser.add_argument("--query-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    vectors, queries = synthetic_corpus(args.size, args.dim, args.queries, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = faiss.IndexFlatL2(args.dim)
+        flat.add(vectors)
+        _, truth = flat.search(queries, args.k)
+        flat_path = os.path.join(tmp, "flat.faiss")
+        faiss.write_index(flat, flat_path)
+        np.save(os.path.join(tmp, "queries.npy"), queries)
+        np.save(os.path.join(tmp, "truth.npy"), truth)
+        del flat
+
+        print(f"corpus {args.size} x {args.dim} ({vectors.nbytes / 2 ** 20:.0f} MB float32), "
+              f"{args.queries} queries, k={args.k} nprobe={args.nprobe} ef_search={args.ef_search}")
+        print(f"{'index':<12} {'load':<5} {'build s':>8} {'file MB':>8} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} "
+              f"{'anon MB':>8} {'file-backed MB':>15}")
+        for index_type in args.types:
+            start = time.perf_counter()
+            index = build_index(vectors, index_type)
+            build_time = time.perf_counter() - start
+            if index is None:
+                path = flat_path
+            else:
+                path = os.path.join(tmp, f"{index_type}.faiss")
+                faiss.write_index(index, path)
+                del index
+            runs = [(index_type, mmap, None) for mmap in (False, True)]
+            if args.rerank and index_type != "flat":
+                runs.append((index_type + "+exact", True, flat_path))
+            for label, mmap, exact in runs:
+                command = [sys.executable, os.path.abspath(__file__), "--child", path, "--k", str(args.k),
+                           "--nprobe", str(args.nprobe), "--ef-search", str(args.ef_search),
+                           "--fetch-k", str(args.fetch_k), "--truth", os.path.join(tmp, "truth.npy"),
+                           "--query-file", os.path.join(tmp, "queries.npy")]
+                command += ["--mmap"] if mmap else []
+                command += ["--exact", exact] if exact else []
+                output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT).stdout
+                r = json.loads(output.strip().splitlines()[-1])
+                print(f"{label:<12} {'mmap' if mmap else 'ram':<5} {build_time:>8.1f} "
+                      f"{os.path.getsize(path) / 2 ** 20:>8.1f} {r['recall']:>7.3f} {r['p50_ms']:>7.2f} "
+                      f"{r['p95_ms']:>7.2f} {r['anon_mb']:>8.1f} {r['file_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
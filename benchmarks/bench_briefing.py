@@ -0,0 +1,74 @@
+"""
+Briefing latency: concurrent providers with a deadline vs. calling them in sequence.
+
+Uses local fake providers (fast, medium, slow and failing):
+
+    python benchmarks/bench_briefing.py --deadline 1.0 --slow 3.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_sources import REFRESH_TIMEOUT, BriefingAssembler, Provider
+
+
+def fake_source(name, delay, fail_after=None):
+    calls = {"n": 0}
+
+    async def fetch():
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        if fail_after is not None and calls["n"] > fail_after:
+            raise RuntimeError(f"{name} unavailable")
+        return f"{name} #{calls['n']}"
+    return fetch
+
+
+async def run(args):
+    sources = [
+        ("weather", args.fast, None),
+        ("exchange", args.medium, None),
+        ("tr_news", args.slow, None),
+        ("world_news", args.fast, 1),  # ilk çağrıdan sonra hata verir
+    ]
+
+    start = time.perf_counter()
+    for name, delay, _ in sources:
+        await fake_source(name, delay)()
+    sequential = time.perf_counter() - start
+
+    providers = [Provider(name, fake_source(name, delay, fail), ttl=args.ttl, timeout=args.refresh_timeout)
+                 for name, delay, fail in sources]
+    assembler = BriefingAssembler(providers, deadline=args.deadline)
+
+    print(f"sequential (no deadline): {sequential:.2f}s")
+    for round_no in range(1, 5):
+        start = time.perf_counter()
+        sections = await assembler.collect()
+        elapsed = time.perf_counter() - start
+        shown = ", ".join(f"{s.name}={s.text!r}{' (stale)' if s.stale else ''}" for s in sections)
+        print(f"round {round_no}: {elapsed:.2f}s  {shown}")
+        # TTL dolsun ve yavaş kaynağın arka plan yenilemesi ilerlesin
+        await asyncio.sleep(args.ttl + 0.05)
+    await asyncio.sleep(args.slow)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deadline", type=float, default=1.0)
+    parser.add_argument("--fast", type=float, default=0.05)
+    parser.add_argument("--medium", type=float, default=0.4)
+    parser.add_argument("--slow", type=float, default=3.0)
+    parser.add_argument("--ttl", type=float, default=0.5)
+    parser.add_argument("--refresh-timeout", type=float, default=REFRESH_TIMEOUT,
+                        help="per-refresh timeout (production default: [Briefing] refresh_timeout)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Daily briefing fan-out throughput against a local stand-in Bot API.
+
+Sends one message to N chats through daily_reminder.BroadcastSender. The
+broadcast is interrupted halfway and then resumed from its journal, the way
+a bot restart would. The fake server answers 429 above its own global
+limit, so the report shows whether the sender stayed within it and whether
+any chat got the message twice:
+
+    python benchmarks/bench_broadcast.py --chats 2000 --rate 25
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from telegram import Bot
+
+from daily_reminder import BroadcastJournal, BroadcastSender
+from fake_servers import FakeTelegramServer, start_server
+
+
+async def run(args, journal_dir):
+    server = start_server(FakeTelegramServer(latency=args.latency, rate_limit=30))
+    chat_ids = list(range(1000, 1000 + args.chats))
+    text = "📊 GÜNLÜK BÜLTEN (benchmark)"
+
+    async with Bot("123:benchmark", base_url=server.base_url) as bot:
+        started = time.perf_counter()
+
+        # İlk çalıştırma: yarıda "çöker"
+        journal = BroadcastJournal("bench", directory=journal_dir)
+        sender = BroadcastSender(bot, rate=args.rate, workers=args.workers)
+        task = asyncio.create_task(sender.broadcast(chat_ids, text, journal=journal))
+        while len(journal.sent) < args.chats // 2:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        journal.close()
+        first_part = len(server.sent)
+
+        # Yeniden başlatma: günlükten devam eder
+        journal = BroadcastJournal("bench", directory=journal_dir)
+        sender = BroadcastSender(bot, rate=args.rate, workers=args.workers)
+        stats = await sender.broadcast(chat_ids, text, journal=journal)
+        journal.finish()
+        total = time.perf_counter() - started
+
+    deliveries = collections.Counter(chat_id for chat_id, _, _ in server.sent)
+    duplicates = sum(1 for n in deliveries.values() if n > 1)
+    missing = args.chats - len(deliveries)
+    print(f"chats={args.chats} rate={args.rate}/s workers={args.workers}")
+    print(f"sent before crash: {first_part}, after resume: {stats['sent']} (skipped {stats['skipped']})")
+    print(f"total fan-out time: {total:.2f}s, throughput: {len(server.sent) / total:.1f} msg/s")
+    print(f"429 responses: {server.too_many_requests}, retries: {stats['retries']}")
+    print(f"duplicates: {duplicates}, missing: {missing}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=25)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as journal_dir:
+        asyncio.run(run(args, journal_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Overlapping latency for simultaneous chats against a slow local fake LLM.
+
+Sends N chat messages at once through telegram_bot.get_openai_response and
+compares the wall time with running them one after another:
+
+    python benchmarks/bench_concurrency.py --chats 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_servers import FakeOpenAIServer, start_server
+
+
+async def run(chats):
+    import telegram_bot
+
+    messages = [f"merhaba {i}" for i in range(chats)]
+
+    start = time.perf_counter()
+    for i, m in enumerate(messages):
+        await telegram_bot.get_openai_response(m, user=i)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(telegram_bot.get_openai_response(m, user=i) for i, m in enumerate(messages)))
+    concurrent = time.perf_counter() - start
+    return sequential, concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = start_server(FakeOpenAIServer(latency=args.latency))
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:benchmark")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.makedirs(os.path.join(workdir, "prompts"))
+        with open(os.path.join(workdir, "prompts", "system_prompt.txt"), "w", encoding="utf-8") as f:
+            f.write("Sen yardımsever bir asistansın.")
+        os.chdir(workdir)
+
+        import telegram_bot
+        from rag_engine import MemoryContext
+        # Hafıza indeksi yok; yalnızca LLM gecikmesini ölçüyoruz
+        telegram_bot.retrieve_memory_context = lambda prompt, k=3: MemoryContext("", [0.0], 0, [])
+
+        sequential, concurrent = asyncio.run(run(args.chats))
+
+    print(f"chats={args.chats} llm_latency={args.latency:.2f}s")
+    print(f"sequential: {sequential:.2f}s")
+    print(f"concurrent: {concurrent:.2f}s  (speedup x{sequential / concurrent:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+html_extract.extract_text vs. the previous BeautifulSoup clean_text.
+
+Runs both over the saved pages in benchmarks/corpus and reports throughput,
+peak Python memory (tracemalloc) and output equivalence:
+
+    python benchmarks/bench_html_extract.py --repeat 20
+
+"coverage" is the share of extract_text's words that also appear in the
+BeautifulSoup output (1.0 = nothing invented), "ratio" is difflib's
+similarity of the two outputs. The new extractor drops nav/footer/related
+blocks on purpose, so ratio < 1 is expected.
+"""
+import argparse
+import difflib
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from html_extract import extract_text
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def clean_text_bs4(text: str) -> str:
+    """The previous web_data_engine.clean_text, kept here as the reference."""
+    if not text:
+        return ""
+    soup = BeautifulSoup(text, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    if len(text) > 3000:
+        text = text[:3000] + "..."
+    return text
+
+
+def measure(fn, html, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(html)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mb_per_s = len(html.encode("utf-8")) * repeat / elapsed / (1024 * 1024)
+    return out, mb_per_s, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'page':<22} {'KB':>6} {'old MB/s':>9} {'new MB/s':>9} {'old peak KB':>12} {'new peak KB':>12} {'coverage':>9} {'ratio':>6}")
+    for path in sorted(glob.glob(os.path.join(CORPUS, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        old, old_speed, old_peak = measure(clean_text_bs4, html, args.repeat)
+        new, new_speed, new_peak = measure(extract_text, html, args.repeat)
+
+        old_words = set(old.split())
+        new_words = new.split()
+        coverage = sum(w in old_words for w in new_words) / len(new_words) if new_words else 0.0
+        ratio = difflib.SequenceMatcher(None, old.split(), new_words, autojunk=False).ratio()
+        print(f"{os.path.basename(path):<22} {len(html) // 1024:>6} {old_speed:>9.2f} {new_speed:>9.2f} "
+              f"{old_peak:>12.0f} {new_peak:>12.0f} {coverage:>9.2f} {ratio:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Hybrid (BM25 + vector) vs. vector-only memory retrieval: quality, latency
+and embedding requests.
+
+Builds a synthetic personal-notes corpus (who, where, when, what about)
+with memory_engine.build_memory, which also writes the BM25 index, and
+asks two kinds of questions about single notes:
+
+    exact       names and dates, as written in the note
+    paraphrase  first name plus a synonym of the topic ("roman" for "kitap")
+
+The local embeddings are hashed bags of words in which each topic and its
+synonym share a dimension, so paraphrases are only found through vectors;
+every query embedding sleeps --embedding-latency to stand in for the
+OpenAI round trip. Reports hit rate@k, MRR, p50/p95 latency and the share
+of queries answered without an embedding request; --repeat > 1 asks every
+question again to show the query-embedding LRU:
+
+    python benchmarks/bench_hybrid_retrieval.py --notes 600 --k 4 --repeat 2
+
+No OpenAI calls are made.
+"""
+import argparse
+import hashlib
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_store import EmbeddingStore
+from memory_engine import build_memory
+from rag_engine import MemoryRetriever
+from text_utils import normalize_query
+
+FIRST_NAMES = ("Ayşe Fatma Zeynep Elif Emine Hatice Merve Büşra Selin Ece Deniz Can Emre Burak Mehmet Ahmet "
+               "Mustafa Ali Hasan Hüseyin Murat Kemal Oğuz Cem Kerem Barış Onur Tolga Serkan Volkan").split()
+LAST_NAMES = ("Yılmaz Kaya Demir Şahin Çelik Yıldız Yıldırım Öztürk Aydın Özdemir Arslan Doğan Kılıç Aslan "
+              "Çetin Kara Koç Kurt Özkan Şimşek").split()
+PLACES = ("Kadıköy Beşiktaş Moda Cihangir Karaköy Bebek Nişantaşı Üsküdar Balat Ortaköy Arnavutköy Kuzguncuk "
+          "Fenerbahçe Sarıyer Taksim").split()
+# konu -> eş anlamlısı (yalnızca sorgularda geçer)
+TOPICS = {
+    "kitap": "roman", "sinema": "film", "futbol": "maç", "yemek": "tarif", "tatil": "seyahat",
+    "müzik": "şarkı", "borsa": "yatırım", "bahçe": "çiçek", "kahve": "espresso", "resim": "tablo",
+    "tiyatro": "sahne", "bilgisayar": "laptop", "araba": "otomobil", "doktor": "hastane", "düğün": "nikah",
+    "taşınma": "nakliye", "köpek": "yavru", "matematik": "geometri", "fotoğraf": "kamera", "yüzme": "havuz",
+}
+CONCEPTS = {synonym: topic for topic, synonym in TOPICS.items()}
+
+
+class ConceptEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors where a topic and its synonym coincide; counts query requests."""
+
+    model = "concept-fake"
+
+    def __init__(self, size=256, latency=0.0):
+        self.size = size
+        self.latency = latency
+        self.query_calls = 0
+
+    def _vector(self, text):
+        vector = [0.0] * self.size
+        for word in normalize_query(text).split():
+            digest = hashlib.sha256(CONCEPTS.get(word, word)[:5].encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.size] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        time.sleep(self.latency)
+        return self._vector(text)
+
+
+def write_corpus(source, notes, per_file, seed):
+    """Write the notes as .txt files; returns [(note text, exact query, paraphrase query)]."""
+    rng = random.Random(seed)
+    pairs = [(first, topic) for first in FIRST_NAMES for topic in TOPICS]
+    rng.shuffle(pairs)
+    facts = []
+    for first, topic in pairs[:notes]:
+        last, place = rng.choice(LAST_NAMES), rng.choice(PLACES)
+        date = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2015, 2024)}"
+        text = f"{date} günü {first} {last} ile {place} tarafında buluştuk; {topic} hakkında uzun uzun konuştuk."
+        facts.append((text, f"{first} {last} {date}", f"{first} ile {TOPICS[topic]} üzerine ne demiştik"))
+    for i in range(0, len(facts), per_file):
+        with open(os.path.join(source, f"notlar{i // per_file:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(text for text, _, _ in facts[i:i + per_file]))
+    return facts
+
+
+def run(retriever, questions, k, repeat):
+    """Returns {kind: (hits, reciprocal ranks, latencies in ms)}, one entry per question asked."""
+    results = {}
+    for _ in range(repeat):
+        for kind, query, target in questions:
+            start = time.perf_counter()
+            docs = retriever.search(query, k=k)
+            elapsed = (time.perf_counter() - start) * 1000
+            rank = next((i for i, doc in enumerate(docs, 1) if target in doc.page_content), None)
+            hits, reciprocal, latencies = results.setdefault(kind, ([], [], []))
+            hits.append(rank is not None)
+            reciprocal.append(1 / rank if rank else 0.0)
+            latencies.append(elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=400, help=f"notes (at most {len(FIRST_NAMES) * len(TOPICS)})")
+    parser.add_argument("--per-file", type=int, default=6, help="notes per source file")
+    parser.add_argument("--queries", type=int, default=100, help="questions of each kind")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--embedding-latency", type=float, default=0.15, help="seconds per query embedding")
+    parser.add_argument("--repeat", type=int, default=1, help="times every question is asked")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source_docs")
+        index_path = os.path.join(tmp, "vector_store")
+        os.makedirs(source)
+        facts = write_corpus(source, args.notes, args.per_file, args.seed)
+        embeddings = ConceptEmbeddings(latency=args.embedding_latency)
+        store = EmbeddingStore(os.path.join(tmp, "embedding_cache.sqlite"), 128)
+        build_memory(source, index_path, embeddings=embeddings, store=store, workers=1)
+        store.close()
+
+        sample = random.Random(args.seed).sample(facts, min(args.queries, len(facts)))
+        questions = [("exact", exact, text) for text, exact, _ in sample]
+        questions += [("paraphrase", paraphrase, text) for text, _, paraphrase in sample]
+
+        print(f"{len(facts)} notes, {len(sample)} questions of each kind x {args.repeat}, k={args.k}, "
+              f"embedding latency {args.embedding_latency * 1000:.0f} ms")
+        print(f"{'mode':<14} {'questions':<11} {'hit@k':>6} {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'embedded':>9} {'no embed':>9}")
+        modes = [("vector", False, 0), ("hybrid", True, 0)]
+        if args.repeat > 1:
+            modes += [("vector+lru", False, 1024), ("hybrid+lru", True, 1024)]
+        for label, hybrid, cache in modes:
+            embeddings.query_calls = 0
+            retriever = MemoryRetriever(index_path, embeddings=embeddings, hybrid=hybrid, query_cache_entries=cache)
+            retriever.load()
+            results = run(retriever, questions, args.k, args.repeat)
+            asked = len(questions) * args.repeat
+            for kind, (hits, reciprocal, latencies) in results.items():
+                latencies.sort()
+                print(f"{label:<14} {kind:<11} {statistics.mean(hits):>6.3f} {statistics.mean(reciprocal):>6.3f} "
+                      f"{statistics.median(latencies):>8.1f} {latencies[int(0.95 * (len(latencies) - 1))]:>8.1f}")
+            print(f"{label:<14} {'all':<11} {'':>6} {'':>6} {'':>8} {'':>8} {embeddings.query_calls:>9} "
+                  f"{retriever.lexical_only / asked:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Full vs. add-one-file rebuild cost of memory_engine.build_memory.
+
+Uses a local fake embedding function that counts how many texts it was
+asked to embed, so no OpenAI calls are made:
+
+    python benchmarks/bench_incremental_build.py --docs 200
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import docx
+from langchain_core.embeddings import Embeddings
+
+from embedding_store import EmbeddingStore
+from memory_engine import build_memory
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic fake embeddings that count calls and embedded texts."""
+
+    model = "counting-fake"
+
+    def __init__(self, size=256):
+        self.size = size
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128 for i in range(self.size)]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def write_doc(path, seed):
+    document = docx.Document()
+    for p in range(20):
+        document.add_paragraph(f"Belge {seed}, paragraf {p}: " + "anı ve not " * 30)
+    document.save(path)
+
+
+def run(label, source, index_path, store, embeddings):
+    embeddings.calls = embeddings.texts = 0
+    start = time.perf_counter()
+    stats = build_memory(source, index_path, embeddings=embeddings, store=store)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {elapsed:>8.2f}s  calls={embeddings.calls:<4} texts={embeddings.texts:<6} {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "source_docs")
+        index_path = os.path.join(root, "vector_store")
+        os.makedirs(source)
+        for i in range(args.docs):
+            write_doc(os.path.join(source, f"doc_{i}.docx"), i)
+
+        embeddings = CountingEmbeddings()
+        store = EmbeddingStore(os.path.join(root, "embedding_cache.sqlite"))
+
+        run("full build", source, index_path, store, embeddings)
+        run("no change", source, index_path, store, embeddings)
+        write_doc(os.path.join(source, "new.docx"), args.docs)
+        run("add one file", source, index_path, store, embeddings)
+        os.remove(os.path.join(source, "doc_0.docx"))
+        run("remove one", source, index_path, store, embeddings)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Wall time and peak memory of a full memory_engine.build_memory run on a
+synthetic corpus, with one parser process vs. a process pool.
+
+Generates thousands of .txt/.md/.json (GPT and Claude export) files plus a
+few .docx files, and uses the counting fake embeddings, so no OpenAI calls
+are made:
+
+    python benchmarks/bench_ingest.py --docs 5000 --workers 1 4
+
+Each configuration runs in its own subprocess so peak RSS is measured
+independently.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+PARAGRAPH = "Bugün toplantıda bütçe, takvim ve yeni proje planı konuşuldu. " * 6
+
+
+def write_corpus(source, docs):
+    from bench_incremental_build import write_doc
+
+    for i in range(docs):
+        folder = os.path.join(source, f"part{i % 10}")
+        os.makedirs(folder, exist_ok=True)
+        kind = i % 4
+        if kind == 0:
+            with open(os.path.join(folder, f"note{i}.txt"), "w", encoding="utf-8") as f:
+                f.write("\n\n".join(f"Not {i}.{p}: {PARAGRAPH}" for p in range(8)))
+        elif kind == 1:
+            with open(os.path.join(folder, f"note{i}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# Başlık {i}\n\n" + "\n\n".join(f"- madde {p}: {PARAGRAPH}" for p in range(8)))
+        elif kind == 2:
+            mapping = {
+                str(m): {"message": {"author": {"role": "user" if m % 2 == 0 else "assistant"},
+                                     "create_time": m, "content": {"parts": [f"{i}/{m} {PARAGRAPH}"]}}}
+                for m in range(8)
+            }
+            with open(os.path.join(folder, f"gpt{i}.json"), "w", encoding="utf-8") as f:
+                json.dump([{"title": f"Sohbet {i}", "mapping": mapping}], f, ensure_ascii=False)
+        else:
+            messages = [{"sender": "human" if m % 2 == 0 else "assistant", "text": f"{i}/{m} {PARAGRAPH}"}
+                        for m in range(8)]
+            with open(os.path.join(folder, f"claude{i}.json"), "w", encoding="utf-8") as f:
+                json.dump([{"name": f"Sohbet {i}", "chat_messages": messages}], f, ensure_ascii=False)
+    for i in range(max(1, docs // 100)):
+        write_doc(os.path.join(source, f"doc{i}.docx"), i)
+
+
+def run_one(source, workers, batch_size):
+    """Child mode: build a fresh index and print a JSON result line."""
+    from bench_incremental_build import CountingEmbeddings
+    from embedding_store import EmbeddingStore
+    from memory_engine import build_memory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = CountingEmbeddings()
+        store = EmbeddingStore(os.path.join(tmp, "cache.sqlite"), batch_size)
+        start = time.perf_counter()
+        stats = build_memory(source, os.path.join(tmp, "index"), embeddings=embeddings, store=store,
+                             workers=workers, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        store.close()
+    # ru_maxrss Linux'ta KiB cinsinden
+    parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"elapsed": elapsed, "rss_mb": parent / 1024, "worker_rss_mb": children / 1024,
+                      "files": stats["added"], "failed": stats["failed"], "texts": embeddings.texts,
+                      "calls": embeddings.calls}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 2])
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--source", help="existing corpus folder (skips generation)")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_one(args.source, args.child, args.batch_size)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source or os.path.join(tmp, "corpus")
+        if not args.source:
+            start = time.perf_counter()
+            write_corpus(source, args.docs)
+            print(f"corpus: {args.docs} files generated in {time.perf_counter() - start:.1f}s")
+        for workers in args.workers:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--source", source, "--child", str(workers),
+                 "--batch-size", str(args.batch_size)],
+                check=True, capture_output=True, text=True, cwd=ROOT,
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(f"workers={workers:<3} {r['elapsed']:7.2f}s  {r['files'] / r['elapsed']:8.1f} files/s  "
+                  f"peak RSS {r['rss_mb']:.0f} MB (largest worker {r['worker_rss_mb']:.0f} MB)  "
+                  f"chunks={r['texts']} embed calls={r['calls']} failed={r['failed']}")
+
+
+if __name__ == "__main__":
+    main()
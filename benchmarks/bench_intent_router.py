@@ -0,0 +1,72 @@
+"""
+Routing cost and accuracy: intent_router vs. the previous keyword scans.
+
+Uses the labelled messages in benchmarks/intent_cases.tsv:
+
+    python benchmarks/bench_intent_router.py --repeat 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from intent_router import router, WEB_SEARCH, BRIEFING, MEMORY_CHAT
+
+
+def legacy_route(message: str) -> str:
+    """The previous should_use_web + handle_message keyword scans."""
+    keywords = [
+        "savaş", "son durum", "bugün", "dün", "gündem", "enflasyon", "deprem",
+        "güncel", "zam", "seçim", "kur", "dolar", "euro", "altın", "borsa",
+        "iran", "israil", "ukrayna", "rusya", "abd", "çin", "türkiye",
+        "haber", "gelişme", "olay", "kriz", "anlaşma", "toplantı", "zirve",
+        "2024", "2023", "bu ay", "bu hafta", "son dakika", "acil", "önemli"
+    ]
+    if any(word in message.lower() for word in keywords):
+        return WEB_SEARCH
+    if any(word in message.lower() for word in ["hava", "piyasa", "gündem", "haber", "dolar", "euro", "altın", "dünya", "kur", "bülten", "günlük"]):
+        return BRIEFING
+    return MEMORY_CHAT
+
+
+def load_cases():
+    cases = []
+    with open(os.path.join(HERE, "intent_cases.tsv"), "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                message, expected = line.rstrip("\n").split("\t")
+                cases.append((message, expected))
+    return cases
+
+
+def evaluate(name, route, cases, repeat):
+    misses = [(m, e, route(m)) for m, e in cases if route(m) != e]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message, _ in cases:
+            route(message)
+    per_message = (time.perf_counter() - start) / (repeat * len(cases)) * 1e6
+    accuracy = 1 - len(misses) / len(cases)
+    print(f"{name:<8} accuracy={accuracy:.1%} ({len(cases) - len(misses)}/{len(cases)})  {per_message:.2f} µs/message")
+    return misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    for name, route in (("legacy", legacy_route), ("router", router.top_intent)):
+        misses = evaluate(name, route, cases, args.repeat)
+        if args.show_misses:
+            for message, expected, got in misses:
+                print(f"    {message!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
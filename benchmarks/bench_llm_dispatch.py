@@ -0,0 +1,99 @@
+"""
+Fairness of llm_dispatch under a spamming user, against a rate-limited fake OpenAI.
+
+One chat sends --spam requests at once while --users other chats send one
+each. Compares the other chats' latency when every call goes straight to
+the API with going through LLMDispatcher (per-user buckets, fair queue,
+429 backoff):
+
+    python benchmarks/bench_llm_dispatch.py --spam 60 --users 10 --rate-limit 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import openai
+
+from fake_servers import FakeOpenAIServer, start_server
+from llm_dispatch import LLMDispatcher
+from stream_reply import complete_chat
+
+MESSAGES = [{"role": "user", "content": "merhaba, bugün nasılsın?"}]
+
+
+async def timed(call):
+    start = time.perf_counter()
+    try:
+        await call()
+        return time.perf_counter() - start, True
+    except openai.RateLimitError:
+        return time.perf_counter() - start, False
+
+
+async def scenario(args, send):
+    spam = [asyncio.ensure_future(timed(lambda: send("spammer"))) for _ in range(args.spam)]
+    await asyncio.sleep(0.05)  # spam kuyruğu önce dolsun
+    others = await asyncio.gather(*(timed(lambda u=u: send(f"user{u}")) for u in range(args.users)))
+    spam = await asyncio.gather(*spam)
+    return spam, others
+
+
+def summary(label, results):
+    latencies = sorted(t for t, ok in results if ok)
+    failed = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        return f"{label}: all {failed} failed"
+    return (f"{label}: median {statistics.median(latencies):.2f}s, max {latencies[-1]:.2f}s, "
+            f"failed {failed}/{len(results)}")
+
+
+async def run(args, server):
+    # SDK'nın kendi tekrar denemeleri kapalı: 429'u kim yönetiyorsa o görünsün
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="sk-benchmark", max_retries=0)
+
+    async def direct(user):
+        return await complete_chat(client, model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=100)
+
+    spam, others = await scenario(args, direct)
+    print("direct calls")
+    print("  " + summary("other users", others))
+    print("  " + summary("spammer", spam))
+    print(f"  429 responses: {server.too_many_requests}")
+
+    await asyncio.sleep(1.5)
+    server.too_many_requests = 0
+    dispatcher = LLMDispatcher(max_concurrency=args.concurrency, user_tokens_per_minute=args.user_tpm,
+                               user_burst=args.user_tpm // 4, debounce=0)
+
+    async def dispatched(user):
+        return await dispatcher.chat(user, client, model="gpt-3.5-turbo", messages=MESSAGES, max_tokens=100)
+
+    spam, others = await scenario(args, dispatched)
+    print("through LLMDispatcher")
+    print("  " + summary("other users", others))
+    print("  " + summary("spammer", spam))
+    print(f"  429 responses: {server.too_many_requests}, dispatcher: {dispatcher.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spam", type=int, default=60)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--rate-limit", type=int, default=20, help="fake OpenAI requests per second")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--user-tpm", type=int, default=8000)
+    args = parser.parse_args()
+
+    server = start_server(FakeOpenAIServer(latency=args.latency, rate_limit=args.rate_limit))
+    asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
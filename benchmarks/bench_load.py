@@ -0,0 +1,241 @@
+"""
+End-to-end load test of the bot without network access.
+
+Starts local stand-ins for the Bot API (getUpdates/sendMessage/
+editMessageText), OpenAI (completions and embeddings, with configurable
+latency) and the search result sites (benchmarks/corpus pages), runs the
+real telegram_bot Application against them and replays a mix of chat,
+/search, briefing and memory messages at a fixed arrival rate:
+
+    python benchmarks/bench_load.py --rate 20 --messages 400 --mix chat=4,search=2,briefing=1,memory=3
+
+Latency is measured from the scheduled arrival of a message to the bot's
+final reply for it (open loop, so a slow bot cannot slow the arrivals
+down). Reports p50/p95/p99 per message kind and overall messages per
+second; --max-p95 and --json make it usable as a regression gate.
+
+Only Google itself is patched out (search results point at the static page
+server). tiktoken's cl100k_base file must already be cached
+(TIKTOKEN_CACHE_DIR) when running fully offline.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_servers import FakeOpenAIServer, FakeTelegramServer, StaticPageServer, start_server
+
+MESSAGES = {
+    "chat": ["merhaba nasılsın", "bana bir şaka anlat", "bugün kendimi yorgun hissediyorum",
+             "hafta sonu ne yapsam", "bir şiir yazar mısın"],
+    "memory": ["geçen yıl hangi projelerde çalıştım", "en sevdiğim kitap neydi",
+               "annemin doğum günü ne zamandı", "hangi dilleri öğrenmiştim"],
+    "briefing": ["bugün hava nasıl", "dolar kuru ne kadar", "sabah bülteni", "piyasalar nasıl"],
+    "search": ["/search iran israil savaşı", "/search enflasyon rakamları", "/search seçim sonuçları",
+               "/search deprem son dakika", "/search borsa istanbul"],
+}
+# Bir mesajın tamamlanması için beklenen bot çağrısı sayısı (/search: durum mesajı + düzenleme)
+EXPECTED_REPLIES = {"chat": 1, "memory": 1, "briefing": 1, "search": 2}
+
+SETTINGS = """[Telegram]
+stream_replies = false
+concurrent_updates = {concurrent}
+
+[Fetcher]
+per_host = 64
+"""
+
+
+class ReplyTracker:
+    """Collects the fake Bot API's replies and marks a message done at its last expected reply."""
+
+    def __init__(self):
+        self.pending = {}  # chat_id -> (kind, kalan yanıt, planlanan varış)
+        self.done = []  # (kind, latency, completed_at)
+        self._lock = threading.Lock()
+
+    def expect(self, chat_id, kind, arrival):
+        with self._lock:
+            self.pending[chat_id] = (kind, EXPECTED_REPLIES[kind], arrival)
+
+    def on_reply(self, chat_id, now):
+        with self._lock:
+            entry = self.pending.get(chat_id)
+            if entry is None:
+                return
+            kind, remaining, arrival = entry
+            if remaining > 1:
+                self.pending[chat_id] = (kind, remaining - 1, arrival)
+            else:
+                del self.pending[chat_id]
+                self.done.append((kind, now - arrival, now))
+
+    async def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return len(self.pending)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in MESSAGES:
+            raise SystemExit(f"unknown message kind {kind!r}, expected one of {', '.join(MESSAGES)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def prepare_workdir(workdir, args, openai_base_url):
+    os.makedirs(os.path.join(workdir, "prompts"))
+    os.makedirs(os.path.join(workdir, "config"))
+    with open(os.path.join(workdir, "prompts", "system_prompt.txt"), "w", encoding="utf-8") as f:
+        f.write("Sen yardımsever bir asistansın.")
+    with open(os.path.join(workdir, "config", "settings.ini"), "w", encoding="utf-8") as f:
+        f.write(SETTINGS.format(concurrent=args.concurrent))
+
+    source = os.path.join(workdir, "memory", "source_docs")
+    os.makedirs(source)
+    for i in range(args.memory_docs):
+        with open(os.path.join(source, f"not{i}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(f"Not {i}.{p}: {random.choice(MESSAGES['memory'])} sorusunun cevabı burada. " * 4
+                                for p in range(6)))
+
+    os.chdir(workdir)
+    from langchain_openai import OpenAIEmbeddings
+    from memory_engine import build_memory
+    import rag_engine
+
+    # Uzunluk kontrolü tiktoken ile model dosyası ister; sahte sunucuya doğrudan metin gönder
+    embeddings = OpenAIEmbeddings(openai_api_key="sk-benchmark", openai_api_base=openai_base_url,
+                                  check_embedding_ctx_length=False)
+    build_memory(source, "memory/vector_store", embeddings=embeddings, workers=1)
+    rag_engine._retriever = rag_engine.MemoryRetriever("memory/vector_store", embeddings=embeddings)
+
+
+async def run(args, telegram, pages):
+    import telegram_bot
+    import web_data_engine
+
+    # Google yerine yerel sayfa sunucusunun adresleri döner
+    web_data_engine.search = lambda query, num_results=3, lang="tr": pages.urls[:num_results]
+
+    tracker = ReplyTracker()
+    telegram.on_reply = tracker.on_reply
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    kinds = list(mix)
+    plan = [rng.choices(kinds, weights=[mix[k] for k in kinds])[0] for _ in range(args.messages)]
+
+    application = telegram_bot.build_application(base_url=telegram.base_url)
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0.0, timeout=1)
+
+        # Isınma: indeks yükleme, şablon okuma ve bağlantı havuzları ölçüme girmesin
+        for i, kind in enumerate(MESSAGES):
+            tracker.expect(i + 1, kind, time.monotonic())
+            telegram.push_message(i + 1, MESSAGES[kind][0])
+        if await tracker.wait(args.timeout):
+            raise SystemExit("warm-up messages were not answered; is the bot able to reach the fake servers?")
+        tracker.done.clear()
+
+        started = time.monotonic()
+        for i, kind in enumerate(plan):
+            arrival = started + i / args.rate
+            delay = arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            chat_id = 10_000 + i
+            tracker.expect(chat_id, kind, arrival)
+            telegram.push_message(chat_id, rng.choice(MESSAGES[kind]))
+        timed_out = await tracker.wait(args.timeout)
+
+        await application.updater.stop()
+        await application.stop()
+    return tracker.done, timed_out, started
+
+
+def report(args, done, timed_out, started):
+    results = {"messages": args.messages, "rate": args.rate, "timed_out": timed_out, "kinds": {}}
+    print(f"messages={args.messages} rate={args.rate}/s mix={args.mix} llm_latency={args.llm_latency}s")
+    print(f"{'kind':<9} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for kind in sorted({k for k, _, _ in done}) + ["all"]:
+        latencies = sorted(lat for k, lat, _ in done if kind in ("all", k))
+        row = {"n": len(latencies), "p50": percentile(latencies, 0.50), "p95": percentile(latencies, 0.95),
+               "p99": percentile(latencies, 0.99), "max": latencies[-1] if latencies else float("nan")}
+        results["kinds"][kind] = row
+        print(f"{kind:<9} {row['n']:>5} {row['p50']:>7.3f}s {row['p95']:>7.3f}s {row['p99']:>7.3f}s {row['max']:>7.3f}s")
+
+    elapsed = max((t for _, _, t in done), default=started) - started
+    results["throughput"] = len(done) / elapsed if elapsed > 0 else 0.0
+    print(f"throughput: {results['throughput']:.1f} msg/s over {elapsed:.1f}s, timed out: {timed_out}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=20.0, help="arriving messages per second")
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--mix", default="chat=4,search=2,briefing=1,memory=3")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-rate-limit", type=int, help="fake OpenAI requests per second before it answers 429")
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--concurrent", type=int, default=64, help="[Telegram] concurrent_updates")
+    parser.add_argument("--memory-docs", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the last replies")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stages", action="store_true", help="also print the per-stage latency breakdown")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-p95", type=float, help="exit with status 1 if the overall p95 is above this")
+    args = parser.parse_args()
+
+    openai = start_server(FakeOpenAIServer(latency=args.llm_latency, rate_limit=args.llm_rate_limit))
+    telegram = start_server(FakeTelegramServer(latency=args.telegram_latency, rate_limit=10 ** 9))
+    corpus = {}
+    for path in glob.glob(os.path.join(ROOT, "benchmarks", "corpus", "*.html")):
+        with open(path, "r", encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    pages = start_server(StaticPageServer(corpus, latency=args.page_latency))
+
+    os.environ["OPENAI_BASE_URL"] = openai.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["TELEGRAM_BOT_TOKEN"] = "123:benchmark"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        random.seed(args.seed)
+        prepare_workdir(workdir, args, openai.base_url)
+        done, timed_out, started = asyncio.run(run(args, telegram, pages))
+        os.chdir(ROOT)
+
+    results = report(args, done, timed_out, started)
+    if args.stages:
+        from metrics import format_stats
+        print()
+        print(format_stats())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if timed_out or (args.max_p95 is not None and results["kinds"]["all"]["p95"] > args.max_p95):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-query latency and RSS: load-per-call vs. the resident MemoryRetriever.
+
+Uses local fake embeddings, so no OpenAI calls are made:
+
+    python benchmarks/bench_memory_index.py --sizes 1000 5000 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.vectorstores import FAISS
+from langchain_community.embeddings import FakeEmbeddings
+
+from rag_engine import MemoryRetriever
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def build_index(path, size, embeddings):
+    texts = [f"hafıza parçası {i} - " + "lorem ipsum " * 40 for i in range(size)]
+    FAISS.from_texts(texts, embeddings).save_local(path)
+
+
+def timed(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddings(size=1536)
+    queries = [f"soru {i}" for i in range(args.queries)]
+
+    print(f"{'chunks':>8} {'mode':>10} {'p50 ms':>9} {'max ms':>9} {'rss MB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as path:
+            build_index(path, size, embeddings)
+
+            def load_per_call(q):
+                db = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+                return db.similarity_search(q, k=3)
+
+            p50, worst = timed(load_per_call, queries)
+            print(f"{size:>8} {'per-call':>10} {p50:>9.2f} {worst:>9.2f} {rss_mb():>8.1f}")
+
+            retriever = MemoryRetriever(path, embeddings=embeddings)
+            retriever.load()
+            p50, worst = timed(lambda q: retriever.search(q, k=3), queries)
+            print(f"{size:>8} {'resident':>10} {p50:>9.2f} {worst:>9.2f} {rss_mb():>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+OCR throughput on a folder of images: single process vs. the OcrEngine process pool.
+
+    python benchmarks/bench_ocr.py --images photos/
+    python benchmarks/bench_ocr.py --synthetic 24
+
+Without --images, synthetic text images are generated with Pillow. Needs
+the tesseract binary (and the tur/eng language data) to be installed.
+"""
+import argparse
+import asyncio
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from ocr_engine import OcrEngine
+from tesseract import ocr_image_bytes
+
+
+def synthetic_images(count):
+    images = []
+    for i in range(count):
+        image = Image.new("RGB", (2400, 1600), "white")
+        draw = ImageDraw.Draw(image)
+        for line in range(20):
+            draw.text((60, 60 + line * 70), f"Görsel {i} satır {line}: toplantı saat 14:30 da başlıyor", fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def load_images(directory):
+    paths = sorted(p for ext in ("*.jpg", "*.jpeg", "*.png") for p in glob.glob(os.path.join(directory, ext)))
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append(f.read())
+    return images
+
+
+async def pooled(engine, images):
+    return await asyncio.gather(*(engine.recognize(data) for data in images))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", help="folder of .jpg/.png files")
+    parser.add_argument("--synthetic", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    images = load_images(args.images) if args.images else synthetic_images(args.synthetic)
+    print(f"images={len(images)} workers={args.workers}")
+
+    start = time.perf_counter()
+    for data in images:
+        ocr_image_bytes(data)
+    single = time.perf_counter() - start
+    print(f"single process: {single:.2f}s  {len(images) / single:.2f} img/s")
+
+    engine = OcrEngine(workers=args.workers)
+    engine._get_pool().submit(int).result()  # havuzu ısıt
+    start = time.perf_counter()
+    asyncio.run(pooled(engine, images))
+    pool = time.perf_counter() - start
+    print(f"process pool:   {pool:.2f}s  {len(images) / pool:.2f} img/s  (x{single / pool:.1f})")
+
+    # Aynı görseller tekrar gönderilirse önbellekten döner
+    start = time.perf_counter()
+    asyncio.run(pooled(engine, images))
+    print(f"cached repeat:  {time.perf_counter() - start:.3f}s  {engine.stats()}")
+    engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+System prompt size: the old string concatenation vs. prompt_builder.
+
+The old get_openai_response pasted the top 3 memory chunks after the date
+and the base prompt, whatever their size. build_system_prompt takes
+[Prompt] memory_candidates chunks, drops duplicates and chunks contained
+in a kept one, and stops at the token budget. Both are measured on the
+same retrieved chunks, from a synthetic notes corpus built with
+memory_engine.build_memory in which --duplicate-share of the files also
+exist as a second export (as GPT and Claude histories of one conversation
+do):
+
+    python benchmarks/bench_prompt_size.py --candidates 3 5 8 --budgets 800 1500
+
+Uses the local embeddings of bench_hybrid_retrieval.py, so no OpenAI calls
+are made; tiktoken's cl100k_base file must already be cached when running
+fully offline.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from bench_hybrid_retrieval import ConceptEmbeddings, write_corpus
+from embedding_store import EmbeddingStore
+from memory_engine import build_memory
+from prompt_builder import MEMORY_CANDIDATES, PROMPT_MAX_TOKENS, build_system_prompt, count_tokens
+from rag_engine import MemoryRetriever
+
+BASE_PROMPT = "Sen yardımsever bir asistansın. Kullanıcının notlarını kullanarak kısa ve doğru yanıt ver."
+TODAY = "18.10.2026 Pazar 09:00"
+OLD_K = 3
+
+
+def old_prompt(chunks):
+    """System prompt exactly as the pre-builder get_openai_response assembled it."""
+    return f"TODAY: {TODAY}\n{BASE_PROMPT}\n\nRELATED MEMORY:\n" + "\n".join(chunks[:OLD_K])
+
+
+def summary(values):
+    values = sorted(values)
+    return statistics.mean(values), values[int(0.95 * (len(values) - 1))], values[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=400)
+    parser.add_argument("--per-file", type=int, default=6)
+    parser.add_argument("--duplicate-share", type=float, default=0.3, help="fraction of files exported twice")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[MEMORY_CANDIDATES])
+    parser.add_argument("--budgets", type=int, nargs="+", default=[PROMPT_MAX_TOKENS])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source_docs")
+        os.makedirs(source)
+        facts = write_corpus(source, args.notes, args.per_file, args.seed)
+        for name in sorted(os.listdir(source)):
+            if rng.random() < args.duplicate_share:
+                shutil.copy(os.path.join(source, name), os.path.join(source, "kopya_" + name))
+        embeddings = ConceptEmbeddings()
+        store = EmbeddingStore(os.path.join(tmp, "embedding_cache.sqlite"), 128)
+        build_memory(source, os.path.join(tmp, "vector_store"), embeddings=embeddings, store=store, workers=1)
+        store.close()
+
+        retriever = MemoryRetriever(os.path.join(tmp, "vector_store"), embeddings=embeddings, hybrid=False,
+                                    query_cache_entries=0)
+        queries = [rng.choice(facts)[rng.choice((1, 2))] for _ in range(args.queries)]
+        fetch = max(args.candidates + [OLD_K])
+        retrieved = [[doc.page_content for doc in retriever.search(query, k=fetch)] for query in queries]
+
+        old = [count_tokens(old_prompt(chunks)) for chunks in retrieved]
+        old_mean, old_p95, old_max = summary(old)
+        print(f"{len(queries)} queries over {len(facts)} notes, duplicate share {args.duplicate_share:.0%}")
+        print(f"{'assembly':<26} {'mean tok':>9} {'p95 tok':>8} {'max tok':>8} {'vs old':>7} {'chunks':>7} "
+              f"{'dropped':>8} {'grew':>5} {'ms':>6}")
+        print(f"{f'old (top {OLD_K})':<26} {old_mean:>9.0f} {old_p95:>8.0f} {old_max:>8.0f} {'':>7} "
+              f"{statistics.mean(min(len(c), OLD_K) for c in retrieved):>7.2f} {'':>8} {'':>5} {'':>6}")
+        for candidates in args.candidates:
+            for budget in args.budgets:
+                sizes, kept, dropped, grew = [], [], [], 0
+                start = time.perf_counter()
+                for chunks, before in zip(retrieved, old):
+                    prompt = build_system_prompt(BASE_PROMPT, TODAY, chunks[:candidates], budget=budget)
+                    sizes.append(prompt.stats["total"])
+                    kept.append(prompt.stats["candidates"] - prompt.stats["dropped"])
+                    dropped.append(prompt.stats["dropped"])
+                    grew += prompt.stats["total"] > before
+                elapsed = (time.perf_counter() - start) * 1000 / len(retrieved)
+                mean, p95, largest = summary(sizes)
+                label = f"builder k={candidates} budget={budget}"
+                print(f"{label:<26} {mean:>9.0f} {p95:>8.0f} {largest:>8.0f} {mean / old_mean - 1:>+7.0%} "
+                      f"{statistics.mean(kept):>7.2f} {statistics.mean(dropped):>8.2f} {grew:>5} {elapsed:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Cold start cost: import time of the bot and time to its first reply.
+
+Import time is measured in fresh interpreters (median of --runs), and one
+extra `python -X importtime` run breaks it down by top-level package and
+lists which heavy packages were loaded by the import alone.
+
+Time to first reply starts `main.py` against local stand-ins for the Bot
+API and OpenAI, pushes one message --delay seconds after the process was
+spawned and measures spawn -> first getUpdates ("polling") and message ->
+the bot's reply, for /start (no heavy subsystem involved) and a memory
+chat message, with and without the background pre-warm:
+
+    python benchmarks/bench_startup.py --runs 5 --delay 0 2
+
+tiktoken's cl100k_base file must already be cached when running fully
+offline.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:benchmark")
+
+from fake_servers import FakeOpenAIServer, FakeTelegramServer, start_server
+
+HEAVY = ("langchain", "langchain_openai", "faiss", "openai", "googlesearch", "bs4", "numpy", "PIL", "pytesseract")
+IMPORT_SNIPPET = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - started)\n"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+)
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+MESSAGES = {"start": "/start", "memory": "en sevdiğim kitap neydi"}
+
+SETTINGS = """[Telegram]
+stream_replies = false
+base_url = {base_url}
+
+[LLM]
+debounce = 0
+"""
+
+
+class StartupTelegramServer(FakeTelegramServer):
+    """Fake Bot API that also records when the bot first polled."""
+
+    def __init__(self):
+        super().__init__(rate_limit=10 ** 9)
+        self.first_poll = None
+        self.replied = threading.Event()
+        self.on_reply = lambda chat_id, now: self.replied.set()
+
+    def api_getUpdates(self, params):
+        if self.first_poll is None:
+            self.first_poll = time.monotonic()
+        return super().api_getUpdates(params)
+
+
+def measure_imports(args, workdir):
+    code = IMPORT_SNIPPET.format(module=args.module, heavy=HEAVY)
+    walls, loaded = [], ""
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=workdir, capture_output=True, text=True, check=True,
+                             env=dict(os.environ, PYTHONPATH=ROOT))
+        wall, loaded = out.stdout.split("\n")[:2]
+        walls.append(float(wall))
+
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=workdir, capture_output=True,
+                         text=True, check=True, env=dict(os.environ, PYTHONPATH=ROOT))
+    packages = Counter()
+    for line in out.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(4).split(".")[0]] += int(match.group(1))  # self süresi, µs
+
+    print(f"import {args.module}: median {statistics.median(walls) * 1000:.0f} ms over {args.runs} runs")
+    print(f"  heavy packages loaded by the import: {loaded or 'none'}")
+    print("  slowest packages (self time, -X importtime):")
+    for name, micros in packages.most_common(args.top):
+        print(f"    {name:<24} {micros / 1000:7.1f} ms")
+
+
+def prepare_workdir(workdir, openai_url):
+    os.makedirs(os.path.join(workdir, "prompts"))
+    with open(os.path.join(workdir, "prompts", "system_prompt.txt"), "w", encoding="utf-8") as f:
+        f.write("Sen yardımsever bir asistansın.")
+    source = os.path.join(workdir, "memory", "source_docs")
+    os.makedirs(source)
+    for i in range(20):
+        with open(os.path.join(source, f"not{i}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(f"Not {i}.{p}: en sevdiğim kitap ve yazar hakkında notlar." for p in range(6)))
+
+    from langchain_openai import OpenAIEmbeddings
+    from memory_engine import build_memory
+
+    embeddings = OpenAIEmbeddings(openai_api_key="sk-benchmark", openai_api_base=openai_url,
+                                  check_embedding_ctx_length=False)
+    build_memory(source, os.path.join(workdir, "memory", "vector_store"), embeddings=embeddings, workers=1)
+    os.makedirs(os.path.join(workdir, "config"))
+
+
+def first_reply(args, workdir, openai_url, kind, prewarm, delay):
+    """Returns (spawn -> first poll, message -> reply) in seconds, or None on timeout."""
+    telegram = start_server(StartupTelegramServer())
+    with open(os.path.join(workdir, "config", "settings.ini"), "w", encoding="utf-8") as f:
+        f.write(SETTINGS.format(base_url=telegram.base_url))
+
+    command = [sys.executable, os.path.join(ROOT, "main.py")] + ([] if prewarm else ["--no-prewarm"])
+    with open(os.path.join(workdir, "bot.log"), "w") as log:
+        spawned = time.monotonic()
+        process = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+                                   env=dict(os.environ, OPENAI_BASE_URL=openai_url))
+        try:
+            time.sleep(delay)
+            pushed = time.monotonic()
+            telegram.push_message(1, MESSAGES[kind])
+            if not telegram.replied.wait(args.timeout):
+                return None
+            replied = telegram.sent[-1][2]
+            return telegram.first_poll - spawned, replied - pushed
+        finally:
+            process.terminate()
+            process.wait()
+            telegram.shutdown()
+            telegram.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--module", default="telegram_bot", help="module whose import time is measured")
+    parser.add_argument("--top", type=int, default=12, help="packages to list in the import breakdown")
+    parser.add_argument("--delay", type=float, nargs="+", default=[0.0, 2.0],
+                        help="seconds between spawning the bot and sending the first message")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--skip-imports", action="store_true")
+    args = parser.parse_args()
+
+    openai = start_server(FakeOpenAIServer(latency=args.llm_latency))
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, openai.base_url)
+        if not args.skip_imports:
+            measure_imports(args, workdir)
+            print()
+
+        print("time to first reply (median; polling = spawn -> first getUpdates)")
+        for kind in MESSAGES:
+            for delay in args.delay:
+                for prewarm in (False, True):
+                    results = [first_reply(args, workdir, openai.base_url, kind, prewarm, delay)
+                               for _ in range(args.runs)]
+                    ok = [r for r in results if r is not None]
+                    label = f"{kind:<7} delay {delay:.1f}s {'prewarm' if prewarm else 'lazy':<8}"
+                    if not ok:
+                        print(f"  {label} no reply within {args.timeout:.0f}s (see bot.log)")
+                        with open(os.path.join(workdir, "bot.log")) as log:
+                            print(log.read()[-2000:])
+                        continue
+                    print(f"  {label} polling {statistics.median(r[0] for r in ok):5.2f}s  "
+                          f"reply {statistics.median(r[1] for r in ok):5.2f}s  "
+                          f"timed out {len(results) - len(ok)}")
+
+
+if __name__ == "__main__":
+    main()
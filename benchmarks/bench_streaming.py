@@ -0,0 +1,79 @@
+"""
+Time to first visible token: streamed replies vs. waiting for the full completion.
+
+Runs against a local fake streaming OpenAI endpoint and a stand-in Telegram
+message that records when text first becomes visible:
+
+    python benchmarks/bench_streaming.py --words 200 --token-delay 0.02
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from fake_servers import FakeOpenAIServer, start_server
+from stream_reply import StreamingReply, complete_chat
+
+
+class FakeMessage:
+    """Stand-in for telegram.Message that counts sends and edits."""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def reply_text(self, text):
+        self.log.append(("send", time.perf_counter(), len(text)))
+        return FakeMessage(self.log)
+
+    async def edit_text(self, text):
+        self.log.append(("edit", time.perf_counter(), len(text)))
+        return self
+
+
+async def run(client, stream, edit_interval):
+    log = []
+    message = FakeMessage(log)
+    started = time.perf_counter()
+    kwargs = dict(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "merhaba"}])
+    if stream:
+        reply = StreamingReply(message, edit_interval=edit_interval)
+        text = await complete_chat(client, on_delta=reply.feed, **kwargs)
+        await reply.finish(text)
+    else:
+        text = await complete_chat(client, **kwargs)
+        await message.reply_text(text)
+    total = time.perf_counter() - started
+    first_visible = log[0][1] - started
+    sends = sum(1 for kind, _, _ in log if kind == "send")
+    edits = sum(1 for kind, _, _ in log if kind == "edit")
+    return first_visible, total, sends, edits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--edit-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    reply = " ".join(f"kelime{i}" for i in range(args.words))
+    server = start_server(FakeOpenAIServer(latency=args.latency, reply=reply, token_delay=args.token_delay))
+    client = openai.AsyncOpenAI(api_key="sk-benchmark", base_url=server.base_url)
+
+    async def both():
+        return await run(client, False, args.edit_interval), await run(client, True, args.edit_interval)
+
+    blocking, streamed = asyncio.run(both())
+    print(f"{'mode':<10} {'first visible s':>16} {'total s':>8} {'sends':>6} {'edits':>6}")
+    for name, (first, total, sends, edits) in (("blocking", blocking), ("streamed", streamed)):
+        print(f"{name:<10} {first:>16.2f} {total:>8.2f} {sends:>6} {edits:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Webhook mode scaling: the same load against 1, 2, ... N worker processes.
+
+A local fake Telegram sender posts updates to the webhook front, which
+shards them by chat_id onto worker processes running the real bot; their
+replies go to the fake Bot API in this process. OpenAI and the search
+result pages are served from a separate stand-in process. /search
+queries are unique, so every one of them fetches and extracts pages:
+
+    python benchmarks/bench_webhook.py --workers 1 2 4 --messages 1000
+
+As with bench_load.py, tiktoken's cl100k_base file must already be cached
+when running fully offline.
+"""
+import argparse
+import asyncio
+import glob
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:benchmark")
+
+import httpx
+
+from bench_load import MESSAGES, ReplyTracker
+from fake_servers import FakeOpenAIServer, FakeTelegramServer, StaticPageServer, start_server
+from webhook import WebhookFront, start_workers, wait_ready
+
+# Kota ve debounce ölçümü bozmasın; sayfa indirme tek host'a gidiyor
+SETTINGS = """[Telegram]
+stream_replies = false
+concurrent_updates = 256
+
+[Fetcher]
+per_host = 64
+
+[LLM]
+debounce = 0
+max_concurrency = 256
+tokens_per_minute = 1000000000
+user_tokens_per_minute = 1000000000
+user_burst_tokens = 1000000
+"""
+
+
+def serve_stand_ins(conn, llm_latency, page_latency):
+    """Separate process: fake OpenAI + static pages, so they don't share the GIL with the front."""
+    corpus = {}
+    for path in glob.glob(os.path.join(ROOT, "benchmarks", "corpus", "*.html")):
+        with open(path, "r", encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    openai = start_server(FakeOpenAIServer(latency=llm_latency))
+    pages = start_server(StaticPageServer(corpus, latency=page_latency))
+    conn.send((openai.base_url, pages.urls))
+    threading.Event().wait()
+
+
+def init_worker(workdir, openai_url, page_urls):
+    """Runs in every worker process before the bot modules are imported."""
+    import logging
+    logging.basicConfig(level=logging.WARNING)
+    os.chdir(workdir)
+    os.environ["OPENAI_BASE_URL"] = openai_url
+
+    from langchain_openai import OpenAIEmbeddings
+    import rag_engine
+    import web_data_engine
+
+    web_data_engine.search = lambda query, num_results=3, lang="tr": page_urls[:num_results]
+    embeddings = OpenAIEmbeddings(openai_api_key="sk-benchmark", openai_api_base=openai_url,
+                                  check_embedding_ctx_length=False)
+    rag_engine._retriever = rag_engine.MemoryRetriever("memory/vector_store", embeddings=embeddings)
+
+
+def prepare_workdir(workdir, openai_url):
+    os.makedirs(os.path.join(workdir, "prompts"))
+    os.makedirs(os.path.join(workdir, "config"))
+    with open(os.path.join(workdir, "prompts", "system_prompt.txt"), "w", encoding="utf-8") as f:
+        f.write("Sen yardımsever bir asistansın.")
+    with open(os.path.join(workdir, "config", "settings.ini"), "w", encoding="utf-8") as f:
+        f.write(SETTINGS)
+    source = os.path.join(workdir, "memory", "source_docs")
+    os.makedirs(source)
+    for i in range(20):
+        with open(os.path.join(source, f"not{i}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(f"Not {i}.{p}: " + " ".join(MESSAGES["memory"]) for p in range(6)))
+
+    from langchain_openai import OpenAIEmbeddings
+    from memory_engine import build_memory
+
+    embeddings = OpenAIEmbeddings(openai_api_key="sk-benchmark", openai_api_base=openai_url,
+                                  check_embedding_ctx_length=False)
+    build_memory(source, os.path.join(workdir, "memory", "vector_store"), embeddings=embeddings, workers=1)
+
+
+def make_update(update_id, chat_id, text):
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split(" ", 1)[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+async def run(args, workers, port, telegram, workdir, openai_url, page_urls, round_no):
+    processes, urls = start_workers(workers, base_port=port + 1, base_url=telegram.base_url,
+                                    initializer=init_worker, initargs=(workdir, openai_url, page_urls))
+    front = WebhookFront(urls, secret_token="bench")
+    await front.start("127.0.0.1", port)
+    try:
+        await wait_ready(urls, timeout=120)
+        tracker = ReplyTracker()
+        telegram.on_reply = tracker.on_reply
+        rng = random.Random(args.seed)
+        topics = [text.split(" ", 1)[1] for text in MESSAGES["search"]]
+        limit = asyncio.Semaphore(args.connections)  # Telegram'ın eşzamanlı webhook bağlantıları
+
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=args.connections)) as client:
+            async def deliver(i):
+                kind = "search" if rng.random() < args.search_share else "chat"
+                chat_id = 1_000_000 * round_no + i
+                text = f"/search {rng.choice(topics)} {round_no}-{i}" if kind == "search" else rng.choice(MESSAGES["chat"])
+                async with limit:
+                    tracker.expect(chat_id, kind, time.monotonic())
+                    response = await client.post(f"http://127.0.0.1:{port}/", json=make_update(i, chat_id, text),
+                                                 headers={"X-Telegram-Bot-Api-Secret-Token": "bench"})
+                    response.raise_for_status()
+
+            started = time.monotonic()
+            await asyncio.gather(*(deliver(i) for i in range(args.messages)))
+            timed_out = await tracker.wait(args.timeout)
+        elapsed = max((t for _, _, t in tracker.done), default=started) - started
+        latencies = sorted(lat for _, lat, _ in tracker.done)
+        return {
+            "throughput": len(tracker.done) / elapsed if elapsed > 0 else 0.0,
+            "p50": statistics.median(latencies) if latencies else float("nan"),
+            "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+            "timed_out": timed_out,
+            "forwarded": list(front.stats()["forwarded"].values()),
+        }
+    finally:
+        await front.stop()
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 4])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--search-share", type=float, default=0.5, help="fraction of /search messages")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.01)
+    parser.add_argument("--connections", type=int, default=40)
+    parser.add_argument("--port", type=int, default=19300)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe()
+    context.Process(target=serve_stand_ins, args=(child, args.llm_latency, args.page_latency), daemon=True).start()
+    openai_url, page_urls = parent.recv()
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    telegram = start_server(FakeTelegramServer(rate_limit=10 ** 9))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir, openai_url)
+        # İşçiler ayarları chdir'den önce okur (bench_webhook yeniden içe aktarılırken)
+        os.environ["BOT_SETTINGS"] = os.path.join(workdir, "config", "settings.ini")
+        print(f"messages={args.messages} search_share={args.search_share} llm_latency={args.llm_latency}s")
+        baseline = None
+        for round_no, workers in enumerate(args.workers, 1):
+            port = args.port + 20 * round_no
+            r = asyncio.run(run(args, workers, port, telegram, workdir, openai_url, page_urls, round_no))
+            baseline = baseline or r["throughput"]
+            print(f"workers={workers:<3} {r['throughput']:7.1f} msg/s (x{r['throughput'] / baseline:.2f})  "
+                  f"p50 {r['p50']:.2f}s  p95 {r['p95']:.2f}s  timed out {r['timed_out']}  per worker {r['forwarded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# Benchmark'lar ve testler için yerel sahte sunucular (ağ erişimi gerektirmez)
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /v1/chat/completions and /v1/embeddings with artificial delay."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, payload):
+        """Server-sent events, one word per chunk, token_delay apart."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, word in enumerate(self.server.reply.split(" ")):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            usage = self.server.completion(payload)["usage"]
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": payload.get("model", "fake"), "choices": [], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.server.throttled():
+            self._send_json({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                            status=429, headers={"retry-after": "1"})
+            return
+        self.server.requests += 1
+        self.server.enter()
+        try:
+            time.sleep(self.server.latency)
+
+            if self.path.endswith("/chat/completions") and payload.get("stream"):
+                self._send_stream(payload)
+            elif self.path.endswith("/chat/completions"):
+                self._send_json(self.server.completion(payload))
+            elif self.path.endswith("/embeddings"):
+                self._send_json(self.server.embeddings(payload))
+            else:
+                self._send_json({"error": {"message": "not found"}}, status=404)
+        finally:
+            self.server.leave()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.5, reply="Sahte yanıt.", dimensions=64, token_delay=0.0, rate_limit=None):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.dimensions = dimensions
+        self.rate_limit = rate_limit  # saniyedeki istek; aşılınca 429 + Retry-After
+        self.requests = 0
+        self.too_many_requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0  # aynı anda işlenen en fazla istek
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def throttled(self):
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.too_many_requests += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def completion(self, payload):
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in payload.get("messages", []))
+        completion_tokens = len(self.reply.split())
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def embeddings(self, payload):
+        inputs = payload.get("input", [])
+        if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": self.vector(item)}
+                for i, item in enumerate(inputs)
+            ],
+            "model": payload.get("model", "fake"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def vector(self, item):
+        """Deterministic pseudo-embedding derived from the input text."""
+        digest = hashlib.sha256(str(item).encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128 for i in range(self.dimensions)]
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Minimal Bot API (getMe, getUpdates, sendMessage, editMessageText), answering 429 above the global rate limit."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(body or "{}")
+        return dict(parse_qsl(body))
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        params = self._params()
+        handler = getattr(self.server, "api_" + method, None)
+        if handler is None:
+            self._reply({"ok": False, "error_code": 404, "description": "Not Found"}, status=404)
+            return
+        status, payload = handler(params)
+        self._reply(payload, status=status)
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, rate_limit=30):
+        super().__init__(("127.0.0.1", 0), FakeTelegramHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.sent = []  # (chat_id, text, time)
+        self.edits = []  # (chat_id, message_id, text, time)
+        self.too_many_requests = 0
+        self.on_reply = None  # on_reply(chat_id, time): her gönderim/düzenlemede çağrılır
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._message_id = 0
+        self._updates = deque()
+        self._update_id = 0
+        self._new_update = threading.Condition(self._lock)
+
+    @property
+    def base_url(self):
+        """Pass as Bot(token, base_url=...)."""
+        return f"http://127.0.0.1:{self.server_address[1]}/bot"
+
+    def push_message(self, chat_id, text):
+        """Queue an incoming user message for getUpdates; returns its update_id."""
+        with self._lock:
+            self._update_id += 1
+            self._message_id += 1
+            message = self._message(chat_id, text, self._message_id)
+            message["from"] = {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"}
+            if text.startswith("/"):
+                command = text.split(" ", 1)[0]
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+            self._updates.append({"update_id": self._update_id, "message": message})
+            self._new_update.notify_all()
+            return self._update_id
+
+    def _message(self, chat_id, text, message_id):
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": text,
+        }
+
+    def _throttled(self, now):
+        """Sliding one-second window; call with the lock held."""
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            self.too_many_requests += 1
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                         "parameters": {"retry_after": 1}}
+        self._recent.append(now)
+        return None
+
+    def api_getMe(self, params):
+        return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}}
+
+    def api_deleteWebhook(self, params):
+        return 200, {"ok": True, "result": True}
+
+    def api_getUpdates(self, params):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._updates and self._updates[0]["update_id"] < offset:
+                self._updates.popleft()
+            while not self._updates and time.monotonic() < deadline:
+                self._new_update.wait(deadline - time.monotonic())
+                while self._updates and self._updates[0]["update_id"] < offset:
+                    self._updates.popleft()
+            result = list(self._updates)[:limit]
+        return 200, {"ok": True, "result": result}
+
+    def api_sendMessage(self, params):
+        time.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            throttled = self._throttled(now)
+            if throttled:
+                return throttled
+            self._message_id += 1
+            message_id = self._message_id
+            chat_id = int(params["chat_id"])
+            self.sent.append((chat_id, params.get("text", ""), now))
+        if self.on_reply:
+            self.on_reply(chat_id, now)
+        return 200, {"ok": True, "result": self._message(chat_id, params.get("text", ""), message_id)}
+
+    def api_editMessageText(self, params):
+        time.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            throttled = self._throttled(now)
+            if throttled:
+                return throttled
+            chat_id = int(params["chat_id"])
+            message_id = int(params["message_id"])
+            self.edits.append((chat_id, message_id, params.get("text", ""), now))
+        if self.on_reply:
+            self.on_reply(chat_id, now)
+        return 200, {"ok": True, "result": self._message(chat_id, params.get("text", ""), message_id)}
+
+
+class StaticPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        page = self.server.pages.get(self.path)
+        body = (page or "not found").encode("utf-8")
+        self.send_response(200 if page is not None else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StaticPageServer(ThreadingHTTPServer):
+    """Serves fixed HTML pages (e.g. benchmarks/corpus) in place of search result sites."""
+
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0.0):
+        super().__init__(("127.0.0.1", 0), StaticPageHandler)
+        self.pages = {"/" + name.lstrip("/"): html for name, html in pages.items()}
+        self.latency = latency
+
+    @property
+    def urls(self):
+        return [f"http://127.0.0.1:{self.server_address[1]}{path}" for path in sorted(self.pages)]
+
+
+def start_server(server):
+    """Serve in a daemon thread and return the server."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,17 @@
+# Bloklayan işleri event loop dışında çalıştırmak için ortak executor
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from settings import config
+
+BLOCKING_WORKERS = config.getint('Performance', 'blocking_workers', fallback=8)
+
+# Sınırlı havuz: FAISS yükleme, googlesearch, HTML ayrıştırma gibi işler
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking/CPU-bound call on the bounded executor and await it."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
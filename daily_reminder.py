@@ -1 +1,231 @@
-# Sabah 07:00 mesaj sistemi
\ No newline at end of file
+# Sabah 07:00 mesaj sistemi
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+from telegram.error import Forbidden, RetryAfter, TelegramError
+
+from concurrency import run_blocking
+from web_data_engine import get_daily_briefing
+from shared_state import get_backend
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE = ZoneInfo(config.get('Briefing', 'timezone', fallback='Europe/Istanbul'))
+SEND_TIME = dtime.fromisoformat(config.get('Briefing', 'send_time', fallback='07:00'))
+PREWARM_MINUTES = config.getint('Briefing', 'prewarm_minutes', fallback=5)
+JOURNAL_DIR = config.get('Briefing', 'journal_dir', fallback='memory/broadcast')
+# Telegram: toplamda ~30 mesaj/sn, aynı sohbete ~1 mesaj/sn
+GLOBAL_RATE = config.getfloat('Briefing', 'global_rate', fallback=25)
+PER_CHAT_INTERVAL = config.getfloat('Briefing', 'per_chat_interval', fallback=1.0)
+SEND_WORKERS = config.getint('Briefing', 'send_workers', fallback=16)
+MAX_RETRIES = 5
+# Zamanlanmış işler birkaç milisaniye erken/geç tetiklenebilir
+SEND_TOLERANCE = timedelta(minutes=1)
+
+
+class RateLimiter:
+    """Token bucket shared by all send workers (rate messages per second).
+
+    The burst is kept small so that no sliding one-second window sees more
+    than rate + burst messages.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Stop everyone for a while (Telegram answered with RetryAfter)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BroadcastJournal:
+    """
+    Append-only record of chats a broadcast was delivered to.
+
+    A restarted broadcast with the same key skips every chat already in the
+    journal. After a crash only the messages that were in flight at that
+    moment (at most one per send worker) can be delivered twice.
+    """
+
+    def __init__(self, key, directory=JOURNAL_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.sent")
+        self.done_path = os.path.join(directory, f"{key}.done")
+        self.sent = set()
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.sent.update(int(line) for line in f if line.strip())
+        self._file = open(self.path, "a")
+
+    @property
+    def finished(self):
+        return os.path.exists(self.done_path)
+
+    def record(self, chat_id):
+        self.sent.add(chat_id)
+        self._file.write(f"{chat_id}\n")
+        self._file.flush()
+
+    def finish(self):
+        with open(self.done_path, "w") as f:
+            f.write(datetime.now(TIMEZONE).isoformat())
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+
+class BroadcastSender:
+    """Fans a text out to many chats within Telegram's global and per-chat limits."""
+
+    def __init__(self, bot, rate=GLOBAL_RATE, workers=SEND_WORKERS, per_chat_interval=PER_CHAT_INTERVAL):
+        self.bot = bot
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self.per_chat_interval = per_chat_interval
+        self._last_sent = {}
+        self.stats = {"sent": 0, "skipped": 0, "failed": 0, "blocked": 0, "retries": 0, "seconds": 0.0}
+
+    async def _send(self, chat_id, text):
+        for attempt in range(MAX_RETRIES):
+            wait = self._last_sent.get(chat_id, 0) + self.per_chat_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.limiter.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                self._last_sent[chat_id] = time.monotonic()
+                return "sent"
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self.limiter.pause(retry_after)
+                self.stats["retries"] += 1
+            except Forbidden:
+                return "blocked"
+            except TelegramError as e:
+                logger.warning("Broadcast to %s failed (attempt %d): %s", chat_id, attempt + 1, e)
+                self.stats["retries"] += 1
+                await asyncio.sleep(2 ** attempt)
+        return "failed"
+
+    async def broadcast(self, chat_ids, text, journal=None, on_blocked=None):
+        """Send text to every chat id not already in the journal; returns stats."""
+        started = time.perf_counter()
+        queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            if journal is not None and chat_id in journal.sent:
+                self.stats["skipped"] += 1
+            else:
+                queue.put_nowait(chat_id)
+
+        async def worker():
+            while True:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                result = await self._send(chat_id, text)
+                self.stats[result] += 1
+                if result == "sent" and journal is not None:
+                    journal.record(chat_id)
+                elif result == "blocked" and on_blocked is not None:
+                    await run_blocking(on_blocked, chat_id)
+
+        await asyncio.gather(*(worker() for _ in range(self.workers)))
+        self.stats["seconds"] = time.perf_counter() - started
+        return self.stats
+
+
+# --- Bot job queue entegrasyonu ---
+
+def _today_key():
+    return datetime.now(TIMEZONE).strftime("briefing-%Y-%m-%d")
+
+
+def _send_key(upcoming):
+    """
+    Key of the broadcast a job running now belongs to, from its send datetime.
+
+    With `upcoming` that is the next send (a pre-warm shortly before a send
+    just after midnight is for tomorrow's date), otherwise the latest send
+    that has started.
+    """
+    now = datetime.now(TIMEZONE)
+    send_at = datetime.combine(now.date(), SEND_TIME, tzinfo=TIMEZONE)
+    if upcoming and send_at < now - SEND_TOLERANCE:
+        send_at += timedelta(days=1)
+    elif not upcoming and send_at > now + SEND_TOLERANCE:
+        send_at -= timedelta(days=1)
+    return send_at.strftime("briefing-%Y-%m-%d")
+
+
+async def _build_briefing(context, key):
+    started = time.perf_counter()
+    text = await get_daily_briefing()
+    context.bot_data["briefing"] = (key, text)
+    logger.info("Daily briefing %s built in %.2fs", key, time.perf_counter() - started)
+    return text
+
+
+async def prewarm_briefing(context):
+    """Build the next send's briefing ahead of the send time."""
+    await _build_briefing(context, _send_key(upcoming=True))
+
+
+async def send_daily_briefing(context):
+    """Deliver today's briefing to all subscribers (resumable)."""
+    key = _send_key(upcoming=False)
+    cached = context.bot_data.get("briefing")
+    text = cached[1] if cached and cached[0] == key else await _build_briefing(context, key)
+
+    journal = BroadcastJournal(key)
+    if journal.finished:
+        journal.close()
+        return
+    sender = BroadcastSender(context.bot)
+    # Abone listesi paylaşılan durumda: webhook işçileri aynı listeyi görür
+    subscribers = (await run_blocking(get_backend)).subscribers
+    chat_ids = await run_blocking(subscribers.snapshot)
+    stats = await sender.broadcast(chat_ids, text, journal=journal, on_blocked=subscribers.remove)
+    journal.finish()
+    logger.info("Daily briefing broadcast: %s", stats)
+
+
+def schedule_daily_briefing(job_queue):
+    """Register the pre-warm and send jobs; resume today's broadcast if it was interrupted."""
+    send_at = SEND_TIME.replace(tzinfo=TIMEZONE)
+    prewarm_at = (datetime.combine(datetime.now(TIMEZONE).date(), SEND_TIME) - timedelta(minutes=PREWARM_MINUTES)).time()
+    job_queue.run_daily(prewarm_briefing, time=prewarm_at.replace(tzinfo=TIMEZONE), name="briefing-prewarm")
+    job_queue.run_daily(send_daily_briefing, time=send_at, name="briefing-send")
+
+    # Bugünün gönderimi başlamış ama bitmemişse kaldığı yerden devam et
+    now = datetime.now(TIMEZONE)
+    journal_path = os.path.join(JOURNAL_DIR, f"{_today_key()}.sent")
+    done_path = os.path.join(JOURNAL_DIR, f"{_today_key()}.done")
+    if now.time() >= SEND_TIME and os.path.exists(journal_path) and not os.path.exists(done_path):
+        logger.info("Resuming interrupted daily briefing broadcast")
+        job_queue.run_once(send_daily_briefing, when=0, name="briefing-resume")
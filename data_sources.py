@@ -0,0 +1,109 @@
+# Günlük bülten için veri kaynağı katmanı: her kaynak kendi TTL'i ve zaman aşımıyla
+import asyncio
+import inspect
+import logging
+import time
+from datetime import datetime
+
+from concurrency import run_blocking
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+BRIEFING_DEADLINE = config.getfloat('Briefing', 'deadline', fallback=3.0)
+# Arka plan yenilemesi bülten süresinden bağımsızdır; yavaş kaynaklar da sonunda tazelenir
+REFRESH_TIMEOUT = config.getfloat('Briefing', 'refresh_timeout', fallback=30.0)
+
+
+class Provider:
+    """
+    One briefing section backed by `fetch` (sync or async, returns text and
+    raises on failure; error messages are rendered by render_section).
+
+    Values are cached for `ttl` seconds; the last successful value is kept
+    after it expires so it can be served as stale when a refresh is slow
+    or fails. `timeout` bounds a refresh, which keeps running in the
+    background after the briefing deadline, so it should be longer.
+    """
+
+    def __init__(self, name, fetch, ttl=300, timeout=REFRESH_TIMEOUT):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.timeout = timeout
+        self.value = None
+        self.fetched_at = 0.0
+        self._refresh = None
+
+    @property
+    def fresh(self):
+        return self.value is not None and time.time() - self.fetched_at < self.ttl
+
+    async def _fetch(self):
+        if inspect.iscoroutinefunction(self.fetch):
+            value = await asyncio.wait_for(self.fetch(), self.timeout)
+        else:
+            value = await asyncio.wait_for(run_blocking(self.fetch), self.timeout)
+        self.value, self.fetched_at = value, time.time()
+        return value
+
+    def refresh(self):
+        """Start (or join) a background refresh and return its task."""
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._fetch())
+            self._refresh.add_done_callback(self._log_failure)
+        return self._refresh
+
+    def _log_failure(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Briefing source %s failed: %s", self.name, task.exception())
+
+
+class SectionResult:
+    def __init__(self, name, text, stale=False, fetched_at=None):
+        self.name = name
+        self.text = text
+        self.stale = stale
+        self.fetched_at = fetched_at
+
+
+class BriefingAssembler:
+    """
+    Queries all providers concurrently and waits at most `deadline` seconds.
+
+    Sections that miss the deadline (or fail) are filled with their last
+    known value, marked stale, while the refresh keeps running in the
+    background for the next briefing.
+    """
+
+    def __init__(self, providers, deadline=BRIEFING_DEADLINE):
+        self.providers = providers
+        self.deadline = deadline
+
+    async def collect(self, names=None):
+        """SectionResults of all providers, or only those in `names`, in provider order."""
+        providers = [p for p in self.providers if names is None or p.name in names]
+        pending = {p: p.refresh() for p in providers if not p.fresh}
+        if pending:
+            # asyncio.wait görevleri iptal etmez; geç kalanlar arka planda tamamlanır
+            await asyncio.wait(pending.values(), timeout=self.deadline)
+
+        results = []
+        for p in providers:
+            task = pending.get(p)
+            if task is None:
+                results.append(SectionResult(p.name, p.value, fetched_at=p.fetched_at))
+            elif task.done() and not task.cancelled() and task.exception() is None:
+                results.append(SectionResult(p.name, task.result(), fetched_at=p.fetched_at))
+            else:
+                results.append(SectionResult(p.name, p.value, stale=True, fetched_at=p.fetched_at or None))
+        return results
+
+
+def render_section(section: SectionResult, unavailable: str) -> str:
+    if section.text is None:
+        return unavailable
+    if section.stale:
+        when = datetime.fromtimestamp(section.fetched_at).strftime("%H:%M")
+        return f"{section.text.rstrip()}\n⏳ (güncellenemedi, {when} verisi)"
+    return section.text
@@ -0,0 +1,68 @@
+# Parça hash'i -> embedding kalıcı deposu (aynı parça iki kez embed edilmez)
+import hashlib
+import sqlite3
+from array import array
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    SQLite-backed cache of chunk embeddings, keyed on (model, chunk hash).
+
+    `embed` only sends chunks that are not already stored to the
+    embedding model, in batches of `batch_size`.
+    """
+
+    def __init__(self, path="memory/embedding_cache.sqlite", batch_size=128):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+
+    def _get_many(self, model, hashes):
+        found = {}
+        unique = list(set(hashes))
+        # SQLite parametre sınırına takılmamak için parça parça sorgula
+        for i in range(0, len(unique), 500):
+            part = unique[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                [model, *part],
+            )
+            for h, blob in rows:
+                found[h] = array("f", blob).tolist()
+        return found
+
+    def embed(self, texts, embeddings):
+        """Return one vector per text, embedding only the ones not stored yet."""
+        model = getattr(embeddings, "model", type(embeddings).__name__)
+        hashes = [chunk_hash(t) for t in texts]
+        vectors = self._get_many(model, hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = text
+        missing_hashes = list(missing)
+
+        for i in range(0, len(missing_hashes), self.batch_size):
+            batch = missing_hashes[i:i + self.batch_size]
+            batch_vectors = embeddings.embed_documents([missing[h] for h in batch])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(model, h, array("f", v).tobytes()) for h, v in zip(batch, batch_vectors)],
+            )
+            self.conn.commit()
+            vectors.update(zip(batch, batch_vectors))
+
+        return [vectors[h] for h in hashes]
+
+    def close(self):
+        self.conn.close()
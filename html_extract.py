@@ -0,0 +1,157 @@
+# Tek geçişli, sınırlı iş yapan HTML metin çıkarıcı
+import re
+from html.parser import HTMLParser
+
+# İçeriği hiç okunmayan etiketler
+SKIP_TAGS = {
+    "title", "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+}
+# Asıl makale içeriğini işaret eden etiketler
+MAIN_TAGS = {"article", "main"}
+# Metni ayrı satır/parça olarak bölen blok etiketler
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6",
+    "tr", "td", "th", "table", "section", "blockquote", "pre", "figcaption", "dl", "dt", "dd",
+}
+# class/id değeri bunlardan birini içeren bloklar atlanır
+BOILERPLATE = re.compile(
+    r"(?:^|[\s_-])(?:menu|navbar|breadcrumb|cookie|consent|footer|sidebar|share|social|"
+    r"comment|related|banner|advert|ads?|promo|newsletter|popup|modal|subscribe)(?:$|[\s_-])",
+    re.IGNORECASE,
+)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Kapanış etiketi isteğe bağlı öğeler -> onları örtük olarak kapatan başlangıç etiketleri
+_P_CLOSERS = {
+    "address", "article", "aside", "blockquote", "div", "dl", "fieldset", "figure", "footer", "form",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "main", "nav", "ol", "p", "pre", "section",
+    "table", "ul",
+}
+OPTIONAL_END = {
+    "p": _P_CLOSERS,
+    "li": {"li"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "td": {"td", "th", "tr"},
+    "th": {"td", "th", "tr"},
+    "tr": {"tr"},
+    "option": {"option", "optgroup"},
+}
+
+FEED_SIZE = 16 * 1024
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Enough(Exception):
+    """Raised from the parser callbacks once enough text is collected."""
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, limit):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.main_parts = []
+        self.main_len = 0
+        self.total_len = 0
+        self.main_depth = 0
+        self.stack = []  # açık öğeler
+        self.skip_level = None  # atlanan öğenin stack'teki yeri
+
+    def handle_starttag(self, tag, attrs):
+        # <p>, <li>, <td> gibi öğeler kapanış etiketi olmadan da sonraki kardeşleriyle biter
+        while self.stack and tag in OPTIONAL_END.get(self.stack[-1], ()):
+            self._pop()
+        if tag in VOID_TAGS:
+            if tag == "br" and self.skip_level is None:
+                self._add("\n")
+            return
+        self.stack.append(tag)
+        if self.skip_level is not None:
+            return
+        # Makale içindeki <header> genelde başlığı taşır, onu atlama
+        if (tag in SKIP_TAGS and not (tag == "header" and self.main_depth)) or self._is_boilerplate(attrs):
+            self.skip_level = len(self.stack) - 1
+            return
+        if tag in MAIN_TAGS:
+            self.main_depth += 1
+        if tag in BLOCK_TAGS:
+            self._add("\n")
+
+    def handle_endtag(self, tag):
+        # Kapanış, araya kalmış kapanmamış öğeleri de kapatır; açık karşılığı olmayan yok sayılır
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i] == tag:
+                while len(self.stack) > i:
+                    self._pop()
+                return
+
+    def _pop(self):
+        tag = self.stack.pop()
+        if self.skip_level is not None:
+            if len(self.stack) == self.skip_level:
+                self.skip_level = None
+            return
+        if tag in MAIN_TAGS and self.main_depth:
+            self.main_depth -= 1
+        if tag in BLOCK_TAGS:
+            self._add("\n")
+
+    def handle_data(self, data):
+        if self.skip_level is None:
+            self._add(data)
+
+    @staticmethod
+    def _is_boilerplate(attrs):
+        for name, value in attrs:
+            if name in ("class", "id", "role") and value and BOILERPLATE.search(value):
+                return True
+        return False
+
+    def _add(self, text):
+        # Yalnızca boşluktan oluşan parçalar limite sayılmaz
+        size = len(text) if not text.isspace() else 0
+        self.parts.append(text)
+        self.total_len += size
+        if self.main_depth:
+            self.main_parts.append(text)
+            self.main_len += size
+        # Makale yeterince doldu ya da sayfa bizi fazla uğraştırıyor: dur
+        if self.main_len >= self.limit or self.total_len >= 2 * self.limit:
+            raise _Enough()
+
+
+def _normalize(parts):
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in "".join(parts).splitlines())
+    return " ".join(line for line in lines if line)
+
+
+def extract_text(html: str, limit: int = 3000, min_main: int = 200) -> str:
+    """
+    Extract readable text from HTML in a single streaming pass.
+
+    Script/style/nav and boilerplate blocks are skipped while parsing, text
+    inside <article>/<main> is preferred when there is at least `min_main`
+    characters of it, and parsing stops as soon as enough text is collected.
+    The result is cut to `limit` characters (with "...") like clean_text.
+    """
+    if not html:
+        return ""
+
+    parser = _TextExtractor(limit)
+    try:
+        for i in range(0, len(html), FEED_SIZE):
+            parser.feed(html[i:i + FEED_SIZE])
+        parser.close()
+    except _Enough:
+        pass
+    except Exception:
+        # Bozuk HTML: o ana kadar toplananı kullan
+        pass
+
+    main_text = _normalize(parser.main_parts)
+    text = main_text if len(main_text) >= min_main else _normalize(parser.parts)
+
+    if len(text) > limit:
+        text = text[:limit] + "..."
+    return text
@@ -0,0 +1,174 @@
+# Hafıza kaynakları için çok formatlı, paralel ve akış halinde ayrıştırma
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain.text_splitter import CharacterTextSplitter
+
+SUPPORTED_EXTENSIONS = (".docx", ".txt", ".md", ".pdf", ".json")
+
+_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+
+
+def _docx_table(table):
+    """Table text, one row per line and cells separated by " | "; merged cells are written once."""
+    lines = []
+    for row in table.rows:
+        cells, seen = [], set()
+        for cell in row.cells:
+            # Birleştirilmiş hücre satırda her kapladığı sütun için tekrar döner
+            if id(cell._tc) in seen:
+                continue
+            seen.add(id(cell._tc))
+            cells.append(" ".join(cell.text.split()))
+        if any(cells):
+            lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+
+def read_docx(path):
+    import docx
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(path)
+    # Paragraflar ve tablolar belgedeki sırasıyla; aralarında boş satır: CharacterTextSplitter "\n\n" ile böler
+    blocks = []
+    for child in document.element.body.iterchildren():
+        if child.tag == qn("w:p"):
+            blocks.append(Paragraph(child, document).text)
+        elif child.tag == qn("w:tbl"):
+            blocks.append(_docx_table(Table(child, document)))
+    yield "\n\n".join(blocks)
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield f.read()
+
+
+def read_pdf(path):
+    from pypdf import PdfReader
+    for page in PdfReader(path).pages:
+        yield page.extract_text() or ""
+
+
+def _chatgpt_messages(conversation):
+    """Messages of one ChatGPT export conversation, in tree order."""
+    mapping = conversation.get("mapping") or {}
+    nodes = sorted(
+        (node for node in mapping.values() if node.get("message")),
+        key=lambda node: node["message"].get("create_time") or 0,
+    )
+    for node in nodes:
+        message = node["message"]
+        role = (message.get("author") or {}).get("role", "")
+        parts = (message.get("content") or {}).get("parts") or []
+        text = "\n".join(p for p in parts if isinstance(p, str)).strip()
+        if text and role in ("user", "assistant"):
+            yield role, text
+
+
+def _claude_messages(conversation):
+    for message in conversation.get("chat_messages") or []:
+        text = message.get("text") or "\n".join(
+            c.get("text", "") for c in message.get("content") or [] if isinstance(c, dict)
+        )
+        if text.strip():
+            yield message.get("sender", ""), text.strip()
+
+
+def read_chat_export(path):
+    """GPT (conversations.json with 'mapping') and Claude ('chat_messages') exports, one text per conversation."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    conversations = data if isinstance(data, list) else [data]
+    for conversation in conversations:
+        if not isinstance(conversation, dict):
+            continue
+        if "mapping" in conversation:
+            messages = _chatgpt_messages(conversation)
+        elif "chat_messages" in conversation:
+            messages = _claude_messages(conversation)
+        else:
+            continue
+        title = conversation.get("title") or conversation.get("name") or ""
+        lines = [f"# {title}"] if title else []
+        lines.extend(f"{role}: {text}" for role, text in messages)
+        yield "\n\n".join(lines)
+
+
+READERS = {
+    ".docx": read_docx,
+    ".txt": read_text,
+    ".md": read_text,
+    ".pdf": read_pdf,
+    ".json": read_chat_export,
+}
+
+
+def file_hash(path):
+    """SHA-256 of the file contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_file(path):
+    """Parse and chunk one file (runs in a worker process). Returns a list of chunk texts."""
+    reader = READERS[os.path.splitext(path)[1].lower()]
+    chunks = []
+    for text in reader(path):
+        if text.strip():
+            chunks.extend(_splitter.split_text(text))
+    return chunks
+
+
+def iter_source_files(directory):
+    """Supported files under directory, as paths relative to it, in a stable order."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.relpath(os.path.join(root, name), directory)
+
+
+def parse_stream(paths, workers=None, window=None):
+    """
+    Yield (path, chunks) for each path, parsed in a process pool.
+
+    At most `window` files are parsed ahead of the consumer, so memory stays
+    bounded no matter how large the corpus is. Results come back in input
+    order; a file that fails to parse yields (path, exception).
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 2
+    paths = iter(paths)
+    if workers == 1:
+        for path in paths:
+            try:
+                yield path, parse_file(path)
+            except Exception as e:
+                yield path, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(parse_file, path)))
+            if len(pending) >= window:
+                yield _result(*pending.popleft())
+        while pending:
+            yield _result(*pending.popleft())
+
+
+def _result(path, future):
+    try:
+        return path, future.result()
+    except Exception as e:
+        return path, e
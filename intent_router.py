@@ -0,0 +1,118 @@
+# Türkçe'ye duyarlı niyet yönlendirici: kural tablosu tek bir desene derlenir
+import re
+from collections import namedtuple
+
+from text_utils import turkish_lower
+
+WEB_SEARCH = "web_search"
+BRIEFING = "briefing"
+MEMORY_CHAT = "memory_chat"
+OCR = "ocr"
+
+# Sona eklenebilecek yaygın Türkçe ekler ("dolar~" -> doları, dolarda, dolarların, "bugün~" -> bugünkü...)
+SUFFIX = (
+    r"(?:'?(?:[ıiuü]|k[iü]|[yns][ıiuü]|[ıiuü]n|n[ıiuü]n|[ae]|[yn][ae]|[dt][ae]|[dt][ae]n|[dt][ae]ki|"
+    r"s[ıiuü]|s[ıiuü]n[ıiuü]n|s[ıiuü]nd[ae]|s[ıiuü]nd[ae]n|s[ıiuü]n[ae]|nd[ae]|nd[ae]n|"
+    r"l[ae]r|l[ae]r[ıi]|l[ae]r[ıi]n|l[ae]rd[ae]|l[ae]rd[ae]n|m[ıiuü]z|d[ıiuü]r))?"
+)
+
+# intent -> [(anahtar, ağırlık)]
+# "~" Türkçe ek kabul eder, "re:" ile başlayanlar düz regex'tir; hepsi kelime sınırına bakar.
+INTENT_RULES = {
+    WEB_SEARCH: [
+        ("savaş~", 2), ("son durum~", 3), ("son dakika", 3), ("bugün~", 2), ("dün~", 2),
+        ("enflasyon~", 2), ("deprem~", 2), ("güncel", 2), ("zam~", 2), ("seçim~", 2),
+        ("borsa~", 2), ("iran~", 2), ("israil~", 2), ("ukrayna~", 2), ("rusya~", 2),
+        ("abd~", 2), ("çin~", 2), ("türkiye~", 1), ("gelişme~", 2), ("olay~", 1),
+        ("kriz~", 2), ("anlaşma~", 2), ("toplantı~", 1), ("zirve~", 2), ("bu ay", 1),
+        ("bu hafta", 1), ("acil", 1), ("önemli", 1), ("haber~", 2), ("gündem~", 1),
+        ("dolar~", 1), ("euro~", 1), ("altın~", 1), ("kur~", 1),
+        (r"re:20[0-9]{2}", 1),
+    ],
+    BRIEFING: [
+        ("hava~", 3), ("hava durumu~", 4), ("piyasa~", 2), ("bülten~", 4), ("günlük", 2),
+        ("döviz~", 3), ("gündem~", 1), ("haber~", 1), ("dolar~", 2), ("euro~", 2),
+        ("altın~", 2), ("kur~", 2), ("dünya~", 1), ("özet~", 1),
+    ],
+    OCR: [
+        ("fotoğraf~", 2), ("resim~", 2), ("görsel~", 2), ("ekran görüntüsü~", 3),
+        ("yazıyı oku", 3), ("ocr", 3),
+    ],
+    # Geçmişe dönük sohbet: "dün sana ne anlatmıştım" hafızaya gider, web'e değil
+    MEMORY_CHAT: [
+        (r"re:hatırl\w*", 3), (r"re:(?:anlatm|söylem|dem)[ıi]şt[ıi]m\w*", 3),
+    ],
+}
+
+# Puanlar eşitse öncelik sırası (eski davranış: önce web, sonra bülten)
+PRIORITY = {OCR: 3, WEB_SEARCH: 2, BRIEFING: 1, MEMORY_CHAT: 0}
+
+# Bu puanın altındaki eşleşmeler (ör. tek başına "dolar" ya da "olay") varsayılan niyete düşer
+MIN_SCORE = 2
+
+IntentMatch = namedtuple("IntentMatch", ["intent", "score", "keywords"])
+
+
+def _keyword_pattern(keyword):
+    if keyword.startswith("re:"):
+        return keyword[3:]
+    suffix = keyword.endswith("~")
+    words = turkish_lower(keyword.rstrip("~")).split()
+    pattern = r"\s+".join(re.escape(w) for w in words)
+    return pattern + SUFFIX if suffix else pattern
+
+
+class IntentRouter:
+    """
+    Compiles the rule table once into a single regex and scores every
+    intent in one pass over the (Turkish-lowercased) message.
+    """
+
+    def __init__(self, rules=INTENT_RULES, priority=PRIORITY, default=MEMORY_CHAT, min_score=MIN_SCORE):
+        self.priority = priority
+        self.min_score = min_score
+        self.default = default
+        self._groups = {}  # group name -> (keyword, [(intent, weight)])
+        by_keyword = {}
+        for intent, keywords in rules.items():
+            for keyword, weight in keywords:
+                by_keyword.setdefault(keyword, []).append((intent, weight))
+
+        alternatives = []
+        # Uzun anahtarlar önce denensin ("hava durumu" > "hava")
+        for i, keyword in enumerate(sorted(by_keyword, key=len, reverse=True)):
+            name = f"k{i}"
+            self._groups[name] = (keyword.rstrip("~"), by_keyword[keyword])
+            alternatives.append(f"(?P<{name}>{_keyword_pattern(keyword)})")
+        self._pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)")
+
+    def route(self, message: str, has_photo: bool = False):
+        """Return IntentMatch list, best first; the default intent is always last.
+
+        Intents scoring below min_score are left out.
+        """
+        scores = {}
+        for match in self._pattern.finditer(turkish_lower(message or "")):
+            keyword, targets = self._groups[match.lastgroup]
+            for intent, weight in targets:
+                score, keywords = scores.get(intent, (0, []))
+                keywords.append(keyword)
+                scores[intent] = (score + weight, keywords)
+        if has_photo:
+            score, keywords = scores.get(OCR, (0, []))
+            scores[OCR] = (score + 100, keywords)
+
+        ranked = sorted(
+            (IntentMatch(intent, score, keywords) for intent, (score, keywords) in scores.items()
+             if score >= self.min_score),
+            key=lambda m: (m.score, self.priority.get(m.intent, 0)),
+            reverse=True,
+        )
+        ranked.append(IntentMatch(self.default, 0, []))
+        return ranked
+
+    def top_intent(self, message: str, has_photo: bool = False) -> str:
+        return self.route(message, has_photo)[0].intent
+
+
+router = IntentRouter()
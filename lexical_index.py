@@ -0,0 +1,148 @@
+# Hafıza parçaları için yerel BM25 anahtar kelime indeksi (SQLite ters indeks)
+import math
+import sqlite3
+import threading
+from collections import Counter, namedtuple
+
+from settings import config
+from text_utils import normalize_query
+
+# Türkçe için basit ve etkili kök bulma: kelimenin ilk N harfi (sayılar ve tarihler olduğu gibi kalır)
+STEM_LENGTH = config.getint('Memory', 'lexical_stem_length', fallback=5)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# coverage: en iyi parçanın sorgudaki terimlerin (idf ağırlıklı) ne kadarını içerdiği, 0..1
+# terms: sorgunun farklı terim sayısı
+LexicalResult = namedtuple("LexicalResult", ["ids", "scores", "coverage", "terms"])
+
+
+def tokenize(text):
+    """Turkish-aware casefolded terms, alphabetic words cut to STEM_LENGTH letters."""
+    terms = []
+    for word in normalize_query(text).split():
+        if len(word) < 2:
+            continue
+        terms.append(word[:STEM_LENGTH] if word.isalpha() else word)
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 over memory chunks, stored next to the vector index.
+
+    memory_engine.build_memory adds and deletes chunks by the same ids as
+    the FAISS docstore and commits just before publishing the new vector
+    index; hits not in the live docstore yet are skipped by the retriever.
+    The file is in WAL mode, so the rebuild's single long transaction never
+    locks readers out. Searches open one read-only connection per thread,
+    so they can run from the blocking pool while a rebuild writes.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        if not readonly:
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, length INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL, chunk TEXT NOT NULL, tf INTEGER NOT NULL, length INTEGER NOT NULL,"
+                " PRIMARY KEY (term, chunk)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk)")
+            conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+            self._local.version = None
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add(self, ids, texts):
+        """Index chunks; call commit() to make them visible to searches."""
+        conn = self._conn()
+        for chunk_id, text in zip(ids, texts):
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            conn.execute("INSERT OR REPLACE INTO chunks (id, length) VALUES (?, ?)", (chunk_id, length))
+            conn.executemany(
+                "INSERT OR REPLACE INTO postings (term, chunk, tf, length) VALUES (?, ?, ?, ?)",
+                [(term, chunk_id, tf, length) for term, tf in terms.items()],
+            )
+
+    def delete(self, ids):
+        conn = self._conn()
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            marks = ",".join("?" * len(part))
+            conn.execute(f"DELETE FROM postings WHERE chunk IN ({marks})", part)
+            conn.execute(f"DELETE FROM chunks WHERE id IN ({marks})", part)
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM postings")
+        conn.execute("DELETE FROM chunks")
+
+    def commit(self):
+        self._conn().commit()
+
+    def _collection(self, conn):
+        """(chunk count, average length), re-read only when another connection committed."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._local.version:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+            self._local.collection = (count, total / count if count else 0.0)
+            self._local.version = version
+        return self._local.collection
+
+    def search(self, query, limit=20):
+        """Best `limit` chunks by BM25, with the idf-weighted query coverage of the top one."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        conn = self._conn()
+        count, avg_length = self._collection(conn)
+        if not terms or not count:
+            return LexicalResult([], [], 0.0, len(terms))
+
+        postings = conn.execute(
+            f"SELECT term, chunk, tf, length FROM postings WHERE term IN ({','.join('?' * len(terms))})", terms
+        ).fetchall()
+        df = Counter(term for term, _, _, _ in postings)
+        # Hiç geçmeyen terim de ağırlık taşır: bilinmeyen kelimeli sorgu "emin" sayılmaz
+        idf = {t: math.log(1 + (count - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+
+        scores = Counter()
+        matched = {}
+        for term, chunk, tf, length in postings:
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            scores[chunk] += idf[term] * tf * (BM25_K1 + 1) / norm
+            matched.setdefault(chunk, set()).add(term)
+
+        best = scores.most_common(limit)
+        if not best:
+            return LexicalResult([], [], 0.0, len(terms))
+        coverage = sum(idf[t] for t in matched[best[0][0]]) / sum(idf.values())
+        return LexicalResult([c for c, _ in best], [s for _, s in best], coverage, len(terms))
+
+    def close(self):
+        """Close the connections of every thread; the index must not be searched afterwards."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,304 @@
+# OpenAI çağrıları için ortak dağıtım katmanı: bütçe, kullanıcı başına kova, adil kuyruk
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+
+from metrics import count, registry
+from prompt_builder import count_tokens
+from stream_reply import complete_chat
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = config.getint('LLM', 'max_concurrency', fallback=8)
+LLM_TOKENS_PER_MINUTE = config.getint('LLM', 'tokens_per_minute', fallback=90000)
+USER_TOKENS_PER_MINUTE = config.getint('LLM', 'user_tokens_per_minute', fallback=8000)
+USER_BURST_TOKENS = config.getint('LLM', 'user_burst_tokens', fallback=4000)
+# Yalnızca art arda gelen mesajlara uygulanır; tek mesaj beklemeden gider
+DEBOUNCE = config.getfloat('LLM', 'debounce', fallback=0.6)
+MAX_RETRIES = config.getint('LLM', 'max_retries', fallback=3)
+COMPLETION_TOKENS = config.getint('LLM', 'completion_tokens', fallback=500)  # max_tokens yoksa tahmin
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill(time.monotonic())
+        amount = min(amount, self.capacity)  # kapasiteden büyük istekler de sonunda geçebilsin
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill(time.monotonic())
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount):
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    @property
+    def full(self):
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class _Job:
+    __slots__ = ("key", "cost", "call", "future", "retryable", "enqueued", "attempts")
+
+    def __init__(self, key, cost, call, future, retryable=None):
+        self.key = key
+        self.cost = cost
+        self.call = call
+        self.future = future
+        self.retryable = retryable
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+
+
+def _retry_after(error):
+    """Retry-After from an OpenAI 429 response, or None for other errors."""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LLMDispatcher:
+    """
+    Every outbound completion goes through here.
+
+    Requests wait in one queue per user (chat) and are dispatched round
+    robin across users, so one busy chat cannot starve the others. A job
+    starts only when its user's token bucket, the global tokens-per-minute
+    budget and a concurrency slot all allow it. On a 429 the concurrency
+    limit is halved, dispatch pauses for Retry-After (or an exponential
+    backoff) and the job is retried at the head of its queue, unless part
+    of its stream already reached the user; successes grow the limit back
+    one slot at a time.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 user_tokens_per_minute=USER_TOKENS_PER_MINUTE, user_burst=USER_BURST_TOKENS,
+                 debounce=DEBOUNCE, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.budget = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.user_rate = user_tokens_per_minute / 60
+        self.user_burst = user_burst
+        self.debounce = debounce
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.coalesced = 0
+        self._queues = {}  # key -> deque[_Job]
+        self._ready = deque()  # sırası gelen kullanıcılar (round robin)
+        self._users = {}  # key -> TokenBucket
+        self._paused_until = 0.0
+        self._strikes = 0
+        self._successes = 0
+        self._timer = None
+        self._bursts = {}  # key -> (sıra no, [mesajlar])
+        self._last_message = {}  # key -> son mesajın zamanı
+
+    async def coalesce(self, key, text):
+        """
+        Debounce a burst of messages from one chat.
+
+        A message that follows the chat's previous one by at least
+        `debounce` seconds is returned at once. Otherwise it is buffered and
+        this call waits `debounce` seconds; if the chat sent another message
+        meanwhile it returns None (the later call answers for both), else
+        all buffered messages joined into one prompt.
+        """
+        if self.debounce <= 0:
+            return text
+        now = time.monotonic()
+        last = self._last_message.get(key)
+        if len(self._last_message) > 10000:
+            self._last_message = {k: t for k, t in self._last_message.items() if now - t < self.debounce}
+        self._last_message[key] = now
+        if key not in self._bursts and (last is None or now - last >= self.debounce):
+            return text
+        seq, texts = self._bursts.get(key, (0, []))
+        texts.append(text)
+        self._bursts[key] = (seq + 1, texts)
+        await asyncio.sleep(self.debounce)
+        if self._bursts[key][0] != seq + 1:
+            self.coalesced += 1
+            count("llm.coalesced")
+            return None
+        del self._bursts[key]
+        return "\n".join(texts)
+
+    async def chat(self, key, client, on_delta=None, **kwargs):
+        """complete_chat() through the queue; the cost is the estimated prompt + completion tokens."""
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+        cost = prompt_tokens + kwargs.get("max_tokens", COMPLETION_TOKENS)
+        if on_delta is None:
+            return await self.submit(key, cost, lambda: complete_chat(client, **kwargs))
+
+        delivered = False
+
+        async def relay(piece):
+            nonlocal delivered
+            delivered = True
+            await on_delta(piece)
+
+        # Akışın bir kısmı kullanıcıya ulaştıysa tekrar denemek parçaları yineler
+        return await self.submit(key, cost, lambda: complete_chat(client, on_delta=relay, **kwargs),
+                                 retryable=lambda: not delivered)
+
+    async def submit(self, key, cost, call, retryable=None):
+        """
+        Queue `call` (a coroutine function) for user `key` and return its result.
+
+        `retryable()`, when given, is asked before a rate-limited call is
+        retried; returning False fails the job with the 429 instead.
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(key, cost, call, future, retryable)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._ready.append(key)
+        queue.append(job)
+        self._pump()
+        return await future
+
+    def _bucket(self, key):
+        bucket = self._users.get(key)
+        if bucket is None:
+            if len(self._users) > 10000:
+                # Dolmuş (boşta) kovaları at; yeniden oluşturmak aynı sonucu verir
+                self._users = {k: b for k, b in self._users.items() if not b.full}
+            bucket = self._users[key] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def _wake(self, delay):
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            if self._timer.when() <= loop.time() + delay:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._pump()
+
+    def _pump(self):
+        """Start as many queued jobs as the limits allow."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            self._wake(self._paused_until - now)
+            return
+        while self.in_flight < self.limit and self._ready:
+            user_wait = None
+            for _ in range(len(self._ready)):
+                key = self._ready[0]
+                self._ready.rotate(-1)
+                queue = self._queues[key]
+                while queue and queue[0].future.done():  # vazgeçilen istekler
+                    queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                    self._ready.remove(key)
+                    continue
+                job = queue[0]
+                wait = self._bucket(key).wait_time(job.cost)
+                if wait > 0:
+                    user_wait = wait if user_wait is None else min(user_wait, wait)
+                    continue
+                wait = self.budget.wait_time(job.cost)
+                if wait > 0:
+                    self._wake(wait)
+                    return
+                self._bucket(key).take(job.cost)
+                self.budget.take(job.cost)
+                queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                    self._ready.remove(key)
+                self.in_flight += 1
+                asyncio.ensure_future(self._run(job))
+                break
+            else:
+                if user_wait is not None:
+                    self._wake(user_wait)
+                return
+
+    async def _run(self, job):
+        registry.observe("llm.queue_wait", time.monotonic() - job.enqueued)
+        try:
+            result = await job.call()
+        except Exception as e:
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                self._on_rate_limited(retry_after)
+            if (retry_after is not None and job.attempts < self.max_retries
+                    and (job.retryable is None or job.retryable())):
+                job.attempts += 1
+                self._bucket(job.key).give(job.cost)  # kullanıcının suçu değil, tekrar denemesi ücretsiz
+                queue = self._queues.get(job.key)
+                if queue is None:
+                    queue = self._queues[job.key] = deque()
+                    self._ready.appendleft(job.key)
+                queue.appendleft(job)
+            elif not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._on_success()
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            self._pump()
+
+    def _on_rate_limited(self, retry_after):
+        self.rate_limited += 1
+        count("llm.rate_limited")
+        self._strikes += 1
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+        backoff = retry_after or min(60.0, 0.5 * 2 ** self._strikes) * random.uniform(0.8, 1.2)
+        self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+        logger.warning("OpenAI rate limited; concurrency limit %d, pausing %.1fs", self.limit, backoff)
+
+    def _on_success(self):
+        self._strikes = 0
+        if self.limit < self.max_concurrency:
+            self._successes += 1
+            if self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+
+    def stats(self):
+        return {
+            "queued": sum(len(q) for q in self._queues.values()),
+            "waiting_users": len(self._queues),
+            "in_flight": self.in_flight,
+            "limit": self.limit,
+            "budget_tokens": int(self.budget.tokens),
+            "rate_limited": self.rate_limited,
+            "coalesced": self.coalesced,
+        }
+
+
+dispatcher = LLMDispatcher()
@@ -1 +1,31 @@
-# Ana GPT çağrısını ve hafıza yönetimini içerir.
\ No newline at end of file
+# Botun giriş noktası: polling (varsayılan) veya webhook modunda başlatır
+import argparse
+import os
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the Telegram bot. Options after 'webhook' are passed to webhook.py "
+                    "(e.g. --workers 4 --url https://example.com/bot).")
+    parser.add_argument("mode", nargs="?", choices=("polling", "webhook"), default="polling")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="don't load the heavy subsystems in the background after start-up")
+    args, rest = parser.parse_known_args(argv)
+    if rest and args.mode != "webhook":
+        parser.error("unrecognized arguments: " + " ".join(rest))
+
+    if args.no_prewarm:
+        # Ortam değişkeni webhook işçi süreçlerine de geçer
+        os.environ["BOT_PREWARM"] = "0"
+
+    # Bot modülleri ancak mod seçilince içe aktarılır; --help anında döner
+    if args.mode == "webhook":
+        import webhook
+        webhook.main(rest)
+    else:
+        import telegram_bot
+        telegram_bot.main()
+
+
+if __name__ == "__main__":
+    main()
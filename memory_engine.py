@@ -1,36 +1,213 @@
 # Claude ve GPT geçmişinden vektör veri oluşturur
+import argparse
+import json
+import logging
 import os
-from langchain_openai import OpenAIEmbeddings
+import shutil
+import faiss
 from langchain.vectorstores import FAISS
-from langchain.document_loaders import Docx2txtLoader
-from langchain.text_splitter import CharacterTextSplitter
-
-# Load OpenAI API key from config or environment
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    from configparser import ConfigParser
-    config = ConfigParser()
-    config.read('config/settings.ini')
-    OPENAI_API_KEY = config.get('OpenAI', 'api_key', fallback=None)
-
-if not OPENAI_API_KEY:
-    raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY in your environment or config/settings.ini.")
-
-def build_memory(directory="memory/source_docs", index_path="memory/vector_store"):
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    all_text = ""
-
-    for filename in os.listdir(directory):
-        if filename.endswith(".docx"):
-            doc = Docx2txtLoader(os.path.join(directory, filename)).load()
-            for page in doc:
-                all_text += page.page_content + "\n"
-
-    splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    texts = splitter.split_text(all_text)
-    faiss_index = FAISS.from_texts(texts, embeddings)
-    faiss_index.save_local(index_path)
+from embedding_store import EmbeddingStore
+from ingest import file_hash, iter_source_files, parse_stream
+from lexical_index import LexicalIndex
+from rag_engine import ANN_INDEX_FILE, CURRENT_FILE, GENERATION_PREFIX, INDEX_FILES, LEXICAL_FILE, current_index_dir
+from settings import get_embeddings
+from vector_index import INDEX_TYPE, INDEX_TYPES, build_index, flat_vectors
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+def load_manifest(index_path):
+    # Manifest, tarif ettiği indeksle aynı nesil klasöründedir
+    directory = current_index_dir(index_path)
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path) or not os.path.exists(os.path.join(directory, "index.faiss")):
+        return {"files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def build_memory(directory="memory/source_docs", index_path="memory/vector_store", embeddings=None, store=None,
+                 workers=None, batch_size=128, progress=None, index_type=INDEX_TYPE):
+    """
+    Incrementally (re)build the FAISS index from the source documents.
+
+    Every supported file under `directory` (.docx, .txt, .md, .pdf and GPT /
+    Claude .json exports) is compared by content hash; only new or changed
+    files are parsed, in a process pool, and streamed into the index in
+    batches of `batch_size` chunks (small files are combined, so every batch
+    but the last is full), so memory stays flat however large the
+    corpus is. Vectors of removed or changed files are deleted. Chunk
+    embeddings are kept in an EmbeddingStore so identical chunks are never
+    embedded twice. `progress(done, total, path)` is called after each file.
+
+    The flat index is always kept (it is what incremental updates edit);
+    for any other `index_type` (ivf, hnsw, pq) an ANN index is rebuilt from
+    it and saved next to it for MemoryRetriever to search. A BM25 keyword
+    index (lexical.sqlite) is kept in step with the same chunk ids, and
+    filled from the existing docstore the first time it is missing.
+    Returns a dict with the number of added, removed, unchanged and failed files.
+    """
+    embeddings = embeddings or get_embeddings()
+    store = store or EmbeddingStore(os.path.join(os.path.dirname(index_path) or ".", "embedding_cache.sqlite"), batch_size)
+
+    manifest = load_manifest(index_path)
+    old_files = manifest["files"]
+    new_files = {}
+    stats = {"added": 0, "removed": 0, "unchanged": 0, "failed": 0}
+
+    # Yalnızca dosya adları ve hash'ler bellekte tutulur; içerik akış halinde işlenir
+    changed = []
+    for name in iter_source_files(directory):
+        digest = file_hash(os.path.join(directory, name))
+        previous = old_files.get(name)
+        if previous and previous["hash"] == digest:
+            new_files[name] = previous
+            stats["unchanged"] += 1
+        else:
+            changed.append((name, digest))
+
+    digests = dict(changed)
+    stale_ids = []
+    for name, previous in old_files.items():
+        if name not in new_files and name not in digests:
+            stale_ids.extend(previous["ids"])
+            stats["removed"] += 1
+
+    os.makedirs(index_path, exist_ok=True)
+    lexical = LexicalIndex(os.path.join(index_path, LEXICAL_FILE))
+    try:
+        if not old_files:
+            lexical.clear()  # vektör indeksi baştan kuruluyor; eski parçalar kalmasın
+        backfill = bool(old_files) and len(lexical) == 0
+        if not changed and not stale_ids and not backfill and manifest.get("index_type", "flat") == index_type:
+            return stats
+
+        faiss_index = None
+        if old_files:
+            faiss_index = FAISS.load_local(current_index_dir(index_path), embeddings, allow_dangerous_deserialization=True)
+        if backfill:
+            documents = faiss_index.docstore._dict
+            lexical.add(documents.keys(), (doc.page_content for doc in documents.values()))
+        pending = []  # (text, metadata, id), en fazla batch_size + bir dosya
+
+        def flush(final=False):
+            nonlocal faiss_index
+            # Yalnızca dolu partiler gönderilir; artan parçalar sonraki dosyalarınkilerle birleşir
+            while len(pending) >= batch_size or (final and pending):
+                part = pending[:batch_size]
+                del pending[:batch_size]
+                texts = [text for text, _, _ in part]
+                vectors = store.embed(texts, embeddings)
+                pairs = list(zip(texts, vectors))
+                metadatas = [meta for _, meta, _ in part]
+                ids = [chunk_id for _, _, chunk_id in part]
+                if faiss_index is None:
+                    faiss_index = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=ids)
+                else:
+                    faiss_index.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+                lexical.add(ids, texts)
+
+        paths = (os.path.join(directory, name) for name, _ in changed)
+        for done, (path, chunks) in enumerate(parse_stream(paths, workers=workers), 1):
+            name = os.path.relpath(path, directory)
+            previous = old_files.get(name)
+            if isinstance(chunks, Exception):
+                logger.warning("Could not parse %s: %s", name, chunks)
+                stats["failed"] += 1
+                if previous:
+                    new_files[name] = previous  # eski vektörler yerinde kalır
+            else:
+                if previous:
+                    stale_ids.extend(previous["ids"])
+                digest = digests[name]
+                ids = [f"{name}:{digest[:12]}:{i}" for i in range(len(chunks))]
+                pending.extend((text, {"source": name}, chunk_id) for text, chunk_id in zip(chunks, ids))
+                new_files[name] = {"hash": digest, "ids": ids}
+                stats["added"] += 1
+                flush()
+            if progress:
+                progress(done, len(changed), name)
+        flush(final=True)
+
+        if faiss_index is None:
+            return stats
+        if stale_ids:
+            faiss_index.delete(stale_ids)
+            lexical.delete(stale_ids)
+
+        # BM25 önce kaydedilir: nesil değişmeden çökülürse sonraki derleme aynı kimliklerle onu düzeltir,
+        # arada docstore'da olmayan kimlikler aramada atlanır
+        lexical.commit()
+        save_index(faiss_index, index_path, index_type, manifest={"files": new_files, "index_type": index_type})
+        return stats
+    finally:
+        # Erken dönüşlerde ve hatada da; commit edilmemiş değişiklikler geri alınır
+        lexical.close()
+
+def _generations(index_path):
+    """Generation directory names under index_path, oldest first."""
+    return sorted(name for name in os.listdir(index_path)
+                  if name.startswith(GENERATION_PREFIX) and os.path.isdir(os.path.join(index_path, name)))
+
+def save_index(faiss_index, index_path, index_type="flat", manifest=None):
+    """Write a complete new generation directory, then point CURRENT at it.
+
+    CURRENT is replaced atomically, so the bot's MemoryRetriever always
+    loads index.faiss, index.pkl and index.ann of the same build, and
+    build_memory's `manifest` is published together with them. The
+    generation it replaced is kept for readers still opening it; older
+    ones (and index files of the pre-generation layout) are removed.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    previous = current_index_dir(index_path)
+    generations = _generations(index_path)
+    number = int(generations[-1][len(GENERATION_PREFIX):]) + 1 if generations else 1
+    name = f"{GENERATION_PREFIX}{number:06d}"
+    directory = os.path.join(index_path, name)
+
+    faiss_index.save_local(directory)
+    ann_index = build_index(flat_vectors(faiss_index.index), index_type) if index_type != "flat" else None
+    if ann_index is not None:
+        faiss.write_index(ann_index, os.path.join(directory, ANN_INDEX_FILE))
+    if manifest is not None:
+        save_manifest(manifest, directory)
+
+    current_path = os.path.join(index_path, CURRENT_FILE)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(current_path + ".tmp", current_path)
+
+    # Yarım kalmış derlemeler dahil eski nesilleri temizle
+    for old in generations:
+        if os.path.join(index_path, old) != previous:
+            shutil.rmtree(os.path.join(index_path, old), ignore_errors=True)
+    if previous != index_path:  # eski düzenin dosyaları bir derleme daha tutulur
+        for old in INDEX_FILES + (ANN_INDEX_FILE, MANIFEST_NAME):
+            if os.path.exists(os.path.join(index_path, old)):
+                os.remove(os.path.join(index_path, old))
+
+def _print_progress(done, total, path):
+    print(f"\r[{done}/{total}] {path[-60:]:<60}", end="" if done < total else "\n", flush=True)
 
 if __name__ == "__main__":
-    build_memory()
+    parser = argparse.ArgumentParser(description="Build the memory index from source documents.")
+    parser.add_argument("--source", default="memory/source_docs")
+    parser.add_argument("--index", default="memory/vector_store")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=128, help="chunks per embedding request")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE,
+                        help="index the bot searches: flat (exact), ivf, hnsw or pq")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stats = build_memory(args.source, args.index, workers=args.workers, batch_size=args.batch_size,
+                         progress=_print_progress, index_type=args.index_type)
     print("📚 Hafıza başarıyla oluşturuldu ve FAISS'e kaydedildi.")
+    print(f"   Yeni/değişen: {stats['added']}, silinen: {stats['removed']}, "
+          f"değişmeyen: {stats['unchanged']}, okunamayan: {stats['failed']}")
@@ -0,0 +1,292 @@
+# Aşama bazlı gecikme ölçümü: span'ler, histogramlar, sayaçlar ve Prometheus çıktısı
+import bisect
+import functools
+import inspect
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = config.getint('Metrics', 'port', fallback=0)  # 0: HTTP uç noktası kapalı
+METRICS_HOST = config.get('Metrics', 'host', fallback='127.0.0.1')
+PROFILE = config.getboolean('Metrics', 'profile', fallback=False)
+PROFILE_INTERVAL = config.getfloat('Metrics', 'profile_interval', fallback=0.01)
+PROFILE_OUTPUT = config.get('Metrics', 'profile_output', fallback='logs/profile.folded')
+
+# Saniye cinsinden üst sınırlar (Prometheus "le" kovaları)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap to update, percentiles are estimated."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                low = BUCKETS[i - 1] if i else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(low + (high - low) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Registry:
+    """Process-wide stage histograms, counters and component stats sources."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = Counter()
+        self.sources = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def register_source(self, name, stats):
+        """Expose a component's stats() dict (caches, OCR, ...) next to the stage metrics."""
+        self.sources[name] = stats
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: (h.count, h.sum, h.max, list(h.counts), h.quantile(0.5), h.quantile(0.95))
+                      for name, h in self.stages.items()}
+            counters = dict(self.counters)
+        sources = {}
+        for name, stats in self.sources.items():
+            try:
+                sources[name] = stats()
+            except Exception as e:
+                sources[name] = {"error": str(e)}
+        return stages, counters, sources
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+
+registry = Registry()
+
+
+class span:
+    """
+    Time a block and record it under `stage`:
+
+        with span("memory.search"):
+            ...
+
+    Works inside coroutines too. A block that raises is also counted as
+    `<stage>.errors`.
+    """
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry.observe(self.stage, time.perf_counter() - self.started)
+        if exc_type is not None:
+            registry.count(self.stage + ".errors")
+        return False
+
+
+def timed(stage):
+    """Decorator form of span for plain and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(stage):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    registry.count(name, value)
+
+
+def register_source(name, stats):
+    registry.register_source(name, stats)
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name).lower()
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    stages, counters, sources = registry.snapshot()
+    lines = ["# TYPE bot_stage_seconds histogram"]
+    for stage, (n, total, _, counts, _, _) in sorted(stages.items()):
+        cumulative = 0
+        for bound, c in zip(BUCKETS, counts):
+            cumulative += c
+            lines.append(f'bot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'bot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {n}')
+        lines.append(f'bot_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'bot_stage_seconds_count{{stage="{stage}"}} {n}')
+    for name, value in sorted(counters.items()):
+        metric = f"bot_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    lines.append("# TYPE bot_component gauge")
+    for source, stats in sorted(sources.items()):
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                lines.append(f'bot_component{{component="{source}",key="{key}"}} {value}')
+    lines.append(f"bot_uptime_seconds {time.time() - registry.started:.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def format_stats():
+    """Human-readable summary for the admin /stats command."""
+    stages, counters, sources = registry.snapshot()
+    uptime = int(time.time() - registry.started)
+    lines = [f"📊 Çalışma süresi: {uptime // 3600}sa {uptime % 3600 // 60}dk", "", "⏱ Aşamalar (n / p50 / p95 / max):"]
+    for stage, (n, _, high, _, p50, p95) in sorted(stages.items()):
+        lines.append(f"{stage}: {n} / {p50 * 1000:.0f} / {p95 * 1000:.0f} / {high * 1000:.0f} ms")
+    if counters:
+        lines += ["", "🔢 Sayaçlar:"]
+        lines += [f"{name}: {value}" for name, value in sorted(counters.items())]
+    if sources:
+        lines += ["", "🧩 Bileşenler:"]
+        lines += [f"{name}: {stats}" for name, stats in sorted(sources.items())]
+    return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a daemon thread; returns the server (None when port is 0)."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Metrics endpoint on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for production.
+
+    A daemon thread samples every thread's stack each `interval` seconds
+    and counts collapsed stacks; `dump()` writes them in the folded format
+    read by flamegraph.pl and speedscope. Dumps are also written every
+    `dump_every` seconds while running.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, output=PROFILE_OUTPUT, dump_every=60.0):
+        self.interval = interval
+        self.output = output
+        self.dump_every = dump_every
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            logger.info("Sampling profiler started (every %.0f ms, output %s)", self.interval * 1000, self.output)
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.dump()
+
+    def _run(self):
+        own = threading.get_ident()
+        last_dump = time.monotonic()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            if time.monotonic() - last_dump >= self.dump_every:
+                self.dump()
+                last_dump = time.monotonic()
+
+    def dump(self, path=None):
+        path = path or self.output
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+        os.replace(path + ".tmp", path)
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,100 @@
+# Fotoğraf OCR alt sistemi: süreç havuzu + görüntü hash önbelleği
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = config.getint('OCR', 'workers', fallback=max(1, (os.cpu_count() or 2) - 1))
+OCR_LANG = config.get('OCR', 'lang', fallback='tur+eng')
+OCR_MAX_SIDE = config.getint('OCR', 'max_side', fallback=1600)
+OCR_CACHE_ENTRIES = config.getint('OCR', 'cache_entries', fallback=1024)
+
+
+class OcrEngine:
+    """
+    Runs tesseract in a bounded process pool so the event loop never blocks.
+
+    Results are cached by Telegram's file_unique_id (checked before the file
+    is even downloaded) and by the SHA-256 of the image bytes, so a
+    forwarded or re-sent image is never recognized twice. Concurrent
+    requests for the same image share one OCR run.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, lang=OCR_LANG, max_side=OCR_MAX_SIDE, cache_entries=OCR_CACHE_ENTRIES):
+        self.workers = workers
+        self.lang = lang
+        self.max_side = max_side
+        self.cache_entries = cache_entries
+        self.hits = 0
+        self.misses = 0
+        self._pool = None
+        self._cache = OrderedDict()  # file_unique_id veya sha256 -> metin
+        self._inflight = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            # fork çok iş parçacıklı süreçte başka bir thread'in tuttuğu kilidi kopyalayıp kilitlenebilir
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def cached(self, file_unique_id):
+        """Return the cached text for a Telegram file_unique_id, if any."""
+        text = self._cache.get(file_unique_id)
+        if text is not None:
+            self._cache.move_to_end(file_unique_id)
+            self.hits += 1
+        return text
+
+    def _remember(self, keys, text):
+        for key in keys:
+            if key:
+                self._cache[key] = text
+                self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    async def recognize(self, data: bytes, file_unique_id=None) -> str:
+        """OCR image bytes, using the cache and the process pool."""
+        digest = hashlib.sha256(data).hexdigest()
+        for key in (file_unique_id, digest):
+            if key and key in self._cache:
+                self.hits += 1
+                text = self._cache[key]
+                self._remember((file_unique_id, digest), text)
+                return text
+
+        inflight = self._inflight.get(digest)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        # PIL ve pytesseract yalnızca ilk fotoğrafta yüklenir
+        from tesseract import ocr_image_bytes
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), ocr_image_bytes, data, self.lang, self.max_side)
+        self._inflight[digest] = future
+        try:
+            text = await future
+        finally:
+            del self._inflight[digest]
+        self._remember((file_unique_id, digest), text)
+        return text
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+ocr_engine = OcrEngine()
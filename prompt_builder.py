@@ -0,0 +1,120 @@
+# Token bütçeli prompt oluşturucu ve önbellekli şablonlar
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+
+import tiktoken
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+# Sistem promptu (şablon + tarih + hafıza) için toplam token bütçesi
+PROMPT_MAX_TOKENS = config.getint('Prompt', 'max_tokens', fallback=1500)
+# Bütçeye sığdırılmak üzere hafızadan getirilecek aday parça sayısı; varsayılan eskisi gibi 3,
+# böylece bütçe yalnızca tekrarları ve sığmayanları atar, prompt büyümez
+MEMORY_CANDIDATES = config.getint('Prompt', 'memory_candidates', fallback=3)
+# summarize_with_gpt'ye giden web içerikleri için token bütçesi
+WEB_MAX_TOKENS = config.getint('Prompt', 'web_max_tokens', fallback=2000)
+
+_encoding = None
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _get_encoding():
+    # BPE tablosunun yüklenmesi zaman alır; ilk kullanımda (veya ön ısıtmada) yüklenir
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text))
+
+
+class TemplateCache:
+    """Reads prompt templates once and rereads them only when the file's mtime changes."""
+
+    def __init__(self):
+        self._templates = {}  # path -> (mtime_ns, text)
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            self._templates[path] = (mtime, text)
+            return text
+
+
+templates = TemplateCache()
+
+
+def fit_chunks(chunks, budget, separator="\n"):
+    """
+    Greedily keep the best-ranked chunks that fit into budget tokens.
+
+    `chunks` must be ordered best first. Exact duplicates and chunks whose
+    text is already contained in a kept chunk (e.g. splitter overlap) are
+    dropped. Returns (kept chunks, tokens used, number dropped).
+    """
+    kept, kept_norm = [], []
+    used = 0
+    sep_tokens = count_tokens(separator)
+    for chunk in chunks:
+        norm = _WHITESPACE.sub(" ", chunk).strip().lower()
+        if not norm or any(norm in other for other in kept_norm):
+            continue
+        tokens = count_tokens(chunk) + (sep_tokens if kept else 0)
+        if used + tokens > budget:
+            continue
+        kept.append(chunk)
+        kept_norm.append(norm)
+        used += tokens
+    return kept, used, len(chunks) - len(kept)
+
+
+# text: tam sistem promptu, memory: içine giren hafıza metni, stats: token sayıları
+AssembledPrompt = namedtuple("AssembledPrompt", ["text", "memory", "stats"])
+
+
+def build_system_prompt(base_prompt, today, memory_chunks, budget=PROMPT_MAX_TOKENS):
+    """
+    Assemble the chat system prompt within budget tokens.
+
+    memory_chunks are the retrieved texts, best match first. Returns an
+    AssembledPrompt with the token counts that went in.
+    """
+    header = f"TODAY: {today}\n{base_prompt}\n\nRELATED MEMORY:\n"
+    header_tokens = count_tokens(header)
+    kept, memory_tokens, dropped = fit_chunks(memory_chunks, max(budget - header_tokens, 0))
+    stats = {
+        "base": header_tokens,
+        "memory": memory_tokens,
+        "total": header_tokens + memory_tokens,
+        "candidates": len(memory_chunks),
+        "dropped": dropped,
+    }
+    logger.info("System prompt tokens: %s", stats)
+    memory = "\n".join(kept)
+    return AssembledPrompt(header + memory, memory, stats)
+
+
+def build_web_content(items, budget=WEB_MAX_TOKENS):
+    """
+    Combine search results (most relevant first) for summarize_with_gpt within budget tokens.
+
+    Returns (combined content, stats).
+    """
+    blocks = [f"Kaynak: {item['url']}\nİçerik: {item['content']}" for item in items]
+    kept, tokens, dropped = fit_chunks(blocks, budget, separator="\n\n")
+    stats = {"web": tokens, "sources": len(kept), "dropped": dropped}
+    logger.info("Web content tokens: %s", stats)
+    return "\n\n".join(kept), stats
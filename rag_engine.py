@@ -1,26 +1,331 @@
 import os
-from configparser import ConfigParser
-from langchain.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-
-# Load OpenAI API key from config or environment
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    config = ConfigParser()
-    config.read('config/settings.ini')
-    OPENAI_API_KEY = config.get('OpenAI', 'api_key', fallback=None)
-
-if not OPENAI_API_KEY:
-    raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY in your environment or config/settings.ini.")
-
-def retrieve_memory(query, index_path="memory/vector_store"):
-    """
-    Kullanıcı mesajı ile en çok ilişkili 3 metin parçasını FAISS içinden getirir.
-    """
-    db = FAISS.load_local(
-        index_path,
-        OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
-        allow_dangerous_deserialization=True
-    )
-    docs = db.similarity_search(query, k=3)
+import threading
+import logging
+from collections import OrderedDict, namedtuple
+from lexical_index import LexicalIndex
+from metrics import span
+from settings import config, get_embeddings
+from text_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# FAISS.save_local bu iki dosyayı yazar
+INDEX_FILES = ("index.faiss", "index.pkl")
+# [Memory] index_type flat değilse build_memory ayrıca yaklaşık (ANN) indeksi yazar
+ANN_INDEX_FILE = "index.ann"
+# build_memory aynı parça kimlikleriyle BM25 anahtar kelime indeksini de günceller
+LEXICAL_FILE = "lexical.sqlite"
+# Her derleme yeni bir nesil klasörüne (gen-000001, ...) yazılır; CURRENT canlı olanın adını tutar
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+
+MEMORY_K = config.getint('Memory', 'k', fallback=3)
+# İndeks dosyaları RAM'e kopyalanmak yerine eşlenir; işçi süreçleri aynı sayfaları paylaşır
+MEMORY_MMAP = config.getboolean('Memory', 'mmap', fallback=True)
+NPROBE = config.getint('Memory', 'nprobe', fallback=16)  # IVF / PQ: taranan küme sayısı
+EF_SEARCH = config.getint('Memory', 'ef_search', fallback=64)  # HNSW arama genişliği
+# none | mmr (çeşitlilik) | exact (ANN adaylarını tam vektörlerle yeniden sırala)
+RERANK = config.get('Memory', 'rerank', fallback='none')
+FETCH_K = config.getint('Memory', 'fetch_k', fallback=20)  # yeniden sıralama için aday sayısı
+MMR_LAMBDA = config.getfloat('Memory', 'mmr_lambda', fallback=0.5)
+RERANK_MODES = ("none", "mmr", "exact")
+# Hibrit arama: önce BM25; isim, tarih, birebir ifade gibi kesin eşleşmelerde sorgu hiç gömülmez,
+# diğer durumlarda anahtar kelime ve vektör sonuçları Reciprocal Rank Fusion ile birleştirilir
+HYBRID = config.getboolean('Memory', 'hybrid', fallback=True)
+LEXICAL_COVERAGE = config.getfloat('Memory', 'lexical_coverage', fallback=0.9)  # en iyi parçanın kapsadığı sorgu payı
+LEXICAL_MARGIN = config.getfloat('Memory', 'lexical_margin', fallback=1.3)  # en iyi / ikinci BM25 skoru
+LEXICAL_MIN_TERMS = config.getint('Memory', 'lexical_min_terms', fallback=2)
+RRF_K = config.getint('Memory', 'rrf_k', fallback=60)
+QUERY_CACHE_ENTRIES = config.getint('Memory', 'query_cache_entries', fallback=1024)  # 0: kapalı
+
+# Aynı nesle ait mağaza, yeniden sıralama ve anahtar kelime indeksleri birlikte değişir
+_LoadedIndex = namedtuple("_LoadedIndex", ["store", "exact", "lexical"])
+
+
+def current_index_dir(index_path):
+    """
+    Directory holding the live index files: the generation CURRENT names,
+    or index_path itself for a store written before generations existed.
+    """
+    try:
+        with open(os.path.join(index_path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return os.path.join(index_path, f.read().strip())
+    except FileNotFoundError:
+        return index_path
+
+
+class MemoryRetriever:
+    """
+    Process-wide FAISS retriever.
+
+    The index is loaded once (on first use or via `load()`) and shared by every
+    handler; langchain and FAISS are only imported at that point. Before each
+    search CURRENT (and the files' mtimes) are checked; when
+    `memory_engine.build_memory` has published a new generation, it is
+    loaded and swapped in. All files are read from the one generation
+    directory, so a docstore is never paired with another build's vectors.
+    Searches already running keep using the index they started with.
+
+    When build_memory wrote an ANN index (IVF, HNSW or PQ) it is searched
+    instead of the flat one, with `nprobe` / `ef_search` applied. With
+    `rerank`, `fetch_k` candidates are re-scored against the full-precision
+    vectors of the flat index (memory-mapped, so only those rows are read):
+    "exact" re-sorts them by true distance, "mmr" picks a diverse top k.
+
+    With `hybrid`, `retrieve()` searches the BM25 index first. When the
+    query has at least `lexical_min_terms` terms, the top chunk covers at
+    least `lexical_coverage` of them and its score is `lexical_margin`
+    times the runner-up's, the keyword hits are returned and no embedding
+    request is made; otherwise both rankings are merged with Reciprocal Rank Fusion.
+    Query embeddings are kept in an LRU of `query_cache_entries`, keyed on
+    the normalized query.
+    """
+
+    def __init__(self, index_path="memory/vector_store", embeddings=None, mmap=MEMORY_MMAP, nprobe=NPROBE,
+                 ef_search=EF_SEARCH, rerank=RERANK, fetch_k=FETCH_K, mmr_lambda=MMR_LAMBDA, hybrid=HYBRID,
+                 lexical_coverage=LEXICAL_COVERAGE, lexical_margin=LEXICAL_MARGIN,
+                 lexical_min_terms=LEXICAL_MIN_TERMS, rrf_k=RRF_K, query_cache_entries=QUERY_CACHE_ENTRIES):
+        if rerank not in RERANK_MODES:
+            raise ValueError(f"Unknown rerank mode {rerank!r}, expected one of {', '.join(RERANK_MODES)}")
+        self.index_path = index_path
+        self.embeddings = embeddings or get_embeddings()
+        self.mmap = mmap
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.rerank = rerank
+        self.fetch_k = fetch_k
+        self.mmr_lambda = mmr_lambda
+        self.hybrid = hybrid
+        self.lexical_coverage = lexical_coverage
+        self.lexical_margin = lexical_margin
+        self.lexical_min_terms = lexical_min_terms
+        self.rrf_k = rrf_k
+        self.query_cache_entries = query_cache_entries
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        self._lexical = None  # (inode, LexicalIndex): dosya yerinde güncellenir, yeniden yüklemede açık kalır
+        self.embed_hits = 0
+        self.embed_misses = 0
+        self.lexical_only = 0
+        self.fused = 0
+        self.generation = 0
+        self._current = None
+        self._stamp = None
+        self._reload_lock = threading.Lock()
+
+    def _disk_stamp(self):
+        """Return a tuple identifying the live generation and its files (the directory comes first)."""
+        directory = current_index_dir(self.index_path)
+        stamp = [directory]
+        for name in INDEX_FILES + (ANN_INDEX_FILE,):
+            try:
+                st = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:
+                if name == ANN_INDEX_FILE:  # isteğe bağlı
+                    stamp.append(None)
+                    continue
+                return None
+            stamp.append((st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _open(self, directory):
+        """Read the docstore and the index to search (ANN if built, else flat) from one generation."""
+        import pickle
+        from langchain.vectorstores import FAISS
+        from vector_index import read_index, tune
+
+        with open(os.path.join(directory, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        flat_path = os.path.join(directory, "index.faiss")
+        ann_path = os.path.join(directory, ANN_INDEX_FILE)
+        is_ann = os.path.exists(ann_path)
+        index = tune(read_index(ann_path if is_ann else flat_path, mmap=self.mmap), self.nprobe, self.ef_search)
+
+        exact = None
+        if self.rerank == "mmr" or (self.rerank == "exact" and is_ann):
+            exact = read_index(flat_path, mmap=True) if is_ann else index
+
+        return _LoadedIndex(FAISS(self.embeddings, index, docstore, index_to_docstore_id), exact, self._open_lexical())
+
+    def _open_lexical(self):
+        """The BM25 index, reopened only if the file was replaced (e.g. the store was deleted and rebuilt)."""
+        # Eski bir build_memory ile oluşturulmuş hafızada BM25 indeksi yoktur; yalnızca vektör araması yapılır
+        path = os.path.join(self.index_path, LEXICAL_FILE)
+        if not self.hybrid or not os.path.exists(path):
+            return None
+        inode = os.stat(path).st_ino
+        if self._lexical is None or self._lexical[0] != inode:
+            # Eskisi kapatılmaz: önceki _current ile süren aramalar onu kullanıyor olabilir,
+            # son referans bırakılınca bağlantıları çöp toplayıcıyla kapanır
+            self._lexical = (inode, LexicalIndex(path, readonly=True))
+        return self._lexical[1]
+
+    def load(self, force=False):
+        """Load the index if it is missing or stale and return it."""
+        return self._load(force).store
+
+    def _load(self, force=False):
+        stamp = self._disk_stamp()
+        if not force and self._current is not None and stamp == self._stamp:
+            return self._current
+
+        # Tek bir thread yükler, diğerleri eski indeksle aramaya devam eder
+        if not self._reload_lock.acquire(blocking=self._current is None):
+            return self._current
+        try:
+            stamp = self._disk_stamp()
+            if force or self._current is None or stamp != self._stamp:
+                with span("memory.index_load"):
+                    current = self._open(stamp[0] if stamp else current_index_dir(self.index_path))
+                # Referans ataması atomiktir; devam eden aramalar eski nesneyi tutar
+                self._current, self._stamp = current, stamp
+                self.generation += 1
+                logger.info("Memory index loaded (generation %d)", self.generation)
+            return self._current
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """Force a reload from disk, e.g. right after build_memory."""
+        return self.load(force=True)
+
+    def embed_query(self, query):
+        key = normalize_query(query)
+        with self._query_lock:
+            vector = self._query_cache.get(key)
+            if vector is not None:
+                self._query_cache.move_to_end(key)
+                self.embed_hits += 1
+                return vector
+            self.embed_misses += 1
+        with span("memory.embed_query"):
+            vector = self.embeddings.embed_query(query)
+        if self.query_cache_entries > 0:
+            with self._query_lock:
+                self._query_cache[key] = vector
+                while len(self._query_cache) > self.query_cache_entries:
+                    self._query_cache.popitem(last=False)
+        return vector
+
+    def search_by_vector(self, vector, k=MEMORY_K):
+        current = self._load()
+        with span("memory.search"):
+            return _documents(current.store, self._ranked_ids(current, vector, k))
+
+    def _ranked_ids(self, current, vector, k):
+        """Docstore ids of the k nearest chunks, best first (re-ranked when configured)."""
+        import numpy as np
+
+        store = current.store
+        query = np.asarray([vector], dtype="float32")
+        _, positions = store.index.search(query, max(k, self.fetch_k) if current.exact is not None else k)
+        positions = [int(i) for i in positions[0] if i != -1]
+        if current.exact is not None and positions:
+            candidates = np.vstack([current.exact.reconstruct(i) for i in positions])
+            if self.rerank == "mmr":
+                from langchain_community.vectorstores.utils import maximal_marginal_relevance
+                order = maximal_marginal_relevance(query[0], candidates, lambda_mult=self.mmr_lambda, k=k)
+            else:
+                order = np.argsort(((candidates - query) ** 2).sum(axis=1))[:k]
+            positions = [positions[i] for i in order]
+        # Docstore'da karşılığı olmayan konum (tutarsız dosyalar) KeyError yerine atlanır
+        return [store.index_to_docstore_id[i] for i in positions if i in store.index_to_docstore_id]
+
+    def _confident(self, result):
+        """True when the keyword hits alone are a safe answer (no embedding needed)."""
+        if not result.ids or result.terms < self.lexical_min_terms or result.coverage < self.lexical_coverage:
+            return False
+        return len(result.scores) == 1 or result.scores[0] >= self.lexical_margin * result.scores[1]
+
+    def retrieve(self, query, k=MEMORY_K):
+        """
+        Return (documents, query vector) for `query`.
+
+        The vector is None when the BM25 hits were confident enough to skip
+        the embedding request.
+        """
+        current = self._load()
+        if current.lexical is None:
+            vector = self.embed_query(query)
+            return self.search_by_vector(vector, k=k), vector
+
+        with span("memory.lexical"):
+            lexical = current.lexical.search(query, max(k, self.fetch_k))
+        if self._confident(lexical):
+            docs = _documents(current.store, lexical.ids[:k])
+            if docs:
+                self.lexical_only += 1
+                return docs, None
+
+        vector = self.embed_query(query)
+        with span("memory.search"):
+            ranked = self._ranked_ids(current, vector, max(k, self.fetch_k))
+            # Reciprocal Rank Fusion: skorlar farklı ölçeklerde olduğundan yalnızca sıralar kullanılır
+            fused = {}
+            for ids in (lexical.ids, ranked):
+                for rank, chunk_id in enumerate(ids):
+                    fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+            best = sorted(fused, key=fused.get, reverse=True)
+            self.fused += 1
+            return _documents(current.store, best)[:k], vector
+
+    def search(self, query, k=MEMORY_K):
+        return self.retrieve(query, k=k)[0]
+
+    def stats(self):
+        lookups = self.embed_hits + self.embed_misses
+        return {
+            "lexical_only": self.lexical_only,
+            "fused": self.fused,
+            "query_cache_entries": len(self._query_cache),
+            "embed_hits": self.embed_hits,
+            "embed_misses": self.embed_misses,
+            "embed_hit_rate": self.embed_hits / lookups if lookups else 0.0,
+        }
+
+
+def _documents(store, ids):
+    # docstore.search bulunamayan kimlik için metin döner (BM25 indeksi yeni nesilden önde olabilir)
+    docs = (store.docstore.search(chunk_id) for chunk_id in ids)
+    return [doc for doc in docs if not isinstance(doc, str)]
+
+
+# Semantik önbellek için sorgu vektörü ve indeks nesli de döner
+MemoryContext = namedtuple("MemoryContext", ["text", "vector", "generation", "chunks"])
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever(index_path="memory/vector_store"):
+    """Return the shared retriever for index_path, creating it on first use."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None or _retriever.index_path != index_path:
+            _retriever = MemoryRetriever(index_path)
+        return _retriever
+
+
+def memory_stats():
+    """Retriever stats for metrics.register_source; empty until the index is first used."""
+    return _retriever.stats() if _retriever is not None else {}
+
+
+def retrieve_memory(query, index_path="memory/vector_store", k=MEMORY_K):
+    """
+    Kullanıcı mesajı ile en çok ilişkili k (varsayılan 3) metin parçasını FAISS içinden getirir.
+    """
+    docs = get_retriever(index_path).search(query, k=k)
     return "\n".join([doc.page_content for doc in docs])
+
+
+def retrieve_memory_context(query, index_path="memory/vector_store", k=MEMORY_K):
+    """
+    retrieve_memory gibi, ama sorgu vektörünü, indeks neslini ve
+    en iyiden başlayarak sıralı parçaları da döndürür. Anahtar kelime
+    araması yeterli olduğunda sorgu gömülmez ve vektör None olur.
+    """
+    retriever = get_retriever(index_path)
+    docs, vector = retriever.retrieve(query, k=k)
+    chunks = [doc.page_content for doc in docs]
+    return MemoryContext("\n".join(chunks), vector, retriever.generation, chunks)
@@ -0,0 +1,100 @@
+# Hafıza tabanlı sohbet için semantik yanıt önbelleği
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = config.getboolean('SemanticCache', 'enabled', fallback=False)
+SIMILARITY_THRESHOLD = config.getfloat('SemanticCache', 'threshold', fallback=0.95)
+MAX_ENTRIES = config.getint('SemanticCache', 'max_entries', fallback=512)
+ENTRY_TTL = config.getfloat('SemanticCache', 'ttl', fallback=24 * 3600)
+
+
+def context_fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    Stores (query embedding, retrieved-context fingerprint, answer).
+
+    A lookup hits when a stored query is at least `threshold` cosine-similar,
+    the retrieved context is the same and the memory index generation has
+    not changed. A new generation (index rebuilt) clears the cache.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl=ENTRY_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()  # key -> (unit vector, fingerprint, answer, latency, expires_at)
+        self._next_key = 0
+
+    def _check_generation(self, generation):
+        if generation != self.generation:
+            if self._entries:
+                logger.info("Memory index changed, semantic cache cleared (%d entries)", len(self._entries))
+            self._entries.clear()
+            self.generation = generation
+
+    @staticmethod
+    def _unit(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector, context, generation):
+        """Return a cached answer or None."""
+        self._check_generation(generation)
+        fingerprint = context_fingerprint(context)
+        now = time.time()
+
+        keys = [k for k, e in self._entries.items() if e[4] > now and e[1] == fingerprint]
+        for key in [k for k, e in self._entries.items() if e[4] <= now]:
+            del self._entries[key]
+
+        if keys:
+            matrix = np.stack([self._entries[k][0] for k in keys])
+            scores = matrix @ self._unit(vector)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                key = keys[best]
+                self._entries.move_to_end(key)
+                _, _, answer, latency, _ = self._entries[key]
+                self.hits += 1
+                self.saved_seconds += latency
+                logger.info("Semantic cache hit (similarity %.3f, saved %.2fs)", scores[best], latency)
+                return answer
+
+        self.misses += 1
+        return None
+
+    def store(self, vector, context, answer, latency, generation):
+        """Remember answer; latency is how long the model call took."""
+        self._check_generation(generation)
+        self._entries[self._next_key] = (
+            self._unit(vector), context_fingerprint(context), answer, latency, time.time() + self.ttl
+        )
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 2),
+        }
@@ -0,0 +1,66 @@
+# Ortak ayarlar: config/settings.ini bir kez okunur, anahtarlar ve paylaşılan istemciler burada
+import logging
+import os
+import threading
+from configparser import ConfigParser
+
+logger = logging.getLogger(__name__)
+
+# Başka bir ayar dosyası için BOT_SETTINGS (ör. benchmark çalışma dizini)
+SETTINGS_PATH = os.getenv('BOT_SETTINGS') or 'config/settings.ini'
+
+config = ConfigParser()
+config.read(SETTINGS_PATH)
+
+# Ortam değişkeni config dosyasından önce gelir
+BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN') or config.get('Telegram', 'bot_token', fallback=None)
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY') or config.get('OpenAI', 'api_key', fallback=None)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def require_openai_key():
+    """The OpenAI API key; raises only when something actually needs it."""
+    if not OPENAI_API_KEY:
+        raise ValueError("No OpenAI API key found. Please set OPENAI_API_KEY in your environment or config/settings.ini.")
+    return OPENAI_API_KEY
+
+
+def check_credentials():
+    """Log what is missing before starting the bot; False if it cannot start."""
+    if not OPENAI_API_KEY:
+        logger.warning("No OpenAI API key found in environment variable OPENAI_API_KEY or config/settings.ini")
+    if not BOT_TOKEN:
+        logger.error("No bot token found in environment variable TELEGRAM_BOT_TOKEN or config/settings.ini")
+        return False
+    return True
+
+
+def _shared(name, create):
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = create()
+        return client
+
+
+def get_openai_client():
+    """
+    The process-wide AsyncOpenAI client, created (and `openai` imported) on
+    first use. The SDK's own retries are off: llm_dispatch handles 429s.
+    """
+    def create():
+        api_key = require_openai_key()
+        import openai
+        return openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+    return _shared("openai", create)
+
+
+def get_embeddings():
+    """The shared OpenAIEmbeddings used for the memory index, created on first use."""
+    def create():
+        api_key = require_openai_key()
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(openai_api_key=api_key)
+    return _shared("embeddings", create)
@@ -0,0 +1,220 @@
+# Süreçler arası paylaşılan durum: varsayılan süreç içi, isteğe bağlı yerel durum sunucusu
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+# local: her süreç kendi durumunu tutar; manager: tüm işçiler tek bir durum sunucusunu paylaşır
+STATE_BACKEND = os.getenv('BOT_STATE_BACKEND') or config.get('State', 'backend', fallback='local')
+STATE_ADDRESS = os.getenv('BOT_STATE_ADDRESS') or config.get('State', 'address', fallback='127.0.0.1:50055')
+# manager bağlantıları pickle kullanır: anahtar zorunludur, varsayılan yoktur
+STATE_AUTHKEY = (os.getenv('BOT_STATE_AUTHKEY') or config.get('State', 'authkey', fallback='')).encode()
+STATE_MAX_ENTRIES = config.getint('State', 'max_entries', fallback=10000)
+SUBSCRIBERS_PATH = config.get('Briefing', 'subscribers_path', fallback='memory/subscribers.bin')
+
+
+class SubscriberStore:
+    """Sorted chat ids kept on disk as a packed int64 array."""
+
+    def __init__(self, path=SUBSCRIBERS_PATH):
+        self.path = path
+        self.ids = array("q")
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                self.ids.frombytes(f.read())
+
+    def __contains__(self, chat_id):
+        i = bisect_left(self.ids, chat_id)
+        return i < len(self.ids) and self.ids[i] == chat_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def snapshot(self):
+        """All chat ids as a list (what a state server proxy can return)."""
+        return self.ids.tolist()
+
+    def add(self, chat_id):
+        with self._lock:
+            i = bisect_left(self.ids, chat_id)
+            if i < len(self.ids) and self.ids[i] == chat_id:
+                return False
+            self.ids.insert(i, chat_id)
+            self._save()
+            return True
+
+    def remove(self, chat_id):
+        with self._lock:
+            i = bisect_left(self.ids, chat_id)
+            if i == len(self.ids) or self.ids[i] != chat_id:
+                return False
+            del self.ids[i]
+            self._save()
+            return True
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(self.ids.tobytes())
+        os.replace(self.path + ".tmp", self.path)
+
+
+class KeyValueStore:
+    """Thread-safe TTL + LRU key/value store."""
+
+    def __init__(self, max_entries=STATE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalBackend:
+    """In-process state (the default, single-process bot)."""
+
+    shared = False
+
+    def __init__(self):
+        self.kv = KeyValueStore()
+        self.subscribers = SubscriberStore()
+
+
+class _StateServer(BaseManager):
+    pass
+
+
+class _StateClient(BaseManager):
+    pass
+
+
+KV_METHODS = ("get", "set", "delete", "__len__")
+SUBSCRIBER_METHODS = ("add", "remove", "snapshot", "__contains__", "__len__")
+_StateClient.register("kv", exposed=KV_METHODS)
+_StateClient.register("subscribers", exposed=SUBSCRIBER_METHODS)
+
+
+def _require_authkey(authkey):
+    if not authkey:
+        raise ValueError("The manager state backend needs [State] authkey (or BOT_STATE_AUTHKEY) to be set")
+
+
+def _split_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class ManagerBackend:
+    """
+    State held by a local state server (`python shared_state.py`), shared by
+    every worker process on the host, or across hosts if the address is
+    reachable. Proxies open one connection per thread.
+    """
+
+    shared = True
+
+    def __init__(self, address=STATE_ADDRESS, authkey=STATE_AUTHKEY):
+        _require_authkey(authkey)
+        self._client = _StateClient(address=_split_address(address), authkey=authkey)
+        self._client.connect()
+        self.kv = self._client.kv()
+        self.subscribers = self._client.subscribers()
+
+
+BACKENDS = {"local": LocalBackend, "manager": ManagerBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide state backend selected by [State] backend, created on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BACKENDS[STATE_BACKEND]()
+            logger.info("Shared state backend: %s", STATE_BACKEND)
+        return _backend
+
+
+class SharedNamespace:
+    """
+    Prefixed view of the shared key/value store, used as a second-level
+    cache next to a process-local one. Errors (state server down) are
+    logged and treated as misses. Calls are IPC round trips; async code
+    runs them with concurrency.run_blocking.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix + ":"
+
+    def get(self, key):
+        try:
+            return get_backend().kv.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("Shared state unavailable: %s", e)
+            return None
+
+    def set(self, key, value, ttl=None):
+        try:
+            get_backend().kv.set(self.prefix + key, value, ttl)
+        except Exception as e:
+            logger.warning("Shared state unavailable: %s", e)
+
+
+def shared_cache(prefix):
+    """A SharedNamespace when state is shared between processes, else None."""
+    return SharedNamespace(prefix) if STATE_BACKEND != "local" else None
+
+
+def serve(address=STATE_ADDRESS, authkey=STATE_AUTHKEY):
+    """Run the state server in this process until it is killed."""
+    _require_authkey(authkey)
+    kv = KeyValueStore()
+    subscribers = SubscriberStore()
+    _StateServer.register("kv", callable=lambda: kv, exposed=KV_METHODS)
+    _StateServer.register("subscribers", callable=lambda: subscribers, exposed=SUBSCRIBER_METHODS)
+    server = _StateServer(address=_split_address(address), authkey=authkey).get_server()
+    logger.info("State server listening on %s", address)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
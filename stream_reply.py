@@ -0,0 +1,157 @@
+# LLM yanıtlarını Telegram'a mesaj düzenleyerek akıtır
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from metrics import count, span
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+STREAM_REPLIES = config.getboolean('Telegram', 'stream_replies', fallback=True)
+EDIT_INTERVAL = config.getfloat('Telegram', 'stream_edit_interval', fallback=1.5)
+MAX_MESSAGE_LENGTH = 4096
+
+# Son yanıtların ilk görünür token süreleri (saniye)
+first_token_latencies = deque(maxlen=1000)
+
+
+class StreamingReply:
+    """
+    Progressively renders streamed text into Telegram messages.
+
+    The first message is sent as soon as text arrives (or an existing
+    `placeholder` message is edited), later text is applied with edits no
+    more often than every `edit_interval` seconds, and text beyond the
+    Telegram length limit rolls over into additional messages. After a
+    RetryAfter nothing is sent until it expires. Rollover messages that a
+    shorter final text no longer needs are deleted.
+    """
+
+    def __init__(self, message, placeholder=None, edit_interval=EDIT_INTERVAL, max_length=MAX_MESSAGE_LENGTH):
+        self.message = message
+        self.edit_interval = edit_interval
+        self.max_length = max_length
+        self.started = time.perf_counter()
+        self.first_visible = None
+        self.text = ""
+        self._sent = [placeholder] if placeholder is not None else []
+        self._rendered = []
+        self._last_flush = 0.0
+        self._retry_at = 0.0
+
+    async def feed(self, delta: str):
+        """Append a streamed piece of text and flush if the throttle allows it."""
+        if not delta:
+            return
+        self.text += delta
+        now = time.monotonic()
+        if now < self._retry_at:
+            return
+        if self.first_visible is None or now - self._last_flush >= self.edit_interval:
+            await self._render(self.text)
+
+    async def finish(self, final_text: str = None):
+        """Render the final text (defaults to everything fed so far)."""
+        if final_text is not None:
+            self.text = final_text
+        if self.text:
+            await self._render(self.text, final=True)
+
+    def _chunks(self, text):
+        return [text[i:i + self.max_length] for i in range(0, len(text), self.max_length)]
+
+    async def _render(self, text, final=False):
+        self._last_flush = time.monotonic()
+        chunks = self._chunks(text)
+        for i, chunk in enumerate(chunks):
+            if i < len(self._rendered) and self._rendered[i] == chunk:
+                continue
+            try:
+                if i < len(self._sent):
+                    await self._sent[i].edit_text(chunk)
+                else:
+                    self._sent.append(await self.message.reply_text(chunk))
+            except RetryAfter as e:
+                # Telegram yavaşla diyor: ara düzenlemeleri atla, sonda tekrar dene
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                self._retry_at = time.monotonic() + retry_after
+                if not final:
+                    return
+                await asyncio.sleep(retry_after)
+                await self._render(text, final=True)
+                return
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+            if i < len(self._rendered):
+                self._rendered[i] = chunk
+            else:
+                self._rendered.append(chunk)
+
+            if self.first_visible is None:
+                self.first_visible = time.perf_counter() - self.started
+                first_token_latencies.append(self.first_visible)
+
+        # Metin kısaldıysa artık boş kalan devam mesajlarını sil
+        for extra in self._sent[len(chunks):]:
+            try:
+                await extra.delete()
+            except TelegramError as e:
+                logger.warning("Could not delete a stale reply message: %s", e)
+        del self._sent[len(chunks):]
+        del self._rendered[len(chunks):]
+
+
+def stream_stats():
+    """Time-to-first-visible-token summary over recent streamed replies."""
+    samples = list(first_token_latencies)
+    if not samples:
+        return {"count": 0}
+    samples.sort()
+    return {
+        "count": len(samples),
+        "p50": round(statistics.median(samples), 3),
+        "p95": round(samples[int(0.95 * (len(samples) - 1))], 3),
+        "max": round(samples[-1], 3),
+    }
+
+
+async def complete_chat(client, on_delta=None, **kwargs) -> str:
+    """
+    Run a chat completion and return its text.
+
+    With `on_delta`, the completion is streamed and every piece of text is
+    awaited through on_delta(piece) as it arrives. Latency and token usage
+    are recorded under the "llm.chat" stage.
+    """
+    with span("llm.chat"):
+        if on_delta is None:
+            response = await client.chat.completions.create(**kwargs)
+            _count_usage(response.usage)
+            return response.choices[0].message.content.strip()
+
+        parts = []
+        # include_usage: son parça token kullanımını taşır
+        stream = await client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                _count_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if piece:
+                parts.append(piece)
+                await on_delta(piece)
+        return "".join(parts).strip()
+
+
+def _count_usage(usage):
+    count("llm.calls")
+    if usage is not None:
+        count("llm.prompt_tokens", usage.prompt_tokens)
+        count("llm.completion_tokens", usage.completion_tokens)
@@ -1,15 +1,28 @@
 from datetime import datetime
 
 # Telegram bot entegrasyonu
+import asyncio
 import logging
 from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.request import HTTPXRequest
+import importlib
 import os
-from configparser import ConfigParser
 import sys
-import openai
-from rag_engine import retrieve_memory
-from web_data_engine import get_weather, get_exchange_rates, get_tr_news, get_world_news, get_daily_briefing, should_use_web, get_web_summary
+import time
+from rag_engine import get_retriever, memory_stats, retrieve_memory_context
+from semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+from concurrency import run_blocking
+from stream_reply import StreamingReply, STREAM_REPLIES, stream_stats
+from llm_dispatch import dispatcher
+from prompt_builder import templates, build_system_prompt, count_tokens, MEMORY_CANDIDATES
+from web_data_engine import get_briefing_section, get_daily_briefing, get_web_summary, web_cache
+from intent_router import router, WEB_SEARCH, BRIEFING, OCR
+from daily_reminder import schedule_daily_briefing, SEND_TIME
+from shared_state import get_backend
+from ocr_engine import ocr_engine
+from metrics import span, count, register_source, format_stats, start_http_server, profiler, PROFILE
+from settings import BOT_TOKEN, check_credentials, config, get_openai_client
 
 # Set up logging
 logging.basicConfig(
@@ -18,58 +31,136 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load configuration
-config = ConfigParser()
-config.read('config/settings.ini')
+# Aynı anda işlenecek güncelleme sayısı
+CONCURRENT_UPDATES = config.getint('Telegram', 'concurrent_updates', fallback=64)
 
-# Get bot token from environment variable or config
-BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-if not BOT_TOKEN:
-    BOT_TOKEN = config.get('Telegram', 'bot_token', fallback=None)
+# Yerel bir Bot API sunucusu (veya benchmark'lardaki sahte sunucu) için, ör. http://127.0.0.1:8081/bot
+BOT_API_BASE_URL = config.get('Telegram', 'base_url', fallback='') or None
 
-# Get OpenAI API key from environment variable or config
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    OPENAI_API_KEY = config.get('OpenAI', 'api_key', fallback=None)
+# /stats komutunu kullanabilecek Telegram kullanıcı kimlikleri (virgülle ayrılmış)
+ADMIN_IDS = {int(x) for x in config.get('Telegram', 'admin_ids', fallback='').split(',') if x.strip()}
 
-if not BOT_TOKEN:
-    logger.error("No bot token found in environment variable TELEGRAM_BOT_TOKEN or config/settings.ini")
-    sys.exit(1)
+# Ağır alt sistemler (langchain/FAISS, tiktoken, openai, googlesearch) ilk kullanımda yüklenir;
+# açıkken bot güncelleme almaya başladıktan hemen sonra arka planda önceden yüklenirler
+PREWARM = config.BOOLEAN_STATES.get(os.getenv('BOT_PREWARM', '').lower(),
+                                    config.getboolean('Startup', 'prewarm', fallback=True))
 
-if not OPENAI_API_KEY:
-    logger.warning("No OpenAI API key found in environment variable OPENAI_API_KEY or config/settings.ini")
+# Benzer sorulara aynı hafıza bağlamıyla verilen yanıtları tekrar kullan (isteğe bağlı)
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
 
-# Use the new OpenAI client
-openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# Bileşenlerin kendi istatistikleri /stats ve /metrics'te aşama süreleriyle birlikte görünür
+register_source("web_cache", web_cache.stats)
+register_source("ocr", ocr_engine.stats)
+register_source("first_token", stream_stats)
+register_source("llm_dispatch", dispatcher.stats)
+register_source("memory", memory_stats)
+if semantic_cache is not None:
+    register_source("semantic_cache", semantic_cache.stats)
 
-def get_openai_response(prompt: str) -> str:
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that times every Bot API call as a "telegram.<method>" stage."""
+
+    async def do_request(self, url, method, *args, **kwargs):
+        with span("telegram." + url.rsplit("/", 1)[-1]):
+            return await super().do_request(url, method, *args, **kwargs)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles up to `concurrent_updates` updates at once, but each chat's
+    updates one after another in arrival order.
+
+    The base class takes its semaphore before do_process_update, so it only
+    bounds the updates waiting here (`max_waiting`). Handlers are limited
+    after the chat's lock, so one busy chat's backlog cannot hold every
+    slot while it waits.
+    """
+
+    def __init__(self, concurrent_updates=CONCURRENT_UPDATES, max_waiting=4096):
+        super().__init__(max_waiting)
+        self._slots = asyncio.Semaphore(concurrent_updates)
+        self._chats = {}  # chat id -> [kilit, bekleyen + çalışan güncelleme sayısı]
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            async with self._slots:
+                await coroutine
+            return
+        # asyncio.Lock bekleyenleri geliş sırasıyla uyandırır
+        entry = self._chats.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+async def get_openai_response(prompt: str, on_delta=None, user=None) -> str:
+    """Memory-grounded chat completion; `user` (the chat id) is the fairness key for llm_dispatch."""
     try:
-        # Tarih ve temel prompt
+        # Tarih ve temel prompt (şablon dosyası yalnızca değişince yeniden okunur)
         today = datetime.now().strftime("%d.%m.%Y %A %H:%M")
-        with open("prompts/system_prompt.txt", "r", encoding="utf-8") as f:
-            base_prompt = f.read()
+        base_prompt = templates.get("prompts/system_prompt.txt")
 
-        # Hafızadan ilgili bilgi getir
-        memory_context = retrieve_memory(prompt)
+        # Hafızadan ilgili bilgi getir (bütçeye sığdırmak için birkaç aday)
+        memory = await run_blocking(retrieve_memory_context, prompt, k=MEMORY_CANDIDATES)
 
-        # Promptu birleştir
-        system_prompt = f"TODAY: {today}\n{base_prompt}\n\nRELATED MEMORY:\n{memory_context}"
+        # Promptu token bütçesi içinde birleştir
+        with span("prompt.build"):
+            system_prompt = build_system_prompt(base_prompt, today, memory.chunks)
 
-        # GPT çağrısı (new OpenAI API)
-        response = openai_client.chat.completions.create(
+        # Hafıza yalnızca anahtar kelimeyle bulunduysa sorgu vektörü yoktur; önbellek atlanır
+        use_cache = semantic_cache is not None and memory.vector is not None
+        if use_cache:
+            cached = semantic_cache.lookup(memory.vector, system_prompt.memory, memory.generation)
+            if cached is not None:
+                count("semantic_cache.hits")
+                return cached
+
+        # GPT çağrısı (new OpenAI API), kullanıcı başına adil kuyruk üzerinden
+        started = time.perf_counter()
+        answer = await dispatcher.chat(
+            user,
+            get_openai_client(),
+            on_delta=on_delta,
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": system_prompt.text},
                 {"role": "user", "content": prompt}
             ]
         )
-        return response.choices[0].message.content.strip()
+
+        if use_cache:
+            semantic_cache.store(memory.vector, system_prompt.memory, answer, time.perf_counter() - started, memory.generation)
+        return answer
     except Exception as e:
         import traceback
         logger.error("OpenAI API error: %s", e)
         logger.error(traceback.format_exc())
         return f"Sorry, I couldn't process your request right now. ({e})"
 
+async def reply_with_stream(update: Update, produce, placeholder=None):
+    """Reply with the text produced by produce(on_delta), streaming it when enabled."""
+    if not STREAM_REPLIES:
+        text = await produce(None)
+        if placeholder is not None:
+            await placeholder.edit_text(text)
+        else:
+            await update.message.reply_text(text)
+        return
+
+    reply = StreamingReply(update.message, placeholder=placeholder)
+    text = await produce(reply.feed)
+    await reply.finish(text)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send a message when the command /start is issued."""
     await update.message.reply_text('Hello! I am your AI assistant. How can I help you today?')
@@ -88,26 +179,52 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                   '/exchange - Döviz kurları\n'
                                   '/trnews - Türkiye haberleri\n'
                                   '/worldnews - Dünya haberleri\n\n'
+                                  '☀️ Sabah Bülteni:\n'
+                                  '/subscribe - Her sabah günlük bülteni al\n'
+                                  '/unsubscribe - Aboneliği iptal et\n\n'
                                   '💬 Normal Sohbet:\n'
                                   'Güncel olaylar hakkında soru sorabilirsin\n'
                                   'Örnek: "iran israil savaşı son durum nedir?"')
 
 async def weather_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = get_weather()
+    result = await get_briefing_section("weather")
     await update.message.reply_text(result)
 
 async def exchange_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = get_exchange_rates()
+    result = await get_briefing_section("exchange")
     await update.message.reply_text(result)
 
 async def tr_news_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = get_tr_news()
+    result = await get_briefing_section("tr_news")
     await update.message.reply_text(result)
 
 async def world_news_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = get_world_news()
+    result = await get_briefing_section("world_news")
     await update.message.reply_text(result)
 
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Subscribe this chat to the morning briefing"""
+    backend = await run_blocking(get_backend)
+    if await run_blocking(backend.subscribers.add, update.effective_chat.id):
+        await update.message.reply_text(f"☀️ Abone oldun! Günlük bülten her sabah {SEND_TIME.strftime('%H:%M')}'de gelecek.")
+    else:
+        await update.message.reply_text("☀️ Zaten abonesin.")
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Remove this chat from the morning briefing"""
+    backend = await run_blocking(get_backend)
+    if await run_blocking(backend.subscribers.remove, update.effective_chat.id):
+        await update.message.reply_text("Aboneliğin iptal edildi.")
+    else:
+        await update.message.reply_text("Zaten abone değilsin.")
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Per-stage latency histograms and counters (admins only)"""
+    if update.effective_user is None or update.effective_user.id not in ADMIN_IDS:
+        await update.message.reply_text("Bu komut yalnızca yöneticiler içindir.")
+        return
+    await update.message.reply_text(format_stats()[:4096])
+
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Search the web for current information"""
     try:
@@ -118,9 +235,9 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("🔍 Kullanım: /search <arama terimi>\nÖrnek: /search iran israil savaşı")
             return
         
-        await update.message.reply_text(f"🔍 '{query}' için güncel bilgi aranıyor...")
-        summary = get_web_summary(query)
-        await update.message.reply_text(summary)
+        status = await update.message.reply_text(f"🔍 '{query}' için güncel bilgi aranıyor...")
+        chat_id = update.effective_chat.id
+        await reply_with_stream(update, lambda on_delta: get_web_summary(query, on_delta=on_delta, user=chat_id), placeholder=status)
         
     except Exception as e:
         logger.error(f"Error in search command: {e}")
@@ -130,27 +247,76 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle incoming messages."""
     try:
         user_message = update.message.text
+        chat_id = update.effective_chat.id
+
+        # Mesajın niyetini tek geçişte belirle (web arama, bülten, OCR, hafıza sohbeti)
+        with span("route"):
+            intent = router.top_intent(user_message)
+        count("intent." + intent)
 
         # Eğer mesaj güncel bilgiyle ilgiliyse (web arama)
-        if should_use_web(user_message):
-            await update.message.reply_text("🔍 Güncel bilgi aranıyor...")
-            summary = get_web_summary(user_message)
-            await update.message.reply_text(summary)
+        if intent == WEB_SEARCH:
+            status = await update.message.reply_text("🔍 Güncel bilgi aranıyor...")
+            await reply_with_stream(update, lambda on_delta: get_web_summary(user_message, on_delta=on_delta, user=chat_id), placeholder=status)
             return
 
-        # Eğer mesaj güncel bilgiyle ilgiliyse (basit anahtar kelime filtresi)
-        if any(word in user_message.lower() for word in ["hava", "piyasa", "gündem", "haber", "dolar", "euro", "altın", "dünya", "kur", "bülten", "günlük"]):
-            briefing = get_daily_briefing()
+        # Hava, piyasa, bülten gibi günlük özet istekleri
+        if intent == BRIEFING:
+            briefing = await get_daily_briefing()
             await update.message.reply_text(briefing)
             return
 
+        if intent == OCR:
+            await update.message.reply_text("📷 Yazısını okumamı istediğin fotoğrafı gönder (istersen açıklamaya sorunu yaz).")
+            return
+
+        # Peş peşe gelen mesajlar tek yanıtta birleşir; sonraki mesaj hepsini yanıtlar
+        prompt = await dispatcher.coalesce(chat_id, user_message)
+        if prompt is None:
+            return
+
         # Geri kalan normal GPT hafıza tabanlı yanıtlar burada
-        ai_reply = get_openai_response(user_message)
-        await update.message.reply_text(ai_reply)
+        await reply_with_stream(update, lambda on_delta: get_openai_response(prompt, on_delta=on_delta, user=chat_id))
     except Exception as e:
         logger.error(f"Error handling message: {e}")
+        count("errors.handle_message")
         await update.message.reply_text("Sorry, I encountered an error processing your message.")
 
+async def photo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """OCR photos / image documents; with a caption, answer it using the recognized text."""
+    try:
+        message = update.message
+        media = message.photo[-1] if message.photo else message.document
+
+        # Aynı görsel daha önce okunduysa indirmeye bile gerek yok
+        text = ocr_engine.cached(media.file_unique_id)
+        if text is None:
+            status = await message.reply_text("📷 Görseldeki yazı okunuyor...")
+            telegram_file = await media.get_file()
+            data = bytes(await telegram_file.download_as_bytearray())
+            text = await ocr_engine.recognize(data, file_unique_id=media.file_unique_id)
+        else:
+            status = None
+
+        if not text:
+            reply = "📷 Görselde okunabilir bir yazı bulamadım."
+            await (status.edit_text(reply) if status else message.reply_text(reply))
+            return
+
+        if not message.caption:
+            reply = f"📷 Görseldeki yazı:\n\n{text}"[:4096]
+            await (status.edit_text(reply) if status else message.reply_text(reply))
+            return
+
+        # Açıklama bir soru gibi ele alınır, OCR metni normal hafıza/LLM yoluna gider
+        prompt = f"{message.caption}\n\nGörseldeki metin:\n{text}"
+        chat_id = update.effective_chat.id
+        await reply_with_stream(update, lambda on_delta: get_openai_response(prompt, on_delta=on_delta, user=chat_id), placeholder=status)
+    except Exception as e:
+        logger.error(f"Error handling photo: {e}")
+        count("errors.photo_handler")
+        await update.message.reply_text("Görsel işlenirken bir hata oluştu.")
+
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log the error and send a message to the user."""
     logger.error("Exception while handling an update:", exc_info=context.error)
@@ -159,6 +325,29 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
             "Sorry, I encountered an error while processing your request."
         )
 
+# Sırayla yüklenir: her mesajın ihtiyaç duyduğu tokenizer önce, arama paketi en son
+PREWARM_STEPS = (
+    ("tokenizer", lambda: count_tokens("")),
+    ("openai", get_openai_client),
+    ("memory", lambda: get_retriever().load()),
+    ("templates", lambda: templates.get("prompts/system_prompt.txt")),
+    ("search", lambda: importlib.import_module("googlesearch")),
+)
+
+async def prewarm(context: ContextTypes.DEFAULT_TYPE = None):
+    """Load the lazily imported subsystems so the first messages don't pay for them.
+
+    Runs as a one-off job once the application has started. A failed step
+    is only logged; the same work is retried on first use.
+    """
+    for name, step in PREWARM_STEPS:
+        try:
+            with span("startup.prewarm." + name):
+                await run_blocking(step)
+        except Exception as e:
+            logger.warning("Pre-warm of %s failed: %s", name, e)
+    logger.info("Pre-warm finished")
+
 async def delete_webhook():
     """Delete any existing webhook."""
     try:
@@ -168,24 +357,63 @@ async def delete_webhook():
     except Exception as e:
         logger.error(f"Error deleting webhook: {e}")
 
+def build_application(base_url=None, schedule_jobs=True, prewarm_after_start=PREWARM, ordered_chats=False):
+    """Create the Application with every handler and job registered.
+
+    base_url points the bot at another Bot API server (e.g. the local
+    stand-in used by benchmarks/bench_load.py); [Telegram] base_url is the
+    default. With several webhook workers only one of them should schedule
+    the daily briefing jobs. With prewarm_after_start, prewarm() runs as
+    soon as the job queue starts. With ordered_chats (webhook workers),
+    each chat's updates are handled in order, one at a time.
+    """
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(ChatOrderedUpdateProcessor() if ordered_chats else CONCURRENT_UPDATES)
+        .request(InstrumentedRequest(connection_pool_size=256))  # PTB varsayılanı
+    )
+    base_url = base_url or BOT_API_BASE_URL
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+
+    # Add handlers
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.PHOTO | filters.Document.IMAGE, photo_handler))
+    application.add_handler(CommandHandler("weather", weather_command))
+    application.add_handler(CommandHandler("exchange", exchange_command))
+    application.add_handler(CommandHandler("trnews", tr_news_command))
+    application.add_handler(CommandHandler("worldnews", world_news_command))
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("subscribe", subscribe_command))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+
+    # Sabah bülteni: önceden hazırla, abonelere hız sınırlı gönder
+    if schedule_jobs:
+        schedule_daily_briefing(application.job_queue)
+    if prewarm_after_start:
+        application.job_queue.run_once(prewarm, when=0, name="prewarm")
+
+    # Add error handler
+    application.add_error_handler(error_handler)
+    return application
+
 def main():
     """Start the bot."""
+    if not check_credentials():
+        sys.exit(1)
     try:
         # Create the Application
-        application = Application.builder().token(BOT_TOKEN).build()
-
-        # Add handlers
-        application.add_handler(CommandHandler("start", start))
-        application.add_handler(CommandHandler("help", help_command))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-        application.add_handler(CommandHandler("weather", weather_command))
-        application.add_handler(CommandHandler("exchange", exchange_command))
-        application.add_handler(CommandHandler("trnews", tr_news_command))
-        application.add_handler(CommandHandler("worldnews", world_news_command))
-        application.add_handler(CommandHandler("search", search_command))
-        
-        # Add error handler
-        application.add_error_handler(error_handler)
+        application = build_application()
+
+        # Ölçümler: yerel Prometheus uç noktası ve isteğe bağlı örnekleyici profilci
+        start_http_server()
+        if PROFILE:
+            profiler.start()
 
         # Start the Bot
         logger.info("Starting bot...")
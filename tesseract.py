@@ -1,9 +1,14 @@
 from PIL import Image
 import pytesseract
+import io
 import os
+from settings import config
 
-# Eğer Windows kullanıyorsan Tesseract yolu belirt
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Burayı kendi kurulum yoluna göre değiştir
+# Tesseract PATH'te değilse (ör. Windows) yolunu config veya ortam değişkeniyle belirt:
+# [OCR] tesseract_cmd = C:\Program Files\Tesseract-OCR\tesseract.exe
+TESSERACT_CMD = os.getenv('TESSERACT_CMD') or config.get('OCR', 'tesseract_cmd', fallback=None)
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
 def ocr_image_to_text(image_path, lang='eng'):
     try:
@@ -12,9 +17,43 @@ def ocr_image_to_text(image_path, lang='eng'):
     except Exception as e:
         return f"Hata: {e}"
 
-# Örnek kullanım - Windows dosya yolu düzeltmesi
-image_file = r"C:\Users\Yusuf\OneDrive\Desktop\ai projects\DigiMe\photos\1.jpg"  # Raw string kullanarak
-# Alternatif: image_file = "C:/Users/Yusuf/OneDrive/Desktop/ai projects/DigiMe/photos/1.jpg"  # Forward slash kullanarak
+def preprocess_image(image, max_side=1600):
+    """Grayscale, downscale so the longest side is at most max_side, and binarize (Otsu)."""
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side))
 
-text_result = ocr_image_to_text(image_file, lang='eng')  # İngilizce ile test
-print(text_result)
+    # Otsu eşiği: sınıflar arası varyansı en büyük yapan gri seviye
+    histogram = image.histogram()
+    total = sum(histogram)
+    sum_all = sum(i * h for i, h in enumerate(histogram))
+    sum_bg = weight_bg = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        weight_bg += count
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += level * count
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return image.point(lambda p: 255 if p > best_threshold else 0, mode="1")
+
+def ocr_image_bytes(data, lang='tur+eng', max_side=1600):
+    """OCR an encoded image (bytes) after preprocessing; runs in OCR worker processes."""
+    with Image.open(io.BytesIO(data)) as image:
+        prepared = preprocess_image(image, max_side=max_side)
+    return pytesseract.image_to_string(prepared, lang=lang).strip()
+
+if __name__ == "__main__":
+    import sys
+
+    # Örnek kullanım: python tesseract.py photos/1.jpg [dil]
+    image_file = sys.argv[1]
+    text_result = ocr_image_to_text(image_file, lang=sys.argv[2] if len(sys.argv) > 2 else 'eng')
+    print(text_result)
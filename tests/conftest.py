@@ -0,0 +1,11 @@
+# Testler kök dizindeki modülleri ve benchmarks/ altındaki sahte sunucuları kullanır
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# settings modülü içe aktarılırken okunur; gerçek anahtar gerekmez (istekler yerel sahte sunuculara gider)
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123:test")
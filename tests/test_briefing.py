@@ -0,0 +1,69 @@
+"""BriefingAssembler serves the last good value, marked stale, when a source fails or is slow."""
+import asyncio
+
+from data_sources import BriefingAssembler, Provider, render_section
+
+
+class Source:
+    """Fetch function that can be told to fail or to take longer than the deadline."""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.fail = False
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return f"{self.name} #{self.calls}"
+
+
+def test_failed_source_falls_back_to_last_value():
+    source = Source("kur")
+    assembler = BriefingAssembler([Provider("kur", source.fetch, ttl=0)], deadline=1)
+
+    async def run():
+        first, = await assembler.collect()
+        source.fail = True
+        second, = await assembler.collect()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert (first.text, first.stale) == ("kur #1", False)
+    assert (second.text, second.stale) == ("kur #1", True)
+    assert "güncellenemedi" in render_section(second, "alınamadı")
+
+
+def test_source_without_any_value_renders_unavailable():
+    source = Source("haber")
+    source.fail = True
+    assembler = BriefingAssembler([Provider("haber", source.fetch)], deadline=1)
+
+    section, = asyncio.run(assembler.collect())
+
+    assert section.text is None and section.stale
+    assert render_section(section, "📰 alınamadı.") == "📰 alınamadı."
+
+
+def test_slow_source_is_stale_but_refreshes_in_background():
+    fast, slow = Source("hava"), Source("borsa", delay=0.3)
+    # Yenileme süresi bülten süresinden uzun: geç kalan kaynak arka planda tamamlanır
+    assembler = BriefingAssembler([Provider("hava", fast.fetch, ttl=0), Provider("borsa", slow.fetch, ttl=60, timeout=5)],
+                                  deadline=0.1)
+
+    async def run():
+        first = await assembler.collect()
+        await asyncio.sleep(0.4)
+        second = await assembler.collect()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert [(s.text, s.stale) for s in first] == [("hava #1", False), (None, True)]
+    # Arka planda biten ilk yenileme ikinci bültende yeniden çekilmeden kullanılır
+    assert [(s.text, s.stale) for s in second] == [("hava #2", False), ("borsa #1", False)]
+    assert slow.calls == 1
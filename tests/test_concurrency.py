@@ -0,0 +1,57 @@
+"""Simultaneous chats overlap their LLM calls instead of queueing behind each other."""
+import asyncio
+import time
+
+import pytest
+
+from fake_servers import FakeOpenAIServer, start_server
+
+LATENCY = 0.5
+CHATS = 5
+
+
+class WordEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    server = start_server(FakeOpenAIServer(latency=LATENCY))
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    (tmp_path / "prompts").mkdir()
+    (tmp_path / "prompts" / "system_prompt.txt").write_text("Sen yardımsever bir asistansın.", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    import prompt_builder
+    import settings
+    import telegram_bot
+    from rag_engine import MemoryContext
+
+    # İstemci sahte sunucunun adresiyle yeniden oluşturulsun
+    monkeypatch.setattr(settings, "_clients", {})
+    # cl100k_base dosyası indirilmesin; uzunluk kontrolü için kelime sayısı yeterli
+    monkeypatch.setattr(prompt_builder, "_encoding", WordEncoding())
+    # Hafıza indeksi yok; yalnızca LLM çağrıları ölçülür
+    monkeypatch.setattr(telegram_bot, "retrieve_memory_context", lambda prompt, k=3: MemoryContext("", [0.0], 0, []))
+    yield telegram_bot, server
+    server.shutdown()
+
+
+def test_chats_overlap(bot):
+    telegram_bot, server = bot
+
+    async def run():
+        started = time.perf_counter()
+        answers = await asyncio.gather(
+            *(telegram_bot.get_openai_response(f"merhaba {i}", user=i) for i in range(CHATS))
+        )
+        return answers, time.perf_counter() - started
+
+    answers, elapsed = asyncio.run(run())
+
+    assert answers == ["Sahte yanıt."] * CHATS
+    assert server.requests == CHATS
+    assert server.peak_in_flight == CHATS
+    # Sırayla çalışsalardı CHATS * LATENCY sürerdi (ilk çağrı modülleri ve istemciyi de yükler)
+    assert elapsed < CHATS * LATENCY / 2
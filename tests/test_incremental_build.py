@@ -0,0 +1,66 @@
+"""build_memory embeds only what changed, counted with a local fake embedding function."""
+import pytest
+
+from bench_incremental_build import CountingEmbeddings
+from embedding_store import EmbeddingStore
+from memory_engine import build_memory
+
+DOCS = 6
+
+
+def write_note(path, seed, paragraphs=12):
+    path.write_text(
+        "\n\n".join(f"Not {seed}, paragraf {p}: " + "anı ve not " * 20 for p in range(paragraphs)),
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    source = tmp_path / "source_docs"
+    source.mkdir()
+    for i in range(DOCS):
+        write_note(source / f"not_{i}.txt", i)
+    store = EmbeddingStore(str(tmp_path / "embedding_cache.sqlite"), 16)
+    yield source, str(tmp_path / "vector_store"), store
+    store.close()
+
+
+def build(corpus, embeddings):
+    source, index_path, store = corpus
+    embeddings.calls = embeddings.texts = 0
+    return build_memory(str(source), index_path, embeddings=embeddings, store=store, workers=1, batch_size=16)
+
+
+def test_unchanged_rebuild_embeds_nothing(corpus):
+    embeddings = CountingEmbeddings()
+    stats = build(corpus, embeddings)
+    assert stats["added"] == DOCS
+    assert embeddings.calls > 0
+
+    stats = build(corpus, embeddings)
+    assert stats == {"added": 0, "removed": 0, "unchanged": DOCS, "failed": 0}
+    assert embeddings.calls == 0
+    assert embeddings.texts == 0
+
+
+def test_new_file_embeds_only_its_chunks(corpus):
+    embeddings = CountingEmbeddings()
+    build(corpus, embeddings)
+    full = embeddings.texts
+
+    write_note(corpus[0] / "yeni.txt", DOCS)
+    stats = build(corpus, embeddings)
+    assert stats["added"] == 1 and stats["unchanged"] == DOCS
+    # Her dosya aynı sayıda parçaya bölünür
+    assert embeddings.texts == full // DOCS
+
+
+def test_removed_file_embeds_nothing(corpus):
+    embeddings = CountingEmbeddings()
+    build(corpus, embeddings)
+
+    (corpus[0] / "not_0.txt").unlink()
+    stats = build(corpus, embeddings)
+    assert stats["removed"] == 1
+    assert embeddings.calls == 0
@@ -0,0 +1,105 @@
+"""StreamingReply: first text is shown at once, edits are throttled, long text rolls over."""
+import asyncio
+import time
+
+import openai
+
+from fake_servers import FakeOpenAIServer, start_server
+from stream_reply import StreamingReply, complete_chat
+
+
+class FakeMessage:
+    """Stand-in for telegram.Message that records sends, edits and deletes."""
+
+    def __init__(self, log, text=""):
+        self.log = log
+        self.text = text
+        self.deleted = False
+
+    async def reply_text(self, text):
+        message = FakeMessage(self.log, text)
+        self.log.append(("send", time.perf_counter(), text))
+        return message
+
+    async def edit_text(self, text):
+        self.text = text
+        self.log.append(("edit", time.perf_counter(), text))
+        return self
+
+    async def delete(self):
+        self.deleted = True
+        self.log.append(("delete", time.perf_counter(), self.text))
+        return True
+
+
+def kinds(log):
+    return [kind for kind, _, _ in log]
+
+
+def test_first_delta_is_sent_immediately_then_throttled():
+    log = []
+    reply = StreamingReply(FakeMessage(log), edit_interval=60)
+
+    async def run():
+        await reply.feed("Merhaba")
+        await reply.feed(" dünya")
+        await reply.feed("!")
+        await reply.finish()
+
+    asyncio.run(run())
+
+    # İlk parça hemen gönderilir, aradakiler aralık dolmadan düzenlenmez, son hal bir kez yazılır
+    assert kinds(log) == ["send", "edit"]
+    assert log[0][2] == "Merhaba"
+    assert log[-1][2] == "Merhaba dünya!"
+    assert reply.first_visible is not None
+
+
+def test_long_text_rolls_over_and_shrinking_deletes_extra_messages():
+    log = []
+    reply = StreamingReply(FakeMessage(log), edit_interval=0, max_length=10)
+
+    async def run():
+        await reply.feed("a" * 25)
+        sent = list(reply._sent)
+        await reply.finish("b" * 8)
+        return sent
+
+    sent = asyncio.run(run())
+
+    assert kinds(log)[:3] == ["send", "send", "send"]
+    assert [text for kind, _, text in log if kind == "send"] == ["a" * 10, "a" * 10, "a" * 5]
+    # Son metin tek mesaja sığıyor: ilk mesaj düzenlenir, diğer ikisi silinir
+    assert sent[0].text == "b" * 8
+    assert not sent[0].deleted and sent[1].deleted and sent[2].deleted
+    assert reply._sent == [sent[0]]
+
+
+def test_streamed_reply_is_visible_before_the_completion_ends():
+    words = 40
+    server = start_server(FakeOpenAIServer(latency=0.1, reply=" ".join(f"kelime{i}" for i in range(words)),
+                                           token_delay=0.02))
+    client = openai.AsyncOpenAI(api_key="sk-test", base_url=server.base_url, max_retries=0)
+    log = []
+
+    async def run():
+        started = time.perf_counter()
+        reply = StreamingReply(FakeMessage(log), edit_interval=0.2)
+        text = await complete_chat(client, on_delta=reply.feed, model="gpt-3.5-turbo",
+                                   messages=[{"role": "user", "content": "merhaba"}])
+        await reply.finish(text)
+        return started, time.perf_counter(), text
+
+    try:
+        started, finished, text = asyncio.run(run())
+    finally:
+        server.shutdown()
+
+    first_visible = log[0][1] - started
+    assert text.split() == [f"kelime{i}" for i in range(words)]
+    assert kinds(log)[0] == "send" and kinds(log).count("send") == 1
+    # Tamamı ~0.9 sn sürer; ilk kelime gecikme + bir token içinde görünür
+    assert first_visible < (finished - started) / 2
+    # Düzenlemeler edit_interval ile sınırlı: kelime başına bir düzenleme yapılmaz
+    assert kinds(log).count("edit") < words / 4
+    assert log[-1][2] == text
@@ -0,0 +1,17 @@
+# Türkçe'ye duyarlı metin yardımcıları
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def turkish_lower(text: str) -> str:
+    """Lowercase with Turkish rules: 'I' -> 'ı' and 'İ' -> 'i'."""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def normalize_query(text: str) -> str:
+    """Turkish-aware casefold, punctuation stripped and whitespace collapsed."""
+    text = turkish_lower(text)
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+    return _WHITESPACE.sub(" ", text).strip()
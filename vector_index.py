@@ -0,0 +1,102 @@
+# Hafıza indeksi için FAISS indeks türleri ve bellek eşlemeli (mmap) salt okunur yükleme
+import logging
+import math
+
+import faiss
+import numpy as np
+
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+# Derleme zamanında seçilir: flat (tam arama), ivf, hnsw, pq (IVF + ürün nicemleme)
+INDEX_TYPE = config.get('Memory', 'index_type', fallback='flat')
+IVF_NLIST = config.getint('Memory', 'nlist', fallback=0)  # 0: vektör sayısından (≈ 4·√n)
+HNSW_M = config.getint('Memory', 'hnsw_m', fallback=32)
+PQ_M = config.getint('Memory', 'pq_m', fallback=64)  # alt vektör sayısı; boyutu bölen en yakın değer kullanılır
+PQ_BITS = config.getint('Memory', 'pq_bits', fallback=8)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq")
+
+
+def _nlist(n):
+    # k-means her merkez için en az ~39 eğitim vektörü ister
+    return max(1, min(IVF_NLIST or int(4 * math.sqrt(n)), n // 39))
+
+
+def _pq_m(dim):
+    return max(m for m in range(1, min(PQ_M, dim) + 1) if dim % m == 0)
+
+
+def factory_string(index_type, dim, n):
+    """faiss.index_factory description for `index_type` over n vectors of `dim`."""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{_nlist(n)},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+    if index_type == "pq":
+        return f"IVF{_nlist(n)},PQ{_pq_m(dim)}x{PQ_BITS}"
+    raise ValueError(f"Unknown index type {index_type!r}, expected one of {', '.join(INDEX_TYPES)}")
+
+
+def flat_vectors(index):
+    """Every vector of a flat index as an (n, dim) float32 array, in position order."""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def build_index(vectors, index_type=INDEX_TYPE):
+    """
+    Build (and train, if needed) an `index_type` index over `vectors`.
+
+    Positions in the new index are the rows of `vectors`, so the flat
+    index's docstore mapping applies unchanged. HNSW cannot delete vectors,
+    so the index is always rebuilt from scratch. Returns None for "flat", or
+    when there are too few vectors to train the IVF centroids or PQ codebooks
+    (including an empty corpus); the flat index is searched instead.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {', '.join(INDEX_TYPES)}")
+    if index_type == "flat":
+        return None
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+    # k-means her merkez için ~39 vektör ister, PQ kod kitabı da 2^bits
+    min_vectors = {"ivf": 39 * _nlist(n), "hnsw": 1, "pq": max(39 * _nlist(n), 2 ** PQ_BITS)}[index_type]
+    if n < min_vectors:
+        logger.info("Only %d vectors, too few for a %s index; keeping the flat index", n, index_type)
+        return None
+    index = faiss.index_factory(dim, factory_string(index_type, dim, n), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def read_index(path, mmap=True):
+    """
+    faiss.read_index, memory-mapped and read-only when `mmap` is set.
+
+    Vectors and codes are then served from the page cache and shared by
+    every worker process on the host; only the pages a search touches are
+    read. Falls back to a normal read if this faiss build cannot map the
+    index type.
+    """
+    if mmap:
+        flags = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            logger.warning("Could not memory-map %s (%s); reading it into RAM", path, e)
+    return faiss.read_index(path)
+
+
+def tune(index, nprobe, ef_search):
+    """Set the search-time knobs that apply to this index type."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
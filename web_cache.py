@@ -0,0 +1,184 @@
+# get_web_summary için TTL + LRU sonuç önbelleği
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from concurrency import blocking_executor, run_blocking
+from text_utils import normalize_query
+from settings import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = config.getfloat('WebCache', 'ttl', fallback=600)
+CACHE_MAX_ENTRIES = config.getint('WebCache', 'max_entries', fallback=256)
+CACHE_PATH = config.get('WebCache', 'path', fallback='') or None
+# Kalıcı dosya her set'te değil, bu kadar saniye içindeki değişiklikler toplanarak yazılır
+SAVE_DELAY = config.getfloat('WebCache', 'save_delay', fallback=2)
+
+
+class ResultCache:
+    """
+    TTL + LRU cache keyed on the normalized query.
+
+    Concurrent requests for the same key share a single in-flight
+    computation (single-flight); if that computation is cancelled, a waiter
+    takes over instead of seeing the cancellation. When `path` is set,
+    entries are written to a JSON file so the cache survives restarts; the
+    writes are batched over `save_delay` seconds and done on the blocking
+    pool. `shared` (a
+    shared_state.SharedNamespace) is consulted on local misses, so webhook
+    workers reuse each other's results; its IPC calls run off the event loop.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, path=CACHE_PATH, shared=None,
+                 save_delay=SAVE_DELAY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.shared = shared
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._save_handle = None
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Web cache could not be loaded: %s", e)
+            return
+        now = time.time()
+        for key, expires_at, value in stored:
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        self._evict()
+
+    def _schedule_save(self):
+        if not self.path or self._save_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Event loop dışından çağrıldı: hemen yaz
+            self._write(self._snapshot())
+            return
+        self._save_handle = loop.call_later(self.save_delay, self._flush)
+
+    def _snapshot(self):
+        # Girdiler yalnızca event loop'ta değişir; kopya burada alınır, dosyaya arka planda yazılır
+        return [[k, exp, v] for k, (exp, v) in self._entries.items()]
+
+    def _flush(self):
+        self._save_handle = None
+        blocking_executor.submit(self._write, self._snapshot())
+
+    def _write(self, snapshot):
+        tmp_path = self.path + ".tmp"
+        with self._write_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning("Web cache could not be saved: %s", e)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Local entry for key (the shared store is only read by get_or_compute)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        self._evict()
+        self._schedule_save()
+        if self.shared is not None:
+            # Durum sunucusuna yazma arka planda; çağıran beklemez
+            blocking_executor.submit(self.shared.set, key, value, self.ttl)
+
+    async def _get_shared(self, key):
+        if self.shared is None:
+            return None
+        value = await run_blocking(self.shared.get, key)
+        if value is not None:
+            # Sonraki isabetler için yerel kopyaya da al
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._evict()
+        return value
+
+    async def get_or_compute(self, query, compute, cacheable=lambda value: True):
+        """Return the cached value for query, or await compute() once for all concurrent callers."""
+        key = normalize_query(query)
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                return await self._lead(key, compute, cacheable)
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Lider iptal edildiyse hesaplamayı bu çağıran üstlenir; kendi iptali ise yukarı iletilir
+                if not inflight.cancelled():
+                    raise
+
+    async def _lead(self, key, compute, cacheable):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            # Paylaşılan önbelleğe de tek istek gider; bekleyenler bu future'a bağlanır
+            value = await self._get_shared(key)
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                value = await compute()
+                if cacheable(value):
+                    self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Bekleyen yoksa "exception was never retrieved" uyarısını engelle
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
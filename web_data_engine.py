@@ -1,98 +1,77 @@
-import requests
 import json
+import logging
 from datetime import datetime
 import os
-from configparser import ConfigParser
 import re
-from bs4 import BeautifulSoup
-from googlesearch import search
-import openai
+from concurrency import run_blocking
+from web_fetcher import fetcher
+from web_cache import ResultCache
+from shared_state import shared_cache
+from html_extract import extract_text
+from llm_dispatch import dispatcher
+from prompt_builder import build_web_content
+from intent_router import router, WEB_SEARCH
+from data_sources import Provider, BriefingAssembler, REFRESH_TIMEOUT, render_section
+from metrics import span, timed
+from settings import OPENAI_API_KEY, config, get_openai_client
 
-# Load API keys from config
-config = ConfigParser()
-config.read('config/settings.ini')
+logger = logging.getLogger(__name__)
 
-# Get OpenAI API key
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    OPENAI_API_KEY = config.get('OpenAI', 'api_key', fallback=None)
+# Aynı sorgular için arama + özetleme zincirini tekrar çalıştırmaz (webhook işçileri arasında paylaşılır)
+web_cache = ResultCache(shared=shared_cache("web"))
 
-if OPENAI_API_KEY:
-    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+def search(query, num_results=3, lang="tr"):
+    """googlesearch.search; the package (requests + BeautifulSoup) is imported on first use."""
+    from googlesearch import search as google_search
+    return list(google_search(query, num_results=num_results, lang=lang))
 
 def should_use_web(message: str) -> bool:
     """Check if the message should trigger web search"""
-    # Güncel olaylar, haberler, savaş, ekonomi vb. ile ilgili anahtar kelimeler
-    keywords = [
-        "savaş", "son durum", "bugün", "dün", "gündem", "enflasyon", "deprem", 
-        "güncel", "zam", "seçim", "kur", "dolar", "euro", "altın", "borsa",
-        "iran", "israil", "ukrayna", "rusya", "abd", "çin", "türkiye",
-        "haber", "gelişme", "olay", "kriz", "anlaşma", "toplantı", "zirve",
-        "2024", "2023", "bu ay", "bu hafta", "son dakika", "acil", "önemli"
-    ]
-    return any(word in message.lower() for word in keywords)
+    # Güncel olaylar, haberler, savaş, ekonomi vb. anahtar kelimeleri intent_router'da
+    return router.top_intent(message) == WEB_SEARCH
 
+@timed("web.clean_text")
 def clean_text(text: str) -> str:
     """Clean and extract meaningful text from HTML content"""
-    if not text:
-        return ""
-    
-    # HTML etiketlerini temizle
-    soup = BeautifulSoup(text, 'html.parser')
-    
-    # Script ve style etiketlerini kaldır
-    for script in soup(["script", "style"]):
-        script.decompose()
-    
-    # Metni al
-    text = soup.get_text()
-    
-    # Fazla boşlukları temizle
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = ' '.join(chunk for chunk in chunks if chunk)
-    
-    # Çok uzun metni kısalt (OpenAI token limiti için)
-    if len(text) > 3000:
-        text = text[:3000] + "..."
-    
-    return text
+    # Tek geçişte script/style/menü gibi kısımları atlar, 3000 karakterde durur
+    return extract_text(text, limit=3000)
 
-def search_google(query: str, num_results: int = 3) -> list:
+async def search_google(query: str, num_results: int = 3) -> list:
     """Search Google and return results"""
     try:
-        results = []
-        search_query = f"{query} güncel haber son durum"
-        
-        for url in search(search_query, num_results=num_results, lang="tr"):
-            try:
-                response = requests.get(url, timeout=10, headers={
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                })
-                response.raise_for_status()
-                
-                content = clean_text(response.text)
+        # Hata da "web.search.errors" olarak sayılır
+        with span("web.search"):
+            search_query = f"{query} güncel haber son durum"
+            # googlesearch senkron çalışır, event loop'u bloklamasın
+            with span("web.google"):
+                urls = await run_blocking(lambda: search(search_query, num_results=num_results, lang="tr"))
+
+            # Sayfalar paralel indirilir; süre sınırını aşanlar atlanır
+            pages = await fetcher.fetch_all(urls)
+
+            results = []
+            for url, html in pages:
+                content = await run_blocking(clean_text, html)
                 if content and len(content) > 100:  # Anlamlı içerik varsa
                     results.append({
                         'url': url,
                         'content': content[:1000]  # İlk 1000 karakter
                     })
-            except Exception as e:
-                continue
-        
-        return results
+            logger.info("Web search %r: %d of %d pages usable", query, len(results), len(pages))
+            return results
     except Exception as e:
-        print(f"Google search error: {e}")
+        logger.warning("Google search failed for %r: %s", query, e)
         return []
 
-def summarize_with_gpt(content_list: list, query: str) -> str:
+async def summarize_with_gpt(content_list: list, query: str, on_delta=None, user=None) -> str:
     """Summarize search results using GPT"""
     try:
         if not OPENAI_API_KEY or not content_list:
             return "📡 Güncel bilgi alınamadı. Lütfen daha sonra tekrar deneyin."
         
         # İçerikleri birleştir
-        combined_content = "\n\n".join([f"Kaynak: {item['url']}\nİçerik: {item['content']}" for item in content_list])
+        # Token bütçesine sığacak kadarını, tekrarları atarak al
+        combined_content, _ = build_web_content(content_list)
         
         prompt = f"""
         Aşağıdaki web içeriklerini analiz ederek "{query}" konusu hakkında güncel ve özet bilgi ver.
@@ -110,7 +89,11 @@ def summarize_with_gpt(content_list: list, query: str) -> str:
         Özet:
         """
         
-        response = openai_client.chat.completions.create(
+        # on_delta verilirse yanıt parça parça akıtılır; çağrı kullanıcının kuyruğundan geçer
+        return await dispatcher.chat(
+            user,
+            get_openai_client(),
+            on_delta=on_delta,
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "Sen güncel haber ve olayları analiz eden bir asistan. Sadece verilen kaynaklardaki bilgileri kullan."},
@@ -119,131 +102,165 @@ def summarize_with_gpt(content_list: list, query: str) -> str:
             max_tokens=500
         )
         
-        return response.choices[0].message.content.strip()
-        
     except Exception as e:
         return f"📡 Özetleme hatası: {str(e)}"
 
-def get_web_summary(query: str) -> str:
-    """Get web summary for a query"""
-    try:
-        print(f"🔍 Web araması yapılıyor: {query}")
-        
+async def _build_web_summary(query: str, on_delta=None, user=None):
+    """Search + summarize; returns (summary, cacheable), summary is None when nothing was found"""
+    with span("web.summary"):
+        logger.info("Web search started: %r", query)
+
         # Google'da ara
-        search_results = search_google(query)
-        
+        search_results = await search_google(query)
+
         if not search_results:
-            return "📡 Bu konuyla ilgili güncel bilgi bulunamadı."
-        
+            logger.info("Web search %r found nothing", query)
+            return None, False
+
         # GPT ile özetle
-        summary = summarize_with_gpt(search_results, query)
-        
-        return f"📡 **{query}** - Güncel Bilgi:\n\n{summary}"
-        
+        summary = await summarize_with_gpt(search_results, query, on_delta=on_delta, user=user)
+
+    # summarize_with_gpt hata mesajlarını 📡 ile döndürür, bunları önbelleğe alma
+    return summary, not summary.startswith("📡")
+
+async def get_web_summary(query: str, on_delta=None, user=None) -> str:
+    """Get web summary for a query (cached per normalized query)
+
+    on_delta receives the summary as it streams; it is not called when the
+    result comes from the cache or from another caller's in-flight search.
+    """
+    try:
+        summary, _ = await web_cache.get_or_compute(
+            query, lambda: _build_web_summary(query, on_delta, user), cacheable=lambda result: result[1]
+        )
     except Exception as e:
         return f"📡 Web arama hatası: {str(e)}"
+    if summary is None:
+        return "📡 Bu konuyla ilgili güncel bilgi bulunamadı."
+    # Başlık her çağıranın kendi sorgusuyla yazılır; önbellekte yalnızca özet durur
+    return f"📡 **{query}** - Güncel Bilgi:\n\n{summary}"
 
 def get_weather(city="Istanbul"):
     """Get current weather for a city"""
-    try:
-        # You can add your weather API key to config/settings.ini
-        # weather_api_key = config.get('Weather', 'api_key', fallback=None)
-        
-        # For now, return a mock response
-        weather_data = {
-            "city": city,
-            "temperature": "22°C",
-            "condition": "Güneşli",
-            "humidity": "65%",
-            "wind": "15 km/h"
-        }
-        
-        return f"🌤️ {city} Hava Durumu:\n🌡️ Sıcaklık: {weather_data['temperature']}\n☀️ Durum: {weather_data['condition']}\n💧 Nem: {weather_data['humidity']}\n💨 Rüzgar: {weather_data['wind']}"
-    except Exception as e:
-        return f"Hava durumu bilgisi alınamadı: {str(e)}"
+    # You can add your weather API key to config/settings.ini
+    # weather_api_key = config.get('Weather', 'api_key', fallback=None)
+    
+    # For now, return a mock response
+    weather_data = {
+        "city": city,
+        "temperature": "22°C",
+        "condition": "Güneşli",
+        "humidity": "65%",
+        "wind": "15 km/h"
+    }
+    
+    return f"🌤️ {city} Hava Durumu:\n🌡️ Sıcaklık: {weather_data['temperature']}\n☀️ Durum: {weather_data['condition']}\n💧 Nem: {weather_data['humidity']}\n💨 Rüzgar: {weather_data['wind']}"
 
 def get_exchange_rates():
     """Get current exchange rates"""
-    try:
-        # Mock exchange rates (you can integrate with a real API)
-        rates = {
-            "USD/TRY": "31.45",
-            "EUR/TRY": "34.20",
-            "GBP/TRY": "39.80",
-            "Gold": "2,150 TL/gr"
-        }
-        
-        result = "💱 Güncel Döviz Kurları:\n"
-        for currency, rate in rates.items():
-            result += f"💰 {currency}: {rate}\n"
-        
-        return result
-    except Exception as e:
-        return f"Döviz kurları alınamadı: {str(e)}"
+    # Mock exchange rates (you can integrate with a real API)
+    rates = {
+        "USD/TRY": "31.45",
+        "EUR/TRY": "34.20",
+        "GBP/TRY": "39.80",
+        "Gold": "2,150 TL/gr"
+    }
+    
+    result = "💱 Güncel Döviz Kurları:\n"
+    for currency, rate in rates.items():
+        result += f"💰 {currency}: {rate}\n"
+    
+    return result
 
 def get_tr_news():
     """Get latest Turkish news"""
-    try:
-        # Mock Turkish news (you can integrate with a real news API)
-        news = [
-            "🇹🇷 Türkiye'de yeni teknoloji yatırımları başlatıldı",
-            "📈 Borsa İstanbul'da pozitif seyir",
-            "🏭 Sanayi üretimi artış gösterdi",
-            "🎓 Eğitim sisteminde yeni düzenlemeler"
-        ]
-        
-        result = "📰 Türkiye Gündemi:\n"
-        for i, headline in enumerate(news, 1):
-            result += f"{i}. {headline}\n"
-        
-        return result
-    except Exception as e:
-        return f"Türkiye haberleri alınamadı: {str(e)}"
+    # Mock Turkish news (you can integrate with a real news API)
+    news = [
+        "🇹🇷 Türkiye'de yeni teknoloji yatırımları başlatıldı",
+        "📈 Borsa İstanbul'da pozitif seyir",
+        "🏭 Sanayi üretimi artış gösterdi",
+        "🎓 Eğitim sisteminde yeni düzenlemeler"
+    ]
+    
+    result = "📰 Türkiye Gündemi:\n"
+    for i, headline in enumerate(news, 1):
+        result += f"{i}. {headline}\n"
+    
+    return result
 
 def get_world_news():
     """Get latest world news"""
-    try:
-        # Mock world news (you can integrate with a real news API)
-        news = [
-            "🌍 Küresel iklim değişikliği zirvesi düzenlendi",
-            "💻 Yapay zeka teknolojilerinde yeni gelişmeler",
-            "🏥 Sağlık sektöründe inovasyon projeleri",
-            "🚀 Uzay araştırmalarında yeni keşifler"
-        ]
-        
-        result = "🌐 Dünya Gündemi:\n"
-        for i, headline in enumerate(news, 1):
-            result += f"{i}. {headline}\n"
-        
-        return result
-    except Exception as e:
-        return f"Dünya haberleri alınamadı: {str(e)}"
+    # Mock world news (you can integrate with a real news API)
+    news = [
+        "🌍 Küresel iklim değişikliği zirvesi düzenlendi",
+        "💻 Yapay zeka teknolojilerinde yeni gelişmeler",
+        "🏥 Sağlık sektöründe inovasyon projeleri",
+        "🚀 Uzay araştırmalarında yeni keşifler"
+    ]
+    
+    result = "🌐 Dünya Gündemi:\n"
+    for i, headline in enumerate(news, 1):
+        result += f"{i}. {headline}\n"
+    
+    return result
+
+# Bülten bölümleri: her kaynak kendi TTL'i ile önbelleklenir ve paralel sorgulanır.
+# Kaynak fonksiyonları hata durumunda exception fırlatır (hata metni döndürmez) ki
+# son bilinen değer "eski" olarak gösterilebilsin; mesajlar render_section'da yazılır.
+briefing_providers = [
+    Provider("weather", get_weather, ttl=config.getfloat('Briefing', 'weather_ttl', fallback=600),
+             timeout=config.getfloat('Briefing', 'weather_timeout', fallback=REFRESH_TIMEOUT)),
+    Provider("exchange", get_exchange_rates, ttl=config.getfloat('Briefing', 'exchange_ttl', fallback=60),
+             timeout=config.getfloat('Briefing', 'exchange_timeout', fallback=REFRESH_TIMEOUT)),
+    Provider("tr_news", get_tr_news, ttl=config.getfloat('Briefing', 'news_ttl', fallback=300),
+             timeout=config.getfloat('Briefing', 'news_timeout', fallback=REFRESH_TIMEOUT)),
+    Provider("world_news", get_world_news, ttl=config.getfloat('Briefing', 'news_ttl', fallback=300),
+             timeout=config.getfloat('Briefing', 'news_timeout', fallback=REFRESH_TIMEOUT)),
+]
+briefing_assembler = BriefingAssembler(briefing_providers)
+# Ne güncel ne eski değeri olan bölüm için gösterilecek metin
+unavailable_messages = {
+    "weather": "🌤️ Hava durumu bilgisi alınamadı.",
+    "exchange": "💱 Döviz kurları alınamadı.",
+    "tr_news": "📰 Türkiye haberleri alınamadı.",
+    "world_news": "🌐 Dünya haberleri alınamadı.",
+}
 
-def get_daily_briefing():
+async def get_briefing_section(name: str) -> str:
+    """One briefing section for a command reply, from the same cache as the daily briefing"""
+    section, = await briefing_assembler.collect([name])
+    return render_section(section, unavailable_messages[name])
+
+async def get_daily_briefing():
     """Get comprehensive daily briefing with weather, exchange rates, and news"""
     try:
         today = datetime.now().strftime("%d.%m.%Y %A")
         
         briefing = f"📊 GÜNLÜK BÜLTEN - {today}\n\n"
         
+        # Tüm kaynaklar aynı anda; süreyi aşanlar son bilinen değerle doldurulur
+        weather, rates, tr_news, world_news = await briefing_assembler.collect()
+        
         # Add weather
-        briefing += get_weather() + "\n\n"
+        briefing += render_section(weather, unavailable_messages["weather"]) + "\n\n"
         
         # Add exchange rates
-        briefing += get_exchange_rates() + "\n"
+        briefing += render_section(rates, unavailable_messages["exchange"]) + "\n"
         
         # Add Turkish news
-        briefing += get_tr_news() + "\n"
+        briefing += render_section(tr_news, unavailable_messages["tr_news"]) + "\n"
         
         # Add world news
-        briefing += get_world_news()
+        briefing += render_section(world_news, unavailable_messages["world_news"])
         
         return briefing
     except Exception as e:
         return f"Günlük bülten hazırlanamadı: {str(e)}"
 
 if __name__ == "__main__":
+    import asyncio
+
     # Test the functions
     print("Testing web_data_engine functions...")
     print("\n" + "="*50)
-    print(get_daily_briefing())
+    print(asyncio.run(get_daily_briefing()))
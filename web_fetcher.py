@@ -0,0 +1,105 @@
+# Web arama sonuçları için paralel, havuzlu ve bayt sınırlı sayfa indirici
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import span
+from settings import config
+
+MAX_BYTES = config.getint('Fetcher', 'max_bytes', fallback=256 * 1024)
+DEADLINE = config.getfloat('Fetcher', 'deadline', fallback=6.0)
+PER_HOST = config.getint('Fetcher', 'per_host', fallback=2)
+TIMEOUT = config.getfloat('Fetcher', 'timeout', fallback=5.0)
+MAX_CONNECTIONS = config.getint('Fetcher', 'max_connections', fallback=32)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class PageFetcher:
+    """
+    Fetches many URLs concurrently through one pooled httpx client.
+
+    Each host gets at most `per_host` parallel requests, every body is
+    streamed and cut off after `max_bytes`, and non-HTML responses are
+    dropped from their headers alone. `fetch_all` returns whatever
+    finished before the overall deadline.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, deadline=DEADLINE, per_host=PER_HOST, timeout=TIMEOUT):
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.per_host = per_host
+        self.timeout = timeout
+        self._client = None
+        self._loop = None
+        self._host_limits = {}
+
+    def _get_client(self):
+        # httpx istemcisi event loop'a bağlıdır; loop değişirse yeniden oluştur
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={'User-Agent': USER_AGENT},
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def fetch(self, url):
+        """Return the (possibly truncated) HTML of url, or None."""
+        client = self._get_client()
+        async with self._host_limit(url):
+            with span("web.fetch"):
+                return await self._read(client, url)
+
+    async def _read(self, client, url):
+        async with client.stream("GET", url) as response:
+            if response.status_code >= 400:
+                return None
+            content_type = response.headers.get("content-type", "").lower()
+            if content_type and not content_type.startswith(HTML_TYPES):
+                return None
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) >= self.max_bytes:
+                    break
+            return bytes(body[:self.max_bytes]).decode(response.encoding or "utf-8", errors="replace")
+
+    async def fetch_all(self, urls, deadline=None):
+        """Fetch urls concurrently; return [(url, html)] finished before the deadline, in input order."""
+        if not urls:
+            return []
+        deadline = self.deadline if deadline is None else deadline
+        tasks = {asyncio.ensure_future(self.fetch(url)): url for url in urls}
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+        pages = {}
+        for task in done:
+            if not task.cancelled() and task.exception() is None and task.result():
+                pages[tasks[task]] = task.result()
+        return [(url, pages[url]) for url in urls if url in pages]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Tüm aramalarda paylaşılan indirici
+fetcher = PageFetcher()
@@ -0,0 +1,470 @@
+# Webhook modu: HTTP ön yüz güncellemeleri chat_id'ye göre tutarlı hash ile işçi süreçlere dağıtır
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from bisect import bisect
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+import shared_state
+from settings import BOT_TOKEN, check_credentials, config
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = config.get('Webhook', 'url', fallback='')  # Telegram'ın çağıracağı genel adres
+WEBHOOK_LISTEN = config.get('Webhook', 'listen', fallback='0.0.0.0:8443')
+WEBHOOK_SECRET = config.get('Webhook', 'secret_token', fallback='')
+WEBHOOK_WORKERS = config.getint('Webhook', 'workers', fallback=os.cpu_count() or 2)
+WORKER_BASE_PORT = config.getint('Webhook', 'worker_base_port', fallback=9100)
+FORWARD_BATCH = config.getint('Webhook', 'forward_batch', fallback=100)
+QUEUE_SIZE = config.getint('Webhook', 'queue_size', fallback=10000)
+# Bağlantı hataları ve 5xx en fazla bu kadar tekrar denenir; sonra Telegram'a 503 dönülür ve o yeniden gönderir
+FORWARD_RETRIES = config.getint('Webhook', 'forward_retries', fallback=3)
+# İşçinin kabul etmediği (4xx) güncellemeler buraya JSON satırı olarak yazılır
+DEAD_LETTER_PATH = config.get('Webhook', 'dead_letter_path', fallback='memory/webhook_dead_letter.jsonl')
+# İşçi son bu kadar update_id'yi hatırlar; tekrar gelen güncellemeler işlenmez
+DEDUP_WINDOW = config.getint('Webhook', 'dedup_window', fallback=10000)
+# Bundan büyük gövdeler okunmadan reddedilir (işçiler partiler halinde alır: batch katı)
+MAX_BODY = config.getint('Webhook', 'max_body', fallback=1024 * 1024)
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 413: "Payload Too Large",
+               503: "Service Unavailable"}
+
+
+class HashRing:
+    """Consistent hash ring; adding or removing a node moves only ~1/N of the keys."""
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = list(nodes)
+        points = []
+        for node in self.nodes:
+            for i in range(replicas):
+                points.append((self._hash(f"{node}#{i}"), node))
+        points.sort()
+        self._keys = [h for h, _ in points]
+        self._nodes = [n for _, n in points]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(str(value).encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key):
+        i = bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._nodes[i]
+
+
+def chat_key(update):
+    """chat id of a raw Update dict (falls back to the sender, then the update id)."""
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+        user = value.get("from")
+        if user and "id" in user:
+            return user["id"]
+    return update.get("update_id", 0)
+
+
+class RecentIds:
+    """The last `size` update ids a worker accepted, so redelivered updates are handled once."""
+
+    def __init__(self, size=DEDUP_WINDOW):
+        self.size = size
+        self._order = deque()
+        self._ids = set()
+
+    def add(self, update_id):
+        """Remember update_id; False if it was already seen."""
+        if update_id in self._ids:
+            return False
+        self._ids.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self.size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class BodyTooLarge(Exception):
+    """Content-Length above the server's limit; the body is left unread."""
+
+
+async def read_request(reader, max_body=MAX_BODY):
+    """Minimal HTTP/1.1 request parser: (method, path, headers, body) or None on EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length < 0:
+        raise ValueError("negative Content-Length")
+    if length > max_body:
+        raise BodyTooLarge(length)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def write_response(writer, status, body=b"", content_type="application/json"):
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+
+
+async def serve_http(handle, host, port, max_body=MAX_BODY):
+    """
+    Keep-alive HTTP server calling `handle(method, path, headers, body)` -> (status, body).
+
+    Requests with a body over `max_body` bytes get 413 and the connection
+    is closed without reading it.
+    """
+    async def on_connection(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader, max_body)
+                if request is None:
+                    break
+                status, body = await handle(*request)
+                write_response(writer, status, body)
+                await writer.drain()
+        except BodyTooLarge as e:
+            logger.warning("Rejected a %d byte request body from %s", e.args[0], writer.get_extra_info("peername"))
+            write_response(writer, 413)  # close() gönderir
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    return await asyncio.start_server(on_connection, host, port)
+
+
+class WebhookFront:
+    """
+    Receives Telegram's webhook calls and forwards each update to the
+    worker that owns its chat (consistent hash on chat_id).
+
+    Every worker has one ordered queue and one forwarding loop, so a chat's
+    updates reach its worker in the order they arrived; batches of up to
+    `batch` updates are posted at once. Telegram only gets its 200 once the
+    worker has accepted the update, so nothing it considers delivered is
+    lost if the front stops. Connection errors and 5xx answers are retried
+    `retries` times, then the front answers 503 and Telegram redelivers the
+    update later (as it does when a worker's queue is full). Any other
+    error is not retried: the batch is appended to `dead_letter_path`.
+    """
+
+    def __init__(self, worker_urls, secret_token=WEBHOOK_SECRET, path="/", batch=FORWARD_BATCH, queue_size=QUEUE_SIZE,
+                 retries=FORWARD_RETRIES, dead_letter_path=DEAD_LETTER_PATH):
+        if not secret_token:
+            raise ValueError("Webhook mode needs [Webhook] secret_token to be set")
+        self.worker_urls = list(worker_urls)
+        self.ring = HashRing(self.worker_urls)
+        self.secret_token = secret_token
+        self.path = path
+        self.batch = batch
+        self.queue_size = queue_size
+        self.retries = retries
+        self.dead_letter_path = dead_letter_path
+        self.received = 0
+        self.forwarded = dict.fromkeys(self.worker_urls, 0)
+        self.rejected = 0
+        self.redelivered = 0
+        self.dead_lettered = 0
+        self._queues = {}
+        self._tasks = []
+        self._client = None
+
+    async def start(self, host, port):
+        self._client = httpx.AsyncClient(timeout=10)
+        for url in self.worker_urls:
+            self._queues[url] = asyncio.Queue(self.queue_size)
+            self._tasks.append(asyncio.ensure_future(self._forward(url)))
+        self._server = await serve_http(self.handle, host, port)
+        logger.info("Webhook front on %s:%d, %d workers", host, port, len(self.worker_urls))
+        return self._server
+
+    async def stop(self):
+        self._server.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Henüz iletilmemiş güncellemeler için Telegram'a 503: yeniden gönderir
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                if not future.done():
+                    future.set_result(503)
+        await self._client.aclose()
+
+    async def handle(self, method, path, headers, body):
+        if method == "GET" and path == "/health":
+            return 200, json.dumps(self.stats()).encode("utf-8")
+        if method != "POST" or path.split("?")[0] != self.path:
+            return 404, b""
+        if headers.get("x-telegram-bot-api-secret-token") != self.secret_token:
+            return 403, b""
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return 400, b""
+        self.received += 1
+        url = self.ring.node_for(chat_key(update))
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queues[url].put_nowait((update, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return 503, b""
+        # Telegram'a ancak işçi güncellemeyi kabul edince cevap verilir
+        return await future, b""
+
+    async def _forward(self, url):
+        queue = self._queues[url]
+        while True:
+            items = [await queue.get()]
+            while len(items) < self.batch and not queue.empty():
+                items.append(queue.get_nowait())
+            status = 503
+            try:
+                status = await self._post(url, [update for update, _ in items])
+            finally:
+                for _, future in items:
+                    if not future.done():
+                        future.set_result(status)
+
+    async def _post(self, url, updates):
+        """Deliver a batch; returns the status to answer Telegram with (200, or 503 to have it redeliver)."""
+        retry = 0.1
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._client.post(url + "/updates", json=updates)
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            else:
+                if response.is_success:
+                    self.forwarded[url] += len(updates)
+                    return 200
+                error = f"HTTP {response.status_code}"
+                if response.status_code < 500:
+                    # Tekrar denemek düzeltmez; parti kaydedilir, sıradaki güncellemeler bekletilmez
+                    self._dead_letter(url, updates, error)
+                    return 200
+            if attempt < self.retries:
+                logger.warning("Worker %s unavailable (%s), retrying in %.1fs", url, error, retry)
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, 5.0)
+        logger.error("Worker %s still failing (%s); %d updates left to Telegram to redeliver", url, error, len(updates))
+        self.redelivered += len(updates)
+        return 503
+
+    def _dead_letter(self, url, updates, error):
+        logger.error("Worker %s rejected %d updates (%s); written to %s", url, len(updates), error,
+                     self.dead_letter_path)
+        self.dead_lettered += len(updates)
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for update in updates:
+                    f.write(json.dumps({"worker": url, "error": error, "update": update}, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error("Dead-letter log could not be written: %s", e)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "redelivered": self.redelivered,
+            "dead_lettered": self.dead_lettered,
+            "forwarded": self.forwarded,
+            "queued": {url: q.qsize() for url, q in self._queues.items()},
+        }
+
+
+async def _worker_main(index, host, port, base_url, schedule_jobs):
+    from telegram import Update
+
+    import telegram_bot
+    from metrics import start_http_server, METRICS_PORT
+
+    # Hash halkası sohbeti bu işçiye bağlar; sohbet içi sırayı da işçi korur
+    application = telegram_bot.build_application(base_url=base_url, schedule_jobs=schedule_jobs, ordered_chats=True)
+    seen = RecentIds()
+
+    async def handle(method, path, headers, body):
+        if method == "GET" and path == "/health":
+            return 200, b'{"ok": true}'
+        if method != "POST" or path != "/updates":
+            return 404, b""
+        try:
+            batch = json.loads(body)
+        except ValueError:
+            return 400, b""
+        # Sıra korunur: güncellemeler geliş sırasıyla kuyruğa girer
+        for data in batch:
+            if not seen.add(data.get("update_id")):
+                continue  # Telegram'ın ya da ön yüzün yeniden gönderdiği güncelleme
+            try:
+                update = Update.de_json(data, application.bot)
+            except Exception as e:
+                logger.warning("Skipping malformed update %s: %s", data.get("update_id"), e)
+                continue
+            await application.update_queue.put(update)
+        return 200, b""
+
+    async with application:
+        await application.start()
+        server = await serve_http(handle, host, port, max_body=MAX_BODY * FORWARD_BATCH)
+        # Her işçi kendi /metrics portunu açar: [Metrics] port + işçi sırası
+        start_http_server(port=METRICS_PORT + index if METRICS_PORT else 0)
+        logger.info("Worker %d listening on %s:%d", index, host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            server.close()
+            await application.stop()
+
+
+def run_worker(index, port, host="127.0.0.1", base_url=None, initializer=None, initargs=()):
+    """
+    Worker process entry point: runs the bot's Application and accepts
+    batches of updates from the front on POST /updates.
+
+    `initializer(*initargs)` runs first (before the bot modules are
+    imported), e.g. to chdir or patch things in tests and benchmarks.
+    Only worker 0 schedules the daily briefing.
+    """
+    if initializer is not None:
+        initializer(*initargs)
+    logging.basicConfig(format=f'%(asctime)s - worker{index} - %(name)s - %(levelname)s - %(message)s',
+                        level=logging.INFO)
+    try:
+        asyncio.run(_worker_main(index, host, port, base_url, schedule_jobs=index == 0))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_workers(count, base_port=WORKER_BASE_PORT, base_url=None, initializer=None, initargs=()):
+    """Spawn `count` local worker processes; returns (processes, worker urls)."""
+    context = multiprocessing.get_context("spawn")
+    processes, urls = [], []
+    for index in range(count):
+        port = base_port + index
+        process = context.Process(target=run_worker, args=(index, port, "127.0.0.1", base_url, initializer, initargs),
+                                  name=f"bot-worker-{index}", daemon=True)
+        process.start()
+        processes.append(process)
+        urls.append(f"http://127.0.0.1:{port}")
+    return processes, urls
+
+
+async def wait_ready(urls, timeout=60.0):
+    """Wait until every worker answers GET /health."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=1) as client:
+        for url in urls:
+            while True:
+                try:
+                    (await client.get(url + "/health")).raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"worker {url} did not start")
+                    await asyncio.sleep(0.2)
+
+
+async def set_webhook(url, secret_token=WEBHOOK_SECRET):
+    """Point Telegram at the front."""
+    from telegram import Bot
+
+    async with Bot(BOT_TOKEN) as bot:
+        await bot.set_webhook(url, secret_token=secret_token, max_connections=100)
+    logger.info("Webhook set to %s", url)
+
+
+async def _front_main(worker_urls, listen, url):
+    host, _, port = listen.rpartition(":")
+    front = WebhookFront(worker_urls, path=(urlsplit(url).path or "/") if url else "/")
+    await front.start(host or "0.0.0.0", int(port))
+    await wait_ready(worker_urls)
+    if url:
+        await set_webhook(url)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await front.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the bot in webhook mode with sharded worker processes.")
+    parser.add_argument("--workers", type=int, default=WEBHOOK_WORKERS, help="local worker processes to spawn")
+    parser.add_argument("--worker-urls", help="comma-separated remote workers instead of local ones (multi-host)")
+    parser.add_argument("--listen", default=WEBHOOK_LISTEN)
+    parser.add_argument("--url", default=WEBHOOK_URL, help="public webhook URL to register with Telegram")
+    parser.add_argument("--worker", action="store_true", help="run a single worker (for other hosts)")
+    parser.add_argument("--index", type=int, default=0, help="worker index; 0 runs the scheduled jobs")
+    parser.add_argument("--port", type=int, default=WORKER_BASE_PORT, help="worker port")
+    parser.add_argument("--host", default="127.0.0.1", help="worker listen address")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if not check_credentials():
+        sys.exit(1)
+
+    if args.worker:
+        if shared_state.STATE_BACKEND == "manager" and not shared_state.STATE_AUTHKEY:
+            logger.error("Set [State] authkey (or BOT_STATE_AUTHKEY) for the manager state backend")
+            sys.exit(1)
+        run_worker(args.index, args.port, args.host)
+        return
+    # Ön yüz 0.0.0.0'da dinler: yalnızca Telegram'ın gizli anahtarla gönderdiği istekler kabul edilir
+    if not WEBHOOK_SECRET:
+        logger.error("Set [Webhook] secret_token before running the webhook front")
+        sys.exit(1)
+
+    processes = []
+    if args.worker_urls:
+        worker_urls = [u.strip().rstrip("/") for u in args.worker_urls.split(",") if u.strip()]
+        if len(worker_urls) > 1 and shared_state.STATE_BACKEND != "manager":
+            logger.error("Several workers need shared state: set [State] backend = manager and run "
+                         "`python shared_state.py` where every worker can reach it")
+            sys.exit(1)
+    else:
+        if args.workers > 1 and shared_state.STATE_BACKEND != "manager":
+            # Süreç içi durumla her işçi abone dosyasının üzerine kendi kopyasını yazar
+            logger.info("%d workers: switching to the manager state backend", args.workers)
+            shared_state.STATE_BACKEND = os.environ["BOT_STATE_BACKEND"] = "manager"
+        if shared_state.STATE_BACKEND == "manager":
+            if not shared_state.STATE_AUTHKEY:
+                logger.error("Set [State] authkey (or BOT_STATE_AUTHKEY) for the manager state backend")
+                sys.exit(1)
+            # Yerel işçiler için durum sunucusunu da başlat (çok makinede ayrıca çalıştırılır)
+            state = multiprocessing.get_context("spawn").Process(target=shared_state.serve, name="bot-state", daemon=True)
+            state.start()
+            processes.append(state)
+        workers, worker_urls = start_workers(args.workers)
+        processes.extend(workers)
+    try:
+        asyncio.run(_front_main(worker_urls, args.listen, args.url))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()